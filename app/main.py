@@ -1,17 +1,42 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.middleware.cors import CORSMiddleware
 
-from app.settings import settings
+from app.database import engine
 from app.health import get_health_status
+from app.metrics import MetricsMiddleware, record_db_pool, render_metrics
+from app.settings import settings
+from documents.ingestion import start_ingestion_workers, stop_ingestion_workers
+from documents.purger import start_purger, stop_purger
 from documents.routes import router as documents_router
+from rag.process import shutdown_process_pool
 from rag.routes import router as rag_router
+from rag.vector_store import check_embedding_metadata, ensure_bm25_index
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Falha cedo se o índice foi gerado com outro modelo/dimensão de embedding
+    await asyncio.to_thread(check_embedding_metadata)
+    await asyncio.to_thread(ensure_bm25_index)
+    start_ingestion_workers()
+    start_purger()
+    yield
+    await stop_purger()
+    await stop_ingestion_workers()
+    shutdown_process_pool()
+
 
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan,
 )
 
 # Configure CORS with settings
@@ -22,11 +47,10 @@ app.add_middleware(
     allow_methods=settings.cors_methods_list,
     allow_headers=settings.cors_headers_list,
 )
-app.mount(
-    '/static',
-    StaticFiles(directory='app/static'),
-    name='static'
-)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+app.mount('/static', StaticFiles(directory='app/static'), name='static')
 
 templates = Jinja2Templates(directory='app/templates')
 
@@ -34,19 +58,33 @@ templates = Jinja2Templates(directory='app/templates')
 app.include_router(documents_router, prefix='/api')
 app.include_router(rag_router, prefix='/api')
 
+
 # Health check endpoint
-@app.get("/health", tags=["Health"])
+@app.get('/health', tags=['Health'])
 async def health():
     """Simple health check endpoint."""
-    return {"status": "ok"}
+    return {'status': 'ok'}
 
 
-@app.get("/health/detailed", tags=["Health"])
+@app.get('/health/detailed', tags=['Health'])
 async def health_detailed():
     """Detailed health check with all system components."""
     return await get_health_status()
 
 
-@app.get("/")
+if settings.METRICS_ENABLED:
+
+    @app.get('/metrics', tags=['Health'], include_in_schema=False)
+    async def metrics():
+        """Métricas no formato de exposição do Prometheus."""
+        record_db_pool(engine.pool)
+        return PlainTextResponse(
+            render_metrics(), media_type='text/plain; version=0.0.4'
+        )
+
+
+@app.get('/')
 async def read_root(request: Request):
-    return templates.TemplateResponse('dashboard.html', {'request': request, 'title': 'Home Page'})
\ No newline at end of file
+    return templates.TemplateResponse(
+        'dashboard.html', {'request': request, 'title': 'Home Page'}
+    )
@@ -0,0 +1,301 @@
+"""
+Métricas da aplicação no formato de exposição do Prometheus (`GET /metrics`).
+
+Implementação mínima de contadores, gauges e histogramas, sem dependências.
+Os rótulos de cada métrica são fixos e seus valores vêm de conjuntos
+fechados (etapas do pipeline, template da rota, classe do status), o que
+mantém a cardinalidade limitada.
+
+Os valores são mantidos por processo: com vários workers do uvicorn, cada
+um expõe as próprias métricas.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Segundos; cobre de consultas ao índice (ms) a chamadas ao LLM e ingestões (dezenas de s)
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+HTTP_METHODS = {'GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS'}
+
+_registry: List['_Metric'] = []
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return f'{{{pairs}}}'
+
+
+class _Metric(ABC):
+    type_name = ''
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}.'
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Linhas de amostra no formato de exposição, sem HELP/TYPE."""
+
+    def render(self) -> List[str]:
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type_name}',
+            *self._samples(),
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return [
+            f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    type_name = 'gauge'
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Contagem por bucket (não acumulada), soma e total
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observa a duração do bloco, inclusive quando ele termina com exceção."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, ([*state[0]], state[1], state[2]))
+                for key, state in self._values.items()
+            )
+
+        lines = []
+        bucket_labelnames = (*self.labelnames, 'le')
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    bucket_labelnames, (*key, _format_value(bound))
+                )
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(bucket_labelnames, (*key, '+Inf'))
+            lines.append(f'{self.name}_bucket{labels} {count}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Duração das requisições HTTP, até o último byte da resposta.',
+    ['method', 'route', 'status'],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    'http_requests_in_flight',
+    'Requisições HTTP em andamento.',
+)
+STAGE_DURATION = Histogram(
+    'rag_stage_duration_seconds',
+    'Duração de cada etapa do pipeline (pdf_parse, split, embed, vector_add, vector_query, bm25_query, llm).',
+    ['stage'],
+)
+CHUNKS_INGESTED = Counter(
+    'rag_chunks_ingested_total',
+    'Chunks gravados no vector store pelos workers de ingestão.',
+)
+TOKENS_CONSUMED = Counter(
+    'rag_tokens_total',
+    'Tokens consumidos nos provedores (prompt e completion do LLM, embedding).',
+    ['kind'],
+)
+CACHE_REQUESTS = Counter(
+    'rag_cache_requests_total',
+    'Consultas aos caches de respostas e de embeddings.',
+    ['cache', 'result'],
+)
+BACKGROUND_TASK_FAILURES = Counter(
+    'background_task_failures_total',
+    'Falhas das tarefas em segundo plano (ingestão e purga de documentos removidos).',
+    ['task'],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    'db_pool_connections',
+    'Conexões do pool do banco por estado (checked_out, idle, overflow) e o tamanho do pool (size).',
+    ['state'],
+)
+
+
+def record_db_pool(pool):
+    """Atualiza os gauges do pool do banco (lidos no momento da coleta)."""
+    for state, method in (
+        ('size', 'size'),
+        ('checked_out', 'checkedout'),
+        ('idle', 'checkedin'),
+        ('overflow', 'overflow'),
+    ):
+        # Pools sem limite (ex.: NullPool) não expõem essas contagens
+        if hasattr(pool, method):
+            DB_POOL_CONNECTIONS.set(getattr(pool, method)(), state=state)
+
+
+def http_route_labels(scope: dict, status_code: int) -> Dict[str, str]:
+    """Rótulos HTTP com cardinalidade limitada: template da rota e classe do status."""
+    route = scope.get('route')
+    method = scope.get('method', '')
+    return {
+        'method': method if method in HTTP_METHODS else 'other',
+        'route': getattr(route, 'path', None) or 'unmatched',
+        'status': f'{status_code // 100}xx',
+    }
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede a duração e as requisições HTTP em andamento."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # O router do FastAPI registra a rota encontrada no próprio scope
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                **http_route_labels(scope, status_code),
+            )
+
+
+def render_metrics() -> str:
+    return (
+        '\n'.join(line for metric in _registry for line in metric.render())
+        + '\n'
+    )
+
+
+def reset_metrics():
+    """Zera todas as métricas (usado nos testes)."""
+    for metric in _registry:
+        metric.clear()
@@ -0,0 +1,66 @@
+"""create table 'document_chunks'
+
+Revision ID: 6d2b8e41c9a7
+Revises: 3f7a9d2c6b14
+Create Date: 2026-10-18 14:12:08.319447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d2b8e41c9a7'
+down_revision: Union[str, Sequence[str], None] = '3f7a9d2c6b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('document_chunks',
+    sa.Column('chunk_id', sa.String(), nullable=False),
+    sa.Column('document_id', sa.UUID(), nullable=False),
+    sa.Column('ordinal', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('page', sa.Integer(), nullable=True),
+    sa.Column('token_count', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['document_id'], ['document_records.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('chunk_id')
+    )
+    op.create_index('ix_document_chunks_document_id_ordinal', 'document_chunks', ['document_id', 'ordinal'], unique=False)
+
+    # Migra os ids do array JSONB mantendo a ordem original dos chunks
+    op.execute(
+        """
+        INSERT INTO document_chunks (chunk_id, document_id, ordinal)
+        SELECT chunk.value, document_records.id, chunk.ordinality - 1
+        FROM document_records,
+             jsonb_array_elements_text(document_records.chunks_ids) WITH ORDINALITY AS chunk(value, ordinality)
+        """
+    )
+    op.drop_column('document_records', 'chunks_ids')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('document_records', sa.Column('chunks_ids', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.execute(
+        """
+        UPDATE document_records
+        SET chunks_ids = COALESCE(
+            (
+                SELECT jsonb_agg(document_chunks.chunk_id ORDER BY document_chunks.ordinal)
+                FROM document_chunks
+                WHERE document_chunks.document_id = document_records.id
+            ),
+            '[]'::jsonb
+        )
+        """
+    )
+    op.alter_column('document_records', 'chunks_ids', nullable=False)
+    op.drop_index('ix_document_chunks_document_id_ordinal', table_name='document_chunks')
+    op.drop_table('document_chunks')
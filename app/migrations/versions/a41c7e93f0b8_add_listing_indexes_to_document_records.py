@@ -0,0 +1,36 @@
+"""add listing indexes to 'document_records'
+
+Revision ID: a41c7e93f0b8
+Revises: 6d2b8e41c9a7
+Create Date: 2026-10-18 15:03:51.604218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7e93f0b8'
+down_revision: Union[str, Sequence[str], None] = '6d2b8e41c9a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_document_records_created_at_id', 'document_records', ['created_at', 'id'], unique=False)
+    op.create_index(
+        'ix_document_records_filename_prefix',
+        'document_records',
+        ['filename'],
+        unique=False,
+        postgresql_ops={'filename': 'text_pattern_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_document_records_filename_prefix', table_name='document_records')
+    op.drop_index('ix_document_records_created_at_id', table_name='document_records')
@@ -1,71 +1,174 @@
-from typing import List
+import os
+from typing import List, Literal, Optional
+
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
-        env_file='.env',
-        env_file_encoding='utf-8',
-        extra='ignore'
+        env_file='.env', env_file_encoding='utf-8', extra='ignore'
     )
 
     # API Configuration
     API_KEY: str
     OPENAI_API_KEY: str
-    
+    # URL de um servidor compatível com a API da OpenAI (ex.: benchmarks.openai_server)
+    OPENAI_BASE_URL: Optional[str] = Field(default=None)
+
     # Database Configuration
     DATABASE_URL: str
-    
+
     # Vector Store Configuration
     VECTOR_STORE_PATH: str = 'vector-db'
+    VECTOR_BACKEND: Literal['chroma', 'numpy'] = Field(default='chroma')
+    NUMPY_STORE_PATH: Optional[str] = Field(default=None)
+    NUMPY_COMPACTION_THRESHOLD: float = Field(default=0.3, gt=0.0, le=1.0)
+    NUMPY_QUANTIZATION: Literal['none', 'float16', 'int8'] = Field(
+        default='none'
+    )
+    NUMPY_RESCORE_FACTOR: int = Field(default=4, ge=1)
     EMBEDDING_MODEL: str = Field(default='text-embedding-3-small')
-    
+    EMBEDDING_DIMENSIONS: Optional[int] = Field(default=None, gt=0)
+    VECTOR_COLLECTION_NAME: str = Field(default='langchain')
+    # Índice HNSW do Chroma (padrões do Chroma); M e construction_ef valem na criação da coleção
+    HNSW_SPACE: Literal['l2', 'cosine', 'ip'] = Field(default='l2')
+    HNSW_M: int = Field(default=16, ge=2)
+    HNSW_CONSTRUCTION_EF: int = Field(default=100, ge=1)
+    HNSW_SEARCH_EF: int = Field(default=100, ge=1)
+
+    # Embedding Cache Configuration
+    EMBEDDING_CACHE_ENABLED: bool = Field(default=True)
+    EMBEDDING_CACHE_PATH: Optional[str] = Field(default=None)
+    EMBEDDING_CACHE_MAX_SIZE_MB: float = Field(default=512, gt=0)
+
+    # Query Embedding Batching Configuration
+    QUERY_EMBEDDING_BATCH_ENABLED: bool = Field(default=True)
+    QUERY_EMBEDDING_BATCH_WAIT_MS: float = Field(default=5, ge=0)
+    QUERY_EMBEDDING_BATCH_MAX_SIZE: int = Field(default=64, gt=0)
+
+    # Retrieval Configuration
+    RETRIEVAL_MODE: Literal['vector', 'hybrid', 'lexical'] = Field(
+        default='vector'
+    )
+    RETRIEVAL_CANDIDATES_K: int = Field(default=20, gt=0)
+    RRF_K: int = Field(default=60, gt=0)
+    BM25_INDEX_PATH: Optional[str] = Field(default=None)
+
     # LLM Configuration
     LLM_MODEL: str = Field(default='gpt-3.5-turbo')
     LLM_TEMPERATURE: float = Field(default=0.7, ge=0.0, le=2.0)
     LLM_MAX_TOKENS: int = Field(default=500, gt=0)
-    
+
+    # Context Assembly Configuration
+    # Tokens dos chunks enviados ao LLM por pergunta (0 = sem limite)
+    CONTEXT_TOKEN_BUDGET: int = Field(default=0, ge=0)
+    CONTEXT_MERGE_CHUNKS: bool = Field(default=True)
+
     # Document Processing Configuration
     CHUNK_SIZE: int = Field(default=1000, gt=0)
     CHUNK_OVERLAP: int = Field(default=200, ge=0)
     MAX_FILE_SIZE_MB: int = Field(default=10, gt=0)
-    
+    MAX_UPLOAD_SIZE_MB: int = Field(default=100, gt=0)
+    UPLOAD_SPOOL_MAX_SIZE_MB: float = Field(default=1, ge=0)
+    UPLOAD_FILE_CONCURRENCY: int = Field(default=4, gt=0)
+    UPLOAD_ALL_OR_NOTHING: bool = Field(default=True)
+
+    # PDF Processing Pool Configuration
+    PDF_PROCESS_POOL_SIZE: int = Field(default=2, ge=0)
+    PDF_PROCESS_QUEUE_SIZE: int = Field(default=16, gt=0)
+    PDF_PAGES_PER_TASK: int = Field(default=20, gt=0)
+
+    # Ingestion Queue Configuration
+    INGESTION_WORKER_CONCURRENCY: int = Field(default=2, ge=0)
+    INGESTION_POLL_INTERVAL_SECONDS: float = Field(default=2, gt=0)
+    INGESTION_BATCH_MAX_JOBS: int = Field(default=8, gt=0)
+    INGESTION_MAX_ATTEMPTS: int = Field(default=5, gt=0)
+    INGESTION_RETRY_BACKOFF_SECONDS: float = Field(default=5, ge=0)
+    INGESTION_RETRY_BACKOFF_MAX_SECONDS: float = Field(default=300, ge=0)
+    INGESTION_LEASE_SECONDS: int = Field(default=600, gt=0)
+
+    # Tombstone Purge Configuration
+    PURGE_BATCH_SIZE: int = Field(default=500, gt=0)
+    PURGE_POLL_INTERVAL_SECONDS: float = Field(default=5, gt=0)
+
+    # Answer Cache Configuration
+    ANSWER_CACHE_ENABLED: bool = Field(default=True)
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = Field(
+        default=0.95, ge=0.0, le=1.0
+    )
+    ANSWER_CACHE_MAX_ENTRIES: int = Field(default=1000, gt=0)
+    ANSWER_CACHE_TTL_SECONDS: int = Field(default=3600, ge=0)
+    ANSWER_CACHE_MAX_MEMORY_MB: float = Field(default=64, gt=0)
+
+    # Batch Ask Configuration
+    ASK_BATCH_MAX_QUESTIONS: int = Field(default=500, gt=0)
+    # Chamadas ao LLM simultâneas de todos os lotes do processo
+    ASK_BATCH_LLM_CONCURRENCY: int = Field(default=4, gt=0)
+
     # CORS Configuration
     CORS_ORIGINS: str = Field(default='*')
     CORS_ALLOW_CREDENTIALS: bool = Field(default=True)
     CORS_ALLOW_METHODS: str = Field(default='*')
     CORS_ALLOW_HEADERS: str = Field(default='*')
-    
+
     # Application Configuration
     APP_NAME: str = Field(default='RAG API')
     APP_VERSION: str = Field(default='1.0.0')
     DEBUG: bool = Field(default=False)
-    
+
     # Health Check Configuration
     HEALTH_CHECK_TIMEOUT: int = Field(default=5, gt=0)
-    
+
+    # Metrics Configuration
+    METRICS_ENABLED: bool = Field(default=True)
+
+    @property
+    def embedding_cache_path(self) -> str:
+        """Caminho do cache de embeddings (padrão: dentro de VECTOR_STORE_PATH)."""
+        if self.EMBEDDING_CACHE_PATH:
+            return self.EMBEDDING_CACHE_PATH
+        return os.path.join(self.VECTOR_STORE_PATH, 'embedding_cache.sqlite3')
+
+    @property
+    def bm25_index_path(self) -> str:
+        """Caminho do índice BM25 (padrão: dentro de VECTOR_STORE_PATH)."""
+        if self.BM25_INDEX_PATH:
+            return self.BM25_INDEX_PATH
+        return os.path.join(self.VECTOR_STORE_PATH, 'bm25_index.json')
+
+    @property
+    def numpy_store_path(self) -> str:
+        """Diretório do backend numpy (padrão: dentro de VECTOR_STORE_PATH)."""
+        if self.NUMPY_STORE_PATH:
+            return self.NUMPY_STORE_PATH
+        return os.path.join(self.VECTOR_STORE_PATH, 'numpy')
+
     @property
     def cors_origins_list(self) -> List[str]:
         """Converte CORS_ORIGINS string em lista."""
         if self.CORS_ORIGINS == '*':
             return ['*']
         return [origin.strip() for origin in self.CORS_ORIGINS.split(',')]
-    
+
     @property
     def cors_methods_list(self) -> List[str]:
         """Converte CORS_ALLOW_METHODS string em lista."""
         if self.CORS_ALLOW_METHODS == '*':
             return ['*']
-        return [method.strip() for method in self.CORS_ALLOW_METHODS.split(',')]
-    
+        return [
+            method.strip() for method in self.CORS_ALLOW_METHODS.split(',')
+        ]
+
     @property
     def cors_headers_list(self) -> List[str]:
         """Converte CORS_ALLOW_HEADERS string em lista."""
         if self.CORS_ALLOW_HEADERS == '*':
             return ['*']
-        return [header.strip() for header in self.CORS_ALLOW_HEADERS.split(',')]
-    
+        return [
+            header.strip() for header in self.CORS_ALLOW_HEADERS.split(',')
+        ]
+
     @field_validator('CHUNK_OVERLAP')
     @classmethod
     def validate_chunk_overlap(cls, v, info):
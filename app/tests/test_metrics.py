@@ -0,0 +1,131 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+from app.metrics import (
+    CACHE_REQUESTS,
+    HTTP_REQUEST_DURATION,
+    STAGE_DURATION,
+    Counter,
+    Histogram,
+    _Metric,
+    render_metrics,
+    reset_metrics,
+)
+from rag.answer_cache import SemanticAnswerCache
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+def test_histogram_renders_cumulative_buckets():
+    """
+    Tests whether histogram buckets are cumulative and include +Inf, _sum and _count.
+    """
+    histogram = Histogram(
+        'test_duration_seconds', 'Test.', ['stage'], buckets=[0.1, 1.0]
+    )
+    histogram.observe(0.05, stage='a')
+    histogram.observe(0.5, stage='a')
+    histogram.observe(5.0, stage='a')
+
+    lines = histogram.render()
+
+    assert 'test_duration_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_duration_seconds_bucket{stage="a",le="1.0"} 2' in lines
+    assert 'test_duration_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'test_duration_seconds_sum{stage="a"} 5.55' in lines
+    assert 'test_duration_seconds_count{stage="a"} 3' in lines
+
+
+def test_metric_rejects_unknown_labels():
+    """
+    Tests whether a metric only accepts its declared label names.
+    """
+    counter = Counter('test_total', 'Test.', ['kind'])
+
+    with pytest.raises(ValueError, match='expects labels'):
+        counter.inc(kind='a', extra='b')
+
+
+def test_metric_subclass_must_implement_samples():
+    """
+    Tests whether a metric type without `_samples` cannot be instantiated.
+    """
+
+    class Incomplete(_Metric):
+        type_name = 'untyped'
+
+    with pytest.raises(TypeError, match='_samples'):
+        Incomplete('test_incomplete', 'Test.')
+
+
+def test_stage_timer_records_failures():
+    """
+    Tests whether a timed stage is observed even when it raises.
+    """
+    with pytest.raises(RuntimeError):
+        with STAGE_DURATION.time(stage='llm'):
+            raise RuntimeError('boom')
+
+    assert STAGE_DURATION.count(stage='llm') == 1
+
+
+def test_answer_cache_counts_hits_and_misses():
+    """
+    Tests whether answer cache lookups are exported as hit/miss counters.
+    """
+    cache = SemanticAnswerCache(
+        similarity_threshold=0.9,
+        max_entries=10,
+        ttl_seconds=60,
+        max_memory_mb=1,
+    )
+    cache.lookup([1.0, 0.0])
+    cache.store(
+        'pergunta',
+        [1.0, 0.0],
+        {'answer': 'resposta', 'sources': [], 'confidence': None},
+    )
+    cache.lookup([1.0, 0.0])
+
+    assert CACHE_REQUESTS.value(cache='answer', result='miss') == 1
+    assert CACHE_REQUESTS.value(cache='answer', result='hit') == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_labels_requests_by_route_template():
+    """
+    Tests whether /metrics exposes HTTP histograms labelled by route template and status class.
+    """
+    transport = ASGITransport(app=app)
+    async with AsyncClient(
+        transport=transport, base_url='http://testserver'
+    ) as client:
+        await client.get('/health')
+        await client.get('/does-not-exist/123')
+        response = await client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    assert (
+        HTTP_REQUEST_DURATION.count(
+            method='GET', route='/health', status='2xx'
+        )
+        == 1
+    )
+    assert (
+        HTTP_REQUEST_DURATION.count(
+            method='GET', route='unmatched', status='4xx'
+        )
+        == 1
+    )
+    assert (
+        'http_request_duration_seconds_bucket{method="GET",route="/health",status="2xx",le="+Inf"} 1'
+        in response.text
+    )
+    assert '/does-not-exist/123' not in render_metrics()
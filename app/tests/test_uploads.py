@@ -0,0 +1,187 @@
+import hashlib
+import os
+
+import pytest
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from starlette.requests import Request
+
+from app.utils.uploads import SpooledUpload, receive_pdf_uploads
+
+BOUNDARY = 'test-boundary'
+
+
+def build_multipart_body(files):
+    body = b''
+    for filename, content, content_type in files:
+        body += (
+            (
+                f'--{BOUNDARY}\r\n'
+                f'Content-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+                f'Content-Type: {content_type}\r\n\r\n'
+            ).encode()
+            + content
+            + b'\r\n'
+        )
+    return body + f'--{BOUNDARY}--\r\n'.encode()
+
+
+def build_request(body, chunk_size=64, content_length=True):
+    """Builds a Starlette request whose body arrives in small chunks."""
+    chunks = [
+        body[i : i + chunk_size] for i in range(0, len(body), chunk_size)
+    ]
+    received = []
+
+    async def receive():
+        chunk = chunks.pop(0) if chunks else b''
+        received.append(chunk)
+        return {
+            'type': 'http.request',
+            'body': chunk,
+            'more_body': bool(chunks),
+        }
+
+    headers = [
+        (b'content-type', f'multipart/form-data; boundary={BOUNDARY}'.encode())
+    ]
+    if content_length:
+        headers.append((b'content-length', str(len(body)).encode()))
+
+    request = Request(
+        {'type': 'http', 'method': 'POST', 'headers': headers}, receive
+    )
+    return request, received
+
+
+async def receive(
+    request,
+    max_file_size_mb=1.0,
+    max_upload_size_mb=10.0,
+    spool_max_size_mb=1.0,
+):
+    return await receive_pdf_uploads(
+        request,
+        max_file_size_mb=max_file_size_mb,
+        max_upload_size_mb=max_upload_size_mb,
+        spool_max_size_mb=spool_max_size_mb,
+    )
+
+
+@pytest.mark.asyncio
+async def test_receive_small_pdf_stays_in_memory():
+    """
+    Verifies that a small upload is kept in a single in-memory buffer with its size and sha256.
+    """
+    content = b'%PDF-1.4 conteudo' * 10
+    request, _ = build_request(
+        build_multipart_body([('cv.pdf', content, 'application/pdf')])
+    )
+
+    uploads = await receive(request)
+
+    assert len(uploads) == 1
+    upload = uploads[0]
+    assert upload.filename == 'cv.pdf'
+    assert upload.size == len(content)
+    assert upload.sha256 == hashlib.sha256(content).hexdigest()
+    assert bytes(upload.source) == content
+
+
+@pytest.mark.asyncio
+async def test_receive_large_pdf_is_spooled_to_disk():
+    """
+    Verifies that uploads above the spool size are written to a temporary file that close() removes.
+    """
+    content = os.urandom(4096)
+    request, _ = build_request(
+        build_multipart_body([('big.pdf', content, 'application/pdf')]),
+        chunk_size=512,
+    )
+
+    uploads = await receive(request, spool_max_size_mb=1024 / (1024 * 1024))
+    upload = uploads[0]
+
+    assert isinstance(upload.source, str)
+    with open(upload.source, 'rb') as f:
+        assert f.read() == content
+    assert upload.sha256 == hashlib.sha256(content).hexdigest()
+
+    upload.close()
+    assert not os.path.exists(upload.source)
+
+
+@pytest.mark.asyncio
+async def test_receive_rejects_non_pdf():
+    """
+    Verifies that a non-PDF part is rejected with 400.
+    """
+    request, _ = build_request(
+        build_multipart_body([('test.txt', b'not a pdf', 'text/plain')])
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await receive(request)
+
+    assert exc_info.value.status_code == 400
+    assert (
+        exc_info.value.detail
+        == "Invalid file format for 'test.txt'. Only PDF files are supported."
+    )
+
+
+@pytest.mark.asyncio
+async def test_receive_rejects_oversized_file_while_streaming():
+    """
+    Verifies that a file is rejected as soon as its running byte count exceeds the limit,
+    without reading the rest of the body.
+    """
+    content = b'x' * 8192
+    body = build_multipart_body([('big.pdf', content, 'application/pdf')])
+    request, received = build_request(
+        body, chunk_size=1024, content_length=False
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await receive(request, max_file_size_mb=2048 / (1024 * 1024))
+
+    assert exc_info.value.status_code == 413
+    assert sum(len(chunk) for chunk in received) < len(body)
+
+
+@pytest.mark.asyncio
+async def test_receive_rejects_by_content_length_before_reading():
+    """
+    Verifies that an oversized Content-Length is rejected without reading the body.
+    """
+    body = build_multipart_body([('big.pdf', b'x' * 4096, 'application/pdf')])
+    request, received = build_request(body)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await receive(request, max_upload_size_mb=1024 / (1024 * 1024))
+
+    assert exc_info.value.status_code == 413
+    assert received == []
+
+
+@pytest.mark.asyncio
+async def test_receive_without_files_raises_validation_error():
+    """
+    Verifies that a request without files fails like a missing `files` field.
+    """
+    request, _ = build_request(f'--{BOUNDARY}--\r\n'.encode())
+
+    with pytest.raises(RequestValidationError):
+        await receive(request)
+
+
+def test_spooled_upload_close_releases_buffer():
+    """
+    Verifies that closing an in-memory upload releases its buffer.
+    """
+    upload = SpooledUpload('cv.pdf', 'application/pdf', spool_max_size=1024)
+    upload.write(b'abc')
+
+    upload.close()
+
+    assert upload.source == bytearray()
@@ -78,7 +78,9 @@ def test_drop_test_database(mock_connect):
 
     actual_calls = mock_cursor.execute.call_args_list
     assert len(actual_calls) == 2
-    assert actual_calls[0][0][0].strip().startswith('SELECT pg_terminate_backend')
+    assert (
+        actual_calls[0][0][0].strip().startswith('SELECT pg_terminate_backend')
+    )
     assert actual_calls[1][0][0] == 'DROP DATABASE IF EXISTS "test_xyz"'
 
     mock_conn.close.assert_called_once()
@@ -16,7 +16,7 @@ def get_admin_url(database_url: str) -> str:
     return str_url
 
 
-def get_test_db_url(database_url: str, test_db_name: str)  -> str:
+def get_test_db_url(database_url: str, test_db_name: str) -> str:
     url = make_url(database_url)
     url = url.set(drivername='postgresql+asyncpg', database=test_db_name)
     str_url = url.render_as_string(hide_password=False)
@@ -26,7 +26,9 @@ def get_test_db_url(database_url: str, test_db_name: str)  -> str:
 def create_test_database(database_url: str, db_name: str):
     admin_url = get_admin_url(database_url)
     conn = psycopg2.connect(admin_url)
-    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)  # DESLIGA transação automática
+    conn.set_isolation_level(
+        ISOLATION_LEVEL_AUTOCOMMIT
+    )  # DESLIGA transação automática
 
     with conn.cursor() as cur:
         cur.execute(f'CREATE DATABASE "{db_name}"')
@@ -37,7 +39,9 @@ def create_test_database(database_url: str, db_name: str):
 def drop_test_database(database_url: str, db_name: str):
     admin_url = get_admin_url(database_url)
     conn = psycopg2.connect(admin_url)
-    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)  # DESLIGA transação automática
+    conn.set_isolation_level(
+        ISOLATION_LEVEL_AUTOCOMMIT
+    )  # DESLIGA transação automática
 
     with conn.cursor() as cur:
         cur.execute(f"""
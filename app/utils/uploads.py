@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import Dict, List, Optional, Union
+
+from fastapi import HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+MB = 1024 * 1024
+
+
+class SpooledUpload:
+    """
+    Arquivo recebido por streaming, com tamanho e sha256 calculados na escrita.
+
+    O conteúdo fica em um único buffer em memória até `spool_max_size` bytes;
+    acima disso é transferido para um arquivo temporário em disco, cujo
+    caminho é entregue diretamente ao parser de PDF.
+    """
+
+    def __init__(self, filename: str, content_type: str, spool_max_size: int):
+        self.filename = filename
+        self.content_type = content_type
+        self.spool_max_size = spool_max_size
+        self.size = 0
+
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._file = None
+        self._path: Optional[str] = None
+
+    def fits_in_memory(self, length: int) -> bool:
+        return self._path is None and self.size + length <= self.spool_max_size
+
+    def write(self, data: bytes):
+        self._hash.update(data)
+
+        if self.fits_in_memory(len(data)):
+            self._buffer.extend(data)
+        else:
+            if self._file is None:
+                self._file = tempfile.NamedTemporaryFile(
+                    delete=False, suffix='.pdf'
+                )
+                self._path = self._file.name
+                self._file.write(self._buffer)
+                self._buffer = bytearray()
+            self._file.write(data)
+
+        self.size += len(data)
+
+    def finish(self):
+        if self._file is not None:
+            self._file.close()
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def size_mb(self) -> float:
+        return self.size / MB
+
+    @property
+    def source(self) -> Union[bytearray, str]:
+        """Buffer em memória ou caminho do arquivo em disco."""
+        return self._path if self._path else self._buffer
+
+    def close(self):
+        self.finish()
+        if self._path and os.path.exists(self._path):
+            os.remove(self._path)
+        self._buffer = bytearray()
+
+
+def _is_pdf(filename: str, content_type: str) -> bool:
+    return content_type == 'application/pdf' and filename.endswith('.pdf')
+
+
+def _missing_files_error() -> RequestValidationError:
+    # Mesmo erro que o FastAPI retornaria para `files: List[UploadFile] = File(...)`
+    return RequestValidationError([
+        {
+            'type': 'missing',
+            'loc': ('body', 'files'),
+            'msg': 'Field required',
+            'input': None,
+        }
+    ])
+
+
+class _PdfUploadParser:
+    """Callbacks do python-multipart que gravam os arquivos enquanto chegam."""
+
+    def __init__(
+        self,
+        field_name: str,
+        max_file_size: int,
+        spool_max_size: int,
+    ):
+        self.field_name = field_name
+        self.max_file_size = max_file_size
+        self.spool_max_size = spool_max_size
+
+        self.uploads: List[SpooledUpload] = []
+        self.pending_writes: List[tuple] = []
+
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b''
+        self._header_value = b''
+        self._current: Optional[SpooledUpload] = None
+        self._current_size = 0
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._current = None
+        self._current_size = 0
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b''
+        self._header_value = b''
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(
+            self._headers.get(b'content-disposition', b'')
+        )
+        name = options.get(b'name', b'').decode('utf-8', errors='replace')
+        if name != self.field_name or b'filename' not in options:
+            return
+
+        filename = options[b'filename'].decode('utf-8', errors='replace')
+        content_type = self._headers.get(b'content-type', b'').decode(
+            'latin-1'
+        )
+
+        # Rejeita o arquivo antes de ler qualquer byte do seu conteúdo
+        if not _is_pdf(filename, content_type):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid file format for '{filename}'. Only PDF files are supported.",
+            )
+
+        self._current = SpooledUpload(
+            filename=filename,
+            content_type=content_type,
+            spool_max_size=self.spool_max_size,
+        )
+        self.uploads.append(self._current)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._current is None:
+            return
+
+        self._current_size += end - start
+        if self._current_size > self.max_file_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File '{self._current.filename}' exceeds maximum size of {self.max_file_size // MB}MB.",
+            )
+        self.pending_writes.append((self._current, data[start:end]))
+
+    def on_part_end(self):
+        if self._current is not None:
+            self.pending_writes.append((self._current, None))
+        self._current = None
+
+
+async def receive_pdf_uploads(
+    request: Request,
+    max_file_size_mb: float,
+    max_upload_size_mb: float,
+    spool_max_size_mb: float,
+    field_name: str = 'files',
+) -> List[SpooledUpload]:
+    """
+    Lê os PDFs de uma requisição multipart em streaming.
+
+    A requisição é rejeitada assim que o limite é ultrapassado: pelo
+    Content-Length, antes de ler o corpo, ou pela contagem de bytes de cada
+    arquivo à medida que os pedaços chegam. Cada arquivo é gravado uma única
+    vez, calculando tamanho e sha256 durante a escrita.
+    """
+    max_upload_size = int(max_upload_size_mb * MB)
+
+    content_length = request.headers.get('content-length')
+    if (
+        content_length
+        and content_length.isdigit()
+        and int(content_length) > max_upload_size
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f'Request body exceeds maximum upload size of {max_upload_size_mb:g}MB.',
+        )
+
+    content_type, params = parse_options_header(
+        request.headers.get('content-type', '')
+    )
+    if content_type != b'multipart/form-data' or b'boundary' not in params:
+        raise _missing_files_error()
+
+    handler = _PdfUploadParser(
+        field_name=field_name,
+        max_file_size=int(max_file_size_mb * MB),
+        spool_max_size=int(spool_max_size_mb * MB),
+    )
+    parser = MultipartParser(
+        params[b'boundary'],
+        {
+            'on_part_begin': handler.on_part_begin,
+            'on_part_data': handler.on_part_data,
+            'on_part_end': handler.on_part_end,
+            'on_header_field': handler.on_header_field,
+            'on_header_value': handler.on_header_value,
+            'on_header_end': handler.on_header_end,
+            'on_headers_finished': handler.on_headers_finished,
+        },
+    )
+
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_upload_size:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f'Request body exceeds maximum upload size of {max_upload_size_mb:g}MB.',
+                )
+
+            parser.write(chunk)
+
+            for upload, data in handler.pending_writes:
+                if data is None:
+                    upload.finish()
+                elif upload.fits_in_memory(len(data)):
+                    upload.write(data)
+                else:
+                    # Escrita em disco fora do event loop
+                    await asyncio.to_thread(upload.write, data)
+            handler.pending_writes.clear()
+
+        parser.finalize()
+    except Exception:
+        for upload in handler.uploads:
+            upload.close()
+        raise
+
+    if not handler.uploads:
+        raise _missing_files_error()
+
+    return handler.uploads
@@ -0,0 +1,372 @@
+"""
+Benchmark ponta a ponta da API: ingestão de PDFs e perguntas.
+
+A aplicação FastAPI roda no próprio processo (httpx + ASGITransport), com
+embeddings e LLM falsos, determinísticos e com latência configurável (sem
+chamadas à OpenAI). O banco é um PostgreSQL temporário criado a partir de
+`DATABASE_URL` (como nos testes) e removido ao final; o vector store e o
+índice BM25 ficam em um diretório temporário.
+
+Etapas:
+- **ingest**: gera `--pdfs` PDFs de `--pages` páginas com fpdf, envia em
+  `POST /api/documents` e espera os workers da fila indexarem tudo;
+  reporta páginas/s e chunks/s do upload e da ingestão completa
+- **ask**: para cada nível de `--concurrency`, envia `--questions` perguntas
+  distintas a `POST /api/rag/ask-question`; reporta latência p50/p95/p99,
+  perguntas/s, tokens do prompt por pergunta e a latência média do LLM (que
+  cresce com o prompt, conforme `--llm-per-prompt-token-latency-ms`)
+
+A montagem do contexto é controlada por `--context-token-budget` e
+`--no-merge-chunks`; com `--no-merge-chunks` e o orçamento padrão (0, sem
+limite) os chunks recuperados são enviados ao LLM sem alteração, para
+comparação com um orçamento menor (ex.: `--context-token-budget 1000`).
+
+O pico de RSS do processo (e dos processos do pool de PDFs) é reportado ao
+final. O resultado é impresso em JSON, com data e commit, e pode ser gravado
+com `--output` para comparar execuções.
+
+Uso:
+    python -m benchmarks.end_to_end --pdfs 20 --pages 10 --questions 200 --concurrency 1 8 32
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from fpdf import FPDF
+from httpx import ASGITransport, AsyncClient
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import get_async_session, table_registry
+from app.main import app
+from app.security import API_KEY_NAME
+from app.settings import settings
+from app.utils.db import (
+    create_test_database,
+    drop_test_database,
+    generate_test_db_name,
+    get_test_db_url,
+)
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+from documents import ingestion
+from documents.models import IngestionJob, IngestionStatus
+from rag import process, rag_chain
+from rag import vector_store as vector_store_module
+
+WORDS = (
+    'projeto sistema dados modelo análise desenvolvimento python api banco consulta '
+    'documento resposta usuário serviço desempenho latência memória índice vetor busca '
+    'experiência equipe produto cliente arquitetura processo teste qualidade entrega'
+).split()
+
+
+def generate_pdf(seed: int, pages: int, words_per_page: int) -> bytes:
+    """PDF com texto pseudoaleatório e determinístico (PDFs distintos por `seed`)."""
+    rng = random.Random(seed)
+    pdf = FPDF()
+    pdf.set_font('Arial', size=11)
+    for page in range(pages):
+        pdf.add_page()
+        text = ' '.join(rng.choice(WORDS) for _ in range(words_per_page))
+        pdf.multi_cell(0, 6, f'Documento {seed}, página {page + 1}. {text}')
+    return pdf.output(dest='S').encode('latin1')
+
+
+def _percentiles(latencies: List[float]) -> dict:
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return round(latencies[max(int(len(latencies) * p) - 1, 0)] * 1000, 2)
+
+    return {
+        'latency_p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'latency_p95_ms': percentile(0.95),
+        'latency_p99_ms': percentile(0.99),
+    }
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss é dado em KB no Linux
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def _pending_jobs(session_factory) -> int:
+    async with session_factory() as session:
+        result = await session.execute(
+            select(func.count())
+            .select_from(IngestionJob)
+            .where(
+                IngestionJob.status.in_([
+                    IngestionStatus.QUEUED.value,
+                    IngestionStatus.EMBEDDING.value,
+                ])
+            )
+        )
+        return result.scalar_one()
+
+
+async def run_ingest(client: AsyncClient, session_factory, args) -> dict:
+    pdfs = [
+        (f'bench_{i}.pdf', generate_pdf(i, args.pages, args.words_per_page))
+        for i in range(args.pdfs)
+    ]
+
+    start = time.perf_counter()
+    total_chunks = 0
+    for offset in range(0, len(pdfs), args.files_per_request):
+        batch = pdfs[offset : offset + args.files_per_request]
+        response = await client.post(
+            '/api/documents',
+            files=[
+                ('files', (filename, content, 'application/pdf'))
+                for filename, content in batch
+            ],
+        )
+        response.raise_for_status()
+        total_chunks += response.json()['total_chunks']
+    upload_seconds = time.perf_counter() - start
+
+    while await _pending_jobs(session_factory):
+        await asyncio.sleep(0.05)
+    total_seconds = time.perf_counter() - start
+
+    pages = args.pdfs * args.pages
+    return {
+        'pages': pages,
+        'chunks': total_chunks,
+        'upload_seconds': round(upload_seconds, 3),
+        'total_seconds': round(total_seconds, 3),
+        'upload_pages_per_second': round(pages / upload_seconds, 1),
+        'pages_per_second': round(pages / total_seconds, 1),
+        'chunks_per_second': round(total_chunks / total_seconds, 1),
+    }
+
+
+async def run_ask(
+    client: AsyncClient, llm: FakeChatModel, questions: int, concurrency: int
+) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    calls, prompt_tokens, llm_seconds = (
+        llm.calls,
+        llm.prompt_tokens,
+        llm.llm_seconds,
+    )
+
+    async def one(index: int):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                '/api/rag/ask-question',
+                json={
+                    'question': f'Qual a experiência do documento {index} com {WORDS[index % len(WORDS)]}?'
+                },
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(questions)))
+    elapsed = time.perf_counter() - start
+    llm_calls = max(llm.calls - calls, 1)
+
+    return {
+        'concurrency': concurrency,
+        'questions': questions,
+        'questions_per_second': round(questions / elapsed, 1),
+        **_percentiles(latencies),
+        'prompt_tokens_per_question': round(
+            (llm.prompt_tokens - prompt_tokens) / llm_calls, 1
+        ),
+        'llm_latency_mean_ms': round(
+            (llm.llm_seconds - llm_seconds) / llm_calls * 1000, 2
+        ),
+    }
+
+
+def _configure(args, workdir: str) -> FakeChatModel:
+    """Aponta a aplicação para os diretórios temporários e os backends falsos."""
+    settings.VECTOR_STORE_PATH = workdir
+    settings.NUMPY_STORE_PATH = None
+    settings.BM25_INDEX_PATH = None
+    settings.VECTOR_BACKEND = args.vector_backend
+    settings.ANSWER_CACHE_ENABLED = args.answer_cache
+    settings.CONTEXT_TOKEN_BUDGET = args.context_token_budget
+    settings.CONTEXT_MERGE_CHUNKS = not args.no_merge_chunks
+
+    embeddings = FakeEmbeddings(
+        dimensions=args.dimensions,
+        latency_ms=args.embedding_latency_ms,
+        per_item_latency_ms=args.embedding_per_item_latency_ms,
+    )
+    vector_store_module._global_instance_vector_store = (
+        vector_store_module.open_vector_store(embeddings)
+    )
+
+    llm = FakeChatModel(
+        latency_ms=args.llm_latency_ms,
+        per_prompt_token_latency_ms=args.llm_per_prompt_token_latency_ms,
+        per_token_latency_ms=args.llm_per_token_latency_ms,
+        answer_tokens=args.answer_tokens,
+    )
+    rag_chain.combine_docs_chain = create_stuff_documents_chain(
+        llm=llm, prompt=rag_chain.prompt
+    )
+    return llm
+
+
+async def main(args):
+    report = {
+        'benchmark': 'end_to_end',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': _git_commit(),
+        'params': vars(args),
+    }
+
+    db_name = generate_test_db_name()
+    create_test_database(settings.DATABASE_URL, db_name)
+    engine = create_async_engine(
+        get_test_db_url(settings.DATABASE_URL, db_name)
+    )
+    session_factory = sessionmaker(
+        bind=engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async def override_get_async_session():
+        async with session_factory() as session:
+            yield session
+
+    pool = ingestion.IngestionWorkerPool(
+        concurrency=max(settings.INGESTION_WORKER_CONCURRENCY, 1),
+        poll_interval=settings.INGESTION_POLL_INTERVAL_SECONDS,
+        batch_size=settings.INGESTION_BATCH_MAX_JOBS,
+        session_factory=session_factory,
+    )
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            llm = _configure(args, workdir)
+            async with engine.begin() as conn:
+                await conn.run_sync(table_registry.metadata.create_all)
+
+            app.dependency_overrides[get_async_session] = (
+                override_get_async_session
+            )
+            ingestion._global_instance_ingestion_pool = pool
+            pool.start()
+
+            transport = ASGITransport(app=app)
+            async with AsyncClient(
+                transport=transport,
+                base_url='http://benchmark',
+                headers={API_KEY_NAME: settings.API_KEY},
+                timeout=None,
+            ) as client:
+                report['ingest'] = await run_ingest(
+                    client, session_factory, args
+                )
+                report['ask'] = [
+                    await run_ask(client, llm, args.questions, concurrency)
+                    for concurrency in args.concurrency
+                ]
+
+            await pool.stop()
+            ingestion._global_instance_ingestion_pool = None
+            process.shutdown_process_pool()
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+        drop_test_database(settings.DATABASE_URL, db_name)
+
+    report['peak_rss_mb'] = {
+        'api_process': _peak_rss_mb(resource.RUSAGE_SELF),
+        'pdf_workers': _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--pdfs', type=int, default=20)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--words-per-page', type=int, default=400)
+    parser.add_argument('--files-per-request', type=int, default=5)
+    parser.add_argument('--questions', type=int, default=200)
+    parser.add_argument(
+        '--concurrency', type=int, nargs='+', default=[1, 8, 32]
+    )
+    parser.add_argument(
+        '--vector-backend',
+        choices=['chroma', 'numpy'],
+        default=settings.VECTOR_BACKEND,
+    )
+    parser.add_argument(
+        '--answer-cache',
+        action='store_true',
+        help='Mantém o cache semântico de respostas ativo',
+    )
+    parser.add_argument(
+        '--context-token-budget',
+        type=int,
+        default=settings.CONTEXT_TOKEN_BUDGET,
+        help='Tokens dos chunks no prompt (0 = sem limite)',
+    )
+    parser.add_argument(
+        '--no-merge-chunks',
+        action='store_true',
+        help='Não une chunks sobrepostos no contexto',
+    )
+    parser.add_argument('--dimensions', type=int, default=1536)
+    parser.add_argument('--embedding-latency-ms', type=float, default=50.0)
+    parser.add_argument(
+        '--embedding-per-item-latency-ms', type=float, default=0.5
+    )
+    parser.add_argument(
+        '--llm-latency-ms',
+        type=float,
+        default=300.0,
+        help='Tempo até o primeiro token',
+    )
+    parser.add_argument(
+        '--llm-per-prompt-token-latency-ms',
+        type=float,
+        default=0.1,
+        help='Custo de cada token do prompt no tempo até o primeiro token',
+    )
+    parser.add_argument('--llm-per-token-latency-ms', type=float, default=10.0)
+    parser.add_argument('--answer-tokens', type=int, default=50)
+    parser.add_argument(
+        '--output', help='Arquivo onde gravar o JSON do resultado'
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import (
+    ChatGeneration,
+    ChatGenerationChunk,
+    ChatResult,
+)
+
+from rag.tokens import count_tokens
+
+
+def hash_embedding(text: str, dimensions: int) -> List[float]:
+    """Vetor unitário determinístico derivado do sha256 do texto."""
+    seed = int.from_bytes(
+        hashlib.sha256(text.encode('utf-8')).digest()[:8], 'big'
+    )
+    vector = np.random.default_rng(seed).standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Backend de embeddings falso com latência configurável.
+
+    Cada chamada custa `latency_ms` mais `per_item_latency_ms` por texto,
+    simulando o overhead fixo de uma requisição HTTP à API de embeddings.
+    `max_concurrency` limita as requisições simultâneas, como o pool de
+    conexões do cliente e o rate limit da API fazem na prática.
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 1536,
+        latency_ms: float = 0.0,
+        per_item_latency_ms: float = 0.0,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.dimensions = dimensions
+        self.latency_ms = latency_ms
+        self.per_item_latency_ms = per_item_latency_ms
+        self.max_concurrency = max_concurrency
+        self.calls = 0
+        self.texts_embedded = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _latency_seconds(self, count: int) -> float:
+        return (self.latency_ms + self.per_item_latency_ms * count) / 1000
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts_embedded += len(texts)
+        return [hash_embedding(text, self.dimensions) for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self._latency_seconds(len(texts)))
+        return self._embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.max_concurrency is None:
+            await asyncio.sleep(self._latency_seconds(len(texts)))
+            return self._embed(texts)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            await asyncio.sleep(self._latency_seconds(len(texts)))
+        return self._embed(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    LLM falso com latência configurável e resposta determinística.
+
+    A resposta tem `answer_tokens` tokens; o primeiro chega após
+    `latency_ms` mais `per_prompt_token_latency_ms` por token do prompt
+    (processamento da entrada) e cada um dos seguintes após
+    `per_token_latency_ms`, simulando o tempo até o primeiro token e a
+    velocidade de geração. `calls`, `prompt_tokens` e `llm_seconds`
+    acumulam as chamadas recebidas.
+    """
+
+    latency_ms: float = 0.0
+    per_prompt_token_latency_ms: float = 0.0
+    per_token_latency_ms: float = 0.0
+    answer_tokens: int = 50
+    calls: int = 0
+    prompt_tokens: int = 0
+    llm_seconds: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return 'fake-chat'
+
+    def _tokens(self) -> List[str]:
+        return [f'palavra{i} ' for i in range(self.answer_tokens)]
+
+    def _count_prompt(self, messages: List[BaseMessage]) -> int:
+        prompt_tokens = sum(
+            count_tokens(str(message.content)) for message in messages
+        )
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        return prompt_tokens
+
+    def _first_token_seconds(self, prompt_tokens: int) -> float:
+        return (
+            self.latency_ms + self.per_prompt_token_latency_ms * prompt_tokens
+        ) / 1000
+
+    def _total_seconds(self, prompt_tokens: int) -> float:
+        seconds = (
+            self._first_token_seconds(prompt_tokens)
+            + self.per_token_latency_ms * max(self.answer_tokens - 1, 0) / 1000
+        )
+        self.llm_seconds += seconds
+        return seconds
+
+    def _result(self, prompt_tokens: int) -> ChatResult:
+        message = AIMessage(
+            content=''.join(self._tokens()),
+            usage_metadata={
+                'input_tokens': prompt_tokens,
+                'output_tokens': self.answer_tokens,
+                'total_tokens': prompt_tokens + self.answer_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop=None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt_tokens = self._count_prompt(messages)
+        time.sleep(self._total_seconds(prompt_tokens))
+        return self._result(prompt_tokens)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop=None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt_tokens = self._count_prompt(messages)
+        await asyncio.sleep(self._total_seconds(prompt_tokens))
+        return self._result(prompt_tokens)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop=None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        prompt_tokens = self._count_prompt(messages)
+        self._total_seconds(prompt_tokens)
+        for i, token in enumerate(self._tokens()):
+            time.sleep(
+                self._first_token_seconds(prompt_tokens)
+                if i == 0
+                else self.per_token_latency_ms / 1000
+            )
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop=None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        prompt_tokens = self._count_prompt(messages)
+        self._total_seconds(prompt_tokens)
+        for i, token in enumerate(self._tokens()):
+            await asyncio.sleep(
+                self._first_token_seconds(prompt_tokens)
+                if i == 0
+                else self.per_token_latency_ms / 1000
+            )
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
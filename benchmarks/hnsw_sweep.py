@@ -0,0 +1,255 @@
+"""
+Varredura de parâmetros do índice HNSW do Chroma: recall@k vs. latência.
+
+Para cada combinação de `--space`, `--m` e `--ef-construction` uma coleção é
+construída em um diretório temporário; para cada `--ef-search` são feitas
+`--queries` buscas top-k em um processo novo (o Chroma só aplica um novo
+`ef_search` ao carregar o índice). O recall@k é calculado contra a busca exata
+(força bruta em NumPy) e o relatório traz latência p50/p99, tempo de
+construção e tamanho do índice em disco.
+
+O corpus é sintético (vetores agrupados em torno de `--clusters` centros,
+como embeddings de documentos sobre poucos assuntos) ou um arquivo `.npy`
+exportado da coleção configurada:
+
+    python -m benchmarks.hnsw_sweep --export-corpus corpus.npy
+    python -m benchmarks.hnsw_sweep --corpus corpus.npy --m 8 16 32 --ef-search 10 50 100
+
+As perguntas são vetores do corpus com ruído (`--noise`).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from benchmarks.vector_backends import _run_in_process
+
+BATCH_SIZE = 1000
+
+
+def synthetic_corpus(
+    chunks: int, dimensions: int, clusters: int, seed: int = 0
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimensions))
+    vectors = centers[
+        rng.integers(clusters, size=chunks)
+    ] + 0.8 * rng.standard_normal((chunks, dimensions))
+    return _normalize(vectors)
+
+
+def export_corpus(path: str):
+    """Grava os embeddings da coleção configurada em um arquivo `.npy`."""
+    from rag.vector_store import get_vector_store
+
+    collection = get_vector_store()._collection
+    batches, offset = [], 0
+    while True:
+        result = collection.get(
+            include=['embeddings'], limit=BATCH_SIZE, offset=offset
+        )
+        if len(result['ids']) == 0:
+            break
+        batches.append(np.asarray(result['embeddings'], dtype=np.float32))
+        offset += len(result['ids'])
+    np.save(
+        path,
+        np.concatenate(batches)
+        if batches
+        else np.zeros((0, 0), dtype=np.float32),
+    )
+    print(f'Exported {offset} embeddings to {path}')
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _query_vectors(
+    corpus: np.ndarray, queries: int, noise: float
+) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    base = corpus[rng.integers(len(corpus), size=queries)]
+    return _normalize(
+        base
+        + noise * rng.standard_normal(base.shape) / np.sqrt(corpus.shape[1])
+    )
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Vizinhos exatos; com vetores normalizados a ordem é a mesma em l2, cosine e ip."""
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(
+        top,
+        np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1),
+        axis=1,
+    )
+
+
+def _disk_mb(path: str) -> float:
+    size = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+    return round(size / (1024 * 1024), 1)
+
+
+def _build(
+    path: str,
+    corpus: np.ndarray,
+    space: str,
+    m: int,
+    ef_construction: int,
+    results,
+):
+    client = chromadb.PersistentClient(path=path)
+    collection = client.create_collection(
+        'sweep',
+        configuration={
+            'hnsw': {
+                'space': space,
+                'max_neighbors': m,
+                'ef_construction': ef_construction,
+            }
+        },
+    )
+    start = time.perf_counter()
+    for batch_start in range(0, len(corpus), BATCH_SIZE):
+        batch = corpus[batch_start : batch_start + BATCH_SIZE]
+        collection.add(
+            ids=[str(i) for i in range(batch_start, batch_start + len(batch))],
+            embeddings=batch,
+        )
+    results.put(round(time.perf_counter() - start, 2))
+
+
+def _query(
+    path: str,
+    ef_search: int,
+    queries: np.ndarray,
+    expected: np.ndarray,
+    k: int,
+    results,
+):
+    collection = chromadb.PersistentClient(path=path).get_collection('sweep')
+    collection.modify(configuration={'hnsw': {'ef_search': ef_search}})
+    results.put(_measure(collection, queries, expected, k))
+
+
+def _measure(
+    collection, queries: np.ndarray, expected: np.ndarray, k: int
+) -> dict:
+    collection.query(
+        query_embeddings=queries[:1], n_results=k, include=[]
+    )  # aquecimento
+
+    latencies, hits = [], 0
+    for query, expected_rows in zip(queries, expected):
+        start = time.perf_counter()
+        result = collection.query(
+            query_embeddings=query[None, :], n_results=k, include=[]
+        )
+        latencies.append(time.perf_counter() - start)
+        hits += len(
+            {int(row) for row in result['ids'][0]}
+            & set(expected_rows.tolist())
+        )
+
+    latencies.sort()
+    return {
+        f'recall_at_{k}': round(hits / expected.size, 4),
+        'latency_p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'latency_p99_ms': round(
+            latencies[int(len(latencies) * 0.99) - 1] * 1000, 2
+        ),
+    }
+
+
+def main(args):
+    if args.export_corpus:
+        export_corpus(args.export_corpus)
+        return
+
+    if args.corpus:
+        corpus = _normalize(np.load(args.corpus))
+    else:
+        corpus = synthetic_corpus(args.chunks, args.dimensions, args.clusters)
+    queries = _query_vectors(corpus, args.queries, args.noise)
+    expected = exact_top_k(corpus, queries, args.k)
+
+    params = {
+        **vars(args),
+        'chunks': len(corpus),
+        'dimensions': corpus.shape[1],
+    }
+    report = {'benchmark': 'hnsw_sweep', 'params': params, 'results': []}
+
+    for space in args.space:
+        for m in args.m:
+            for ef_construction in args.ef_construction:
+                with tempfile.TemporaryDirectory() as path:
+                    build_seconds = _run_in_process(
+                        _build, path, corpus, space, m, ef_construction
+                    )
+                    for ef_search in args.ef_search:
+                        result = {
+                            'space': space,
+                            'm': m,
+                            'ef_construction': ef_construction,
+                            'ef_search': ef_search,
+                            **_run_in_process(
+                                _query,
+                                path,
+                                ef_search,
+                                queries,
+                                expected,
+                                args.k,
+                            ),
+                            'build_seconds': build_seconds,
+                        }
+                        result['index_mb'] = _disk_mb(path)
+                        report['results'].append(result)
+                        print(json.dumps(result), flush=True)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--corpus',
+        help='Arquivo .npy com os embeddings (padrão: corpus sintético)',
+    )
+    parser.add_argument(
+        '--export-corpus',
+        help='Exporta os embeddings da coleção configurada para este arquivo .npy',
+    )
+    parser.add_argument('--chunks', type=int, default=20000)
+    parser.add_argument('--dimensions', type=int, default=1536)
+    parser.add_argument('--clusters', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--noise', type=float, default=0.5)
+    parser.add_argument(
+        '--space', nargs='+', choices=['l2', 'cosine', 'ip'], default=['l2']
+    )
+    parser.add_argument('--m', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument(
+        '--ef-construction', type=int, nargs='+', default=[100, 200]
+    )
+    parser.add_argument(
+        '--ef-search', type=int, nargs='+', default=[10, 50, 100, 200]
+    )
+    main(parser.parse_args())
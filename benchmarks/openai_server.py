@@ -0,0 +1,389 @@
+"""
+Servidor local compatível com a API da OpenAI, para testes de carga.
+
+Implementa `POST /v1/chat/completions` (com e sem streaming) e
+`POST /v1/embeddings`, com respostas determinísticas: os embeddings são
+derivados do sha256 do texto e a resposta do chat, da última mensagem.
+
+Perfis de produção são reproduzidos com:
+- distribuições de latência (`fixed:MS`, `uniform:MIN,MAX`, `normal:MÉDIA,DESVIO`
+  ou `lognormal:MEDIANA,SIGMA`, em milissegundos) para o tempo até o primeiro
+  token do chat e para cada requisição de embeddings
+- velocidade de geração do chat (`--tokens-per-second`)
+- limite de tokens por minuto (`--tpm-limit`), respondendo 429 como a OpenAI
+- falhas aleatórias 429 e 5xx (`--error-rate-429`, `--error-rate-5xx`)
+
+Uso:
+    python -m benchmarks.openai_server --port 8100 --chat-latency lognormal:400,0.5 \\
+        --tokens-per-second 60 --error-rate-429 0.01
+    OPENAI_BASE_URL=http://localhost:8100/v1 uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import time
+import uuid
+from typing import AsyncIterator, List, Optional, Union
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.fakes import hash_embedding
+
+WORDS = (
+    'o projeto utiliza python fastapi e postgres para entregar uma api com '
+    'baixa latência alta disponibilidade e testes automatizados em produção'
+).split()
+
+
+class LatencyDistribution:
+    """Distribuição de latência em milissegundos, a partir de `tipo:parâmetros`."""
+
+    KINDS = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+
+    def __init__(self, spec: str):
+        kind, _, raw_params = spec.partition(':')
+        if kind not in self.KINDS:
+            raise ValueError(f'Unknown latency distribution: {spec!r}.')
+        params = [float(value) for value in raw_params.split(',') if value]
+        if len(params) != self.KINDS[kind]:
+            raise ValueError(
+                f'{kind} expects {self.KINDS[kind]} parameter(s): {spec!r}.'
+            )
+        self.spec = spec
+        self.kind = kind
+        self.params = params
+
+    def sample_seconds(self, rng: random.Random) -> float:
+        if self.kind == 'fixed':
+            value = self.params[0]
+        elif self.kind == 'uniform':
+            value = rng.uniform(*self.params)
+        elif self.kind == 'normal':
+            value = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = rng.lognormvariate(math.log(median), sigma)
+        return max(value, 0.0) / 1000
+
+    def __repr__(self) -> str:
+        return self.spec
+
+
+class TokenBucket:
+    """Limite de tokens por minuto (entrada + saída), reabastecido continuamente."""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self.tokens = float(tokens_per_minute)
+        self.updated_at = time.monotonic()
+
+    def try_consume(self, tokens: int) -> Optional[float]:
+        """Consome `tokens`; sem saldo, retorna os segundos até haver saldo."""
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.updated_at) * self.capacity / 60,
+        )
+        self.updated_at = now
+        if tokens <= self.tokens:
+            self.tokens -= tokens
+            return None
+        return (tokens - self.tokens) * 60 / self.capacity
+
+
+def estimate_tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+def _error(
+    status_code: int,
+    error_type: str,
+    message: str,
+    retry_after: Optional[float] = None,
+) -> JSONResponse:
+    headers = (
+        {'retry-after': f'{math.ceil(retry_after)}'}
+        if retry_after is not None
+        else None
+    )
+    return JSONResponse(
+        status_code=status_code,
+        content={
+            'error': {
+                'message': message,
+                'type': error_type,
+                'param': None,
+                'code': error_type,
+            }
+        },
+        headers=headers,
+    )
+
+
+def _embedding_key(item: Union[str, List[int]]) -> str:
+    # Com `check_embedding_ctx_length`, o cliente envia listas de tokens em vez de texto
+    return (
+        item
+        if isinstance(item, str)
+        else ','.join(str(token) for token in item)
+    )
+
+
+def create_app(args) -> FastAPI:
+    app = FastAPI(title='OpenAI stand-in')
+    rng = random.Random(args.seed)
+    bucket = TokenBucket(args.tpm_limit) if args.tpm_limit else None
+    stats = {'requests': 0, 'errors_429': 0, 'errors_5xx': 0, 'throttled': 0}
+
+    def injected_fault(tokens: int) -> Optional[JSONResponse]:
+        stats['requests'] += 1
+        draw = rng.random()
+        if draw < args.error_rate_429:
+            stats['errors_429'] += 1
+            return _error(
+                429,
+                'rate_limit_exceeded',
+                'Rate limit reached (injected).',
+                args.retry_after,
+            )
+        if draw < args.error_rate_429 + args.error_rate_5xx:
+            stats['errors_5xx'] += 1
+            return _error(
+                rng.choice([500, 502, 503]),
+                'server_error',
+                'The server had an error (injected).',
+            )
+        if bucket is not None:
+            wait_seconds = bucket.try_consume(tokens)
+            if wait_seconds is not None:
+                stats['throttled'] += 1
+                return _error(
+                    429,
+                    'rate_limit_exceeded',
+                    'Rate limit reached for tokens per min (TPM).',
+                    wait_seconds,
+                )
+        return None
+
+    def answer_tokens(
+        messages: List[dict], max_tokens: Optional[int]
+    ) -> List[str]:
+        last = str(messages[-1].get('content', '')) if messages else ''
+        answer_rng = random.Random(
+            hashlib.sha256(last.encode('utf-8')).digest()
+        )
+        count = min(args.answer_tokens, max_tokens or args.answer_tokens)
+        return [answer_rng.choice(WORDS) + ' ' for _ in range(count)]
+
+    @app.get('/v1/models')
+    async def models():
+        return {
+            'object': 'list',
+            'data': [
+                {'id': args.model, 'object': 'model', 'owned_by': 'stand-in'}
+            ],
+        }
+
+    @app.get('/stats')
+    async def get_stats():
+        return stats
+
+    @app.post('/v1/chat/completions')
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get('messages', [])
+        prompt_tokens = sum(
+            estimate_tokens(str(message.get('content', '')))
+            for message in messages
+        )
+        tokens = answer_tokens(
+            messages,
+            body.get('max_tokens') or body.get('max_completion_tokens'),
+        )
+
+        fault = injected_fault(prompt_tokens + len(tokens))
+        if fault is not None:
+            return fault
+
+        completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+        created = int(time.time())
+        model = body.get('model', args.model)
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': len(tokens),
+            'total_tokens': prompt_tokens + len(tokens),
+        }
+        first_token_seconds = args.chat_latency.sample_seconds(rng)
+        token_seconds = (
+            1 / args.tokens_per_second if args.tokens_per_second else 0.0
+        )
+
+        if not body.get('stream'):
+            await asyncio.sleep(
+                first_token_seconds + token_seconds * max(len(tokens) - 1, 0)
+            )
+            return {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [
+                    {
+                        'index': 0,
+                        'message': {
+                            'role': 'assistant',
+                            'content': ''.join(tokens),
+                        },
+                        'finish_reason': 'stop',
+                    }
+                ],
+                'usage': usage,
+            }
+
+        include_usage = (body.get('stream_options') or {}).get(
+            'include_usage', False
+        )
+
+        def chunk(choices: List[dict], **extra) -> str:
+            data = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': choices,
+                **extra,
+            }
+            return f'data: {json.dumps(data)}\n\n'
+
+        def delta(content: dict, finish_reason: Optional[str] = None) -> str:
+            return chunk([
+                {'index': 0, 'delta': content, 'finish_reason': finish_reason}
+            ])
+
+        async def events() -> AsyncIterator[str]:
+            await asyncio.sleep(first_token_seconds)
+            yield delta({'role': 'assistant', 'content': ''})
+            for i, token in enumerate(tokens):
+                if i:
+                    await asyncio.sleep(token_seconds)
+                yield delta({'content': token})
+            yield delta({}, 'stop')
+            if include_usage:
+                yield chunk([], usage=usage)
+            yield 'data: [DONE]\n\n'
+
+        return StreamingResponse(events(), media_type='text/event-stream')
+
+    @app.post('/v1/embeddings')
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body['input']
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        keys = [_embedding_key(item) for item in inputs]
+        prompt_tokens = sum(
+            estimate_tokens(key) if isinstance(item, str) else len(item)
+            for key, item in zip(keys, inputs)
+        )
+
+        fault = injected_fault(prompt_tokens)
+        if fault is not None:
+            return fault
+
+        await asyncio.sleep(
+            args.embedding_latency.sample_seconds(rng)
+            + args.embedding_per_item_ms * len(inputs) / 1000
+        )
+
+        dimensions = body.get('dimensions') or args.dimensions
+        data = []
+        for index, key in enumerate(keys):
+            vector = hash_embedding(key, dimensions)
+            if body.get('encoding_format') == 'base64':
+                vector = base64.b64encode(
+                    np.asarray(vector, dtype='<f4').tobytes()
+                ).decode()
+            data.append({
+                'object': 'embedding',
+                'index': index,
+                'embedding': vector,
+            })
+
+        return {
+            'object': 'list',
+            'data': data,
+            'model': body.get('model', 'text-embedding-3-small'),
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'total_tokens': prompt_tokens,
+            },
+        }
+
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--model', default='gpt-4o-mini')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--chat-latency',
+        type=LatencyDistribution,
+        default=LatencyDistribution('fixed:300'),
+        help='Tempo até o primeiro token do chat',
+    )
+    parser.add_argument(
+        '--tokens-per-second',
+        type=float,
+        default=50.0,
+        help='Velocidade de geração do chat (0 = sem limite)',
+    )
+    parser.add_argument('--answer-tokens', type=int, default=80)
+    parser.add_argument(
+        '--embedding-latency',
+        type=LatencyDistribution,
+        default=LatencyDistribution('fixed:50'),
+        help='Latência de cada requisição de embeddings',
+    )
+    parser.add_argument('--embedding-per-item-ms', type=float, default=0.2)
+    parser.add_argument(
+        '--dimensions',
+        type=int,
+        default=1536,
+        help='Dimensão quando a requisição não define',
+    )
+    parser.add_argument(
+        '--tpm-limit',
+        type=int,
+        default=0,
+        help='Tokens por minuto (0 = sem limite)',
+    )
+    parser.add_argument('--error-rate-429', type=float, default=0.0)
+    parser.add_argument('--error-rate-5xx', type=float, default=0.0)
+    parser.add_argument(
+        '--retry-after',
+        type=float,
+        default=1.0,
+        help='Retry-After (s) dos 429 injetados',
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    uvicorn.run(
+        create_app(args), host=args.host, port=args.port, log_level='warning'
+    )
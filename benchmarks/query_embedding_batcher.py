@@ -0,0 +1,120 @@
+"""
+Benchmark do QueryEmbeddingBatcher contra um backend de embeddings falso.
+
+Compara perguntas concorrentes embutidas uma a uma (uma requisição por
+pergunta) com as mesmas perguntas agrupadas pelo micro-batcher.
+
+Uso:
+    python -m benchmarks.query_embedding_batcher --queries 500 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from benchmarks.fakes import FakeEmbeddings
+from rag.vector_store import QueryEmbeddingBatcher
+
+
+async def _run(embed, queries: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(index: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await embed(f'Pergunta de teste número {index}')
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(queries)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'total_seconds': round(elapsed, 3),
+        'queries_per_second': round(queries / elapsed, 1),
+        'latency_p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'latency_p99_ms': round(
+            latencies[int(len(latencies) * 0.99) - 1] * 1000, 2
+        ),
+    }
+
+
+async def main(args):
+    def backend():
+        return FakeEmbeddings(
+            dimensions=args.dimensions,
+            latency_ms=args.latency_ms,
+            per_item_latency_ms=args.per_item_latency_ms,
+            max_concurrency=args.backend_concurrency,
+        )
+
+    unbatched_backend = backend()
+    unbatched = await _run(
+        unbatched_backend.aembed_query, args.queries, args.concurrency
+    )
+    unbatched['backend_calls'] = unbatched_backend.calls
+
+    batched_backend = backend()
+    batcher = QueryEmbeddingBatcher(
+        embeddings=batched_backend,
+        max_wait_ms=args.wait_ms,
+        max_batch_size=args.max_batch_size,
+    )
+    batched = await _run(batcher.embed, args.queries, args.concurrency)
+    batched['backend_calls'] = batched_backend.calls
+    batched['mean_batch_size'] = round(args.queries / batcher.batches, 1)
+
+    print(
+        json.dumps(
+            {
+                'benchmark': 'query_embedding_batcher',
+                'params': vars(args),
+                'unbatched': unbatched,
+                'batched': batched,
+                'speedup': round(
+                    unbatched['total_seconds'] / batched['total_seconds'], 2
+                ),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument(
+        '--latency-ms',
+        type=float,
+        default=80.0,
+        help='Latência fixa por requisição ao backend',
+    )
+    parser.add_argument(
+        '--per-item-latency-ms',
+        type=float,
+        default=0.05,
+        help='Latência adicional por texto',
+    )
+    parser.add_argument(
+        '--backend-concurrency',
+        type=int,
+        default=8,
+        help='Requisições simultâneas aceitas pelo backend',
+    )
+    parser.add_argument('--dimensions', type=int, default=1536)
+    parser.add_argument(
+        '--wait-ms',
+        type=float,
+        default=5.0,
+        help='Janela de agrupamento do batcher',
+    )
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    asyncio.run(main(parser.parse_args()))
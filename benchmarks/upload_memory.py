@@ -0,0 +1,125 @@
+"""
+Pico de memória por upload: leitura em streaming vs. leitura completa.
+
+Compara `receive_pdf_uploads` (streaming, com spool em disco) com o caminho
+antigo, que carregava o formulário, lia o arquivo inteiro para validar o
+tamanho e o lia novamente para o processamento.
+
+Uso:
+    python -m benchmarks.upload_memory --size-mb 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tracemalloc
+
+from starlette.requests import Request
+
+from app.utils.uploads import receive_pdf_uploads
+
+BOUNDARY = 'benchmark-boundary'
+CHUNK_SIZE = 64 * 1024
+
+
+def _build_body(size_mb: float) -> bytes:
+    content = os.urandom(int(size_mb * 1024 * 1024))
+    return (
+        (
+            f'--{BOUNDARY}\r\n'
+            'Content-Disposition: form-data; name="files"; filename="bench.pdf"\r\n'
+            'Content-Type: application/pdf\r\n\r\n'
+        ).encode()
+        + content
+        + f'\r\n--{BOUNDARY}--\r\n'.encode()
+    )
+
+
+def _build_request(body: bytes) -> Request:
+    offsets = iter(range(0, len(body), CHUNK_SIZE))
+
+    async def receive():
+        offset = next(offsets, None)
+        if offset is None:
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        end = offset + CHUNK_SIZE
+        return {
+            'type': 'http.request',
+            'body': body[offset:end],
+            'more_body': end < len(body),
+        }
+
+    return Request(
+        {
+            'type': 'http',
+            'method': 'POST',
+            'headers': [
+                (
+                    b'content-type',
+                    f'multipart/form-data; boundary={BOUNDARY}'.encode(),
+                ),
+                (b'content-length', str(len(body)).encode()),
+            ],
+        },
+        receive,
+    )
+
+
+async def _streaming(body: bytes, spool_max_size_mb: float):
+    uploads = await receive_pdf_uploads(
+        _build_request(body),
+        max_file_size_mb=1024,
+        max_upload_size_mb=1024,
+        spool_max_size_mb=spool_max_size_mb,
+    )
+    for upload in uploads:
+        upload.close()
+
+
+async def _full_read(body: bytes):
+    form = await _build_request(body).form()
+    file = form['files']
+    content = await file.read()  # validação de tamanho
+    await file.seek(0)
+    content = await file.read()  # leitura para o processamento
+    await form.close()
+    return len(content)
+
+
+async def _peak_mb(coroutine) -> float:
+    tracemalloc.start()
+    await coroutine
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / (1024 * 1024), 2)
+
+
+async def main(args):
+    body = _build_body(args.size_mb)
+
+    print(
+        json.dumps(
+            {
+                'benchmark': 'upload_memory',
+                'params': vars(args),
+                'peak_mb': {
+                    'full_read': await _peak_mb(_full_read(body)),
+                    'streaming': await _peak_mb(
+                        _streaming(body, args.spool_max_size_mb)
+                    ),
+                },
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--size-mb', type=float, default=10.0)
+    parser.add_argument('--spool-max-size-mb', type=float, default=1.0)
+    asyncio.run(main(parser.parse_args()))
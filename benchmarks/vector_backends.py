@@ -0,0 +1,151 @@
+"""
+Latência de busca e memória dos backends de vetores: Chroma vs. numpy.
+
+Cada backend é populado com `--chunks` vetores aleatórios e depois aberto em
+um processo novo, que mede o RSS após abrir o índice e após as buscas e a
+latência de `--queries` buscas top-k. Os embeddings vêm de um backend falso
+(sem chamadas à OpenAI).
+
+Uso:
+    python -m benchmarks.vector_backends --chunks 20000 --queries 500
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeEmbeddings, hash_embedding
+from rag.numpy_store import NumpyVectorStore
+
+BATCH_SIZE = 1000
+
+
+def _rss_mb() -> float:
+    with open('/proc/self/status', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return round(int(line.split()[1]) / 1024, 1)
+    return 0.0
+
+
+def _open_store(backend: str, path: str, dimensions: int):
+    embeddings = FakeEmbeddings(dimensions=dimensions)
+    if backend == 'numpy':
+        return NumpyVectorStore(path=path, embedding_function=embeddings)
+    return Chroma(persist_directory=path, embedding_function=embeddings)
+
+
+def _populate(backend: str, path: str, chunks: int, dimensions: int):
+    store = _open_store(backend, path, dimensions)
+    for start in range(0, chunks, BATCH_SIZE):
+        end = min(start + BATCH_SIZE, chunks)
+        store.add_documents(
+            [
+                Document(
+                    page_content=f'Chunk de teste {i}', metadata={'page': i}
+                )
+                for i in range(start, end)
+            ],
+            ids=[f'chunk_{i}' for i in range(start, end)],
+        )
+
+
+def _query(
+    backend: str, path: str, queries: int, k: int, dimensions: int, results
+):
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    store = _open_store(backend, path, dimensions)
+    open_seconds = time.perf_counter() - start
+    rss_open = _rss_mb()
+
+    vectors = [
+        hash_embedding(f'Pergunta {i}', dimensions) for i in range(queries)
+    ]
+    store.similarity_search_by_vector(vectors[0], k=k)  # aquecimento
+
+    latencies = []
+    for vector in vectors:
+        start = time.perf_counter()
+        store.similarity_search_by_vector(vector, k=k)
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    results.put({
+        'open_seconds': round(open_seconds, 3),
+        'latency_p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'latency_p99_ms': round(
+            latencies[int(len(latencies) * 0.99) - 1] * 1000, 2
+        ),
+        'queries_per_second': round(len(latencies) / sum(latencies), 1),
+        'rss_before_open_mb': rss_before,
+        'rss_after_open_mb': rss_open,
+        'rss_after_queries_mb': _rss_mb(),
+    })
+
+
+def _run_in_process(target, *args):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=target, args=(*args, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def _build(backend, path, chunks, dimensions, results):
+    start = time.perf_counter()
+    _populate(backend, path, chunks, dimensions)
+    results.put(round(time.perf_counter() - start, 2))
+
+
+def main(args):
+    report = {'benchmark': 'vector_backends', 'params': vars(args)}
+
+    for backend in args.backends:
+        with tempfile.TemporaryDirectory() as path:
+            build_seconds = _run_in_process(
+                _build, backend, path, args.chunks, args.dimensions
+            )
+            result = _run_in_process(
+                _query, backend, path, args.queries, args.k, args.dimensions
+            )
+            result['build_seconds'] = build_seconds
+            result['disk_mb'] = round(
+                sum(
+                    os.path.getsize(os.path.join(root, name))
+                    for root, _, names in os.walk(path)
+                    for name in names
+                )
+                / (1024 * 1024),
+                1,
+            )
+            report[backend] = result
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--chunks', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--dimensions', type=int, default=1536)
+    parser.add_argument(
+        '--backends',
+        nargs='+',
+        choices=['chroma', 'numpy'],
+        default=['chroma', 'numpy'],
+    )
+    main(parser.parse_args())
@@ -0,0 +1,163 @@
+"""
+Quantização do índice numpy: memória, latência e recall@k.
+
+Para cada modo (`none`, `float16`, `int8`) o índice é populado com
+`--chunks` vetores e aberto em um processo novo, que mede o RSS e a latência
+de `--queries` buscas top-k. As perguntas são chunks indexados com ruído,
+de modo que cada uma tem vizinhos próximos de verdade; o recall@k de cada
+modo é calculado contra o resultado exato (`none`).
+
+Uso:
+    python -m benchmarks.vector_quantization --chunks 20000 --queries 500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fakes import FakeEmbeddings, hash_embedding
+from benchmarks.vector_backends import BATCH_SIZE, _rss_mb, _run_in_process
+from rag.numpy_store import QUANTIZATIONS, NumpyVectorStore
+
+
+def _open_store(
+    path: str, dimensions: int, quantization: str, rescore_factor: int
+) -> NumpyVectorStore:
+    return NumpyVectorStore(
+        path=path,
+        embedding_function=FakeEmbeddings(dimensions=dimensions),
+        quantization=quantization,
+        rescore_factor=rescore_factor,
+    )
+
+
+def _query_vectors(
+    queries: int, chunks: int, dimensions: int, noise: float
+) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    vectors = np.array([
+        hash_embedding(f'Chunk de teste {rng.integers(chunks)}', dimensions)
+        for _ in range(queries)
+    ])
+    return vectors + noise * rng.standard_normal(vectors.shape) / np.sqrt(
+        dimensions
+    )
+
+
+def _build(path, chunks, dimensions, quantization, rescore_factor, results):
+    start = time.perf_counter()
+    store = _open_store(path, dimensions, quantization, rescore_factor)
+    for batch_start in range(0, chunks, BATCH_SIZE):
+        batch = range(batch_start, min(batch_start + BATCH_SIZE, chunks))
+        store.add_texts(
+            [f'Chunk de teste {i}' for i in batch],
+            ids=[f'chunk_{i}' for i in batch],
+        )
+    results.put(round(time.perf_counter() - start, 2))
+
+
+def _query(path, args, quantization, results):
+    store = _open_store(
+        path, args.dimensions, quantization, args.rescore_factor
+    )
+    rss_open = _rss_mb()
+
+    vectors = _query_vectors(
+        args.queries, args.chunks, args.dimensions, args.noise
+    )
+    store.similarity_search_by_vector(vectors[0], k=args.k)  # aquecimento
+
+    latencies, ids = [], []
+    for vector in vectors:
+        start = time.perf_counter()
+        documents = store.similarity_search_by_vector(vector, k=args.k)
+        latencies.append(time.perf_counter() - start)
+        ids.append([document.id for document in documents])
+
+    latencies.sort()
+    results.put({
+        'latency_p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'latency_p99_ms': round(
+            latencies[int(len(latencies) * 0.99) - 1] * 1000, 2
+        ),
+        'queries_per_second': round(len(latencies) / sum(latencies), 1),
+        'rss_after_open_mb': rss_open,
+        'rss_after_queries_mb': _rss_mb(),
+        'ids': ids,
+    })
+
+
+def _recall(ids, expected_ids) -> float:
+    hits = sum(
+        len(set(found) & set(expected))
+        for found, expected in zip(ids, expected_ids)
+    )
+    return round(hits / sum(len(expected) for expected in expected_ids), 4)
+
+
+def main(args):
+    report = {'benchmark': 'vector_quantization', 'params': vars(args)}
+
+    expected_ids = None
+    for quantization in QUANTIZATIONS:
+        with tempfile.TemporaryDirectory() as path:
+            build_seconds = _run_in_process(
+                _build,
+                path,
+                args.chunks,
+                args.dimensions,
+                quantization,
+                args.rescore_factor,
+            )
+            result = _run_in_process(_query, path, args, quantization)
+            # Bytes por chunk lidos na varredura: a cópia comprimida, ou a matriz float32 sem quantização
+            scanned = [
+                name
+                for name in os.listdir(path)
+                if name.endswith(('.f16', '.i8'))
+            ] or [
+                name
+                for name in os.listdir(path)
+                if name.startswith('embeddings-')
+            ]
+            result['scanned_index_mb'] = round(
+                sum(
+                    os.path.getsize(os.path.join(path, name))
+                    for name in scanned
+                )
+                / (1024 * 1024),
+                1,
+            )
+
+        ids = result.pop('ids')
+        if expected_ids is None:
+            expected_ids = ids
+        result[f'recall_at_{args.k}'] = _recall(ids, expected_ids)
+        result['build_seconds'] = build_seconds
+        report[quantization] = result
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('--chunks', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--dimensions', type=int, default=1536)
+    parser.add_argument('--rescore-factor', type=int, default=4)
+    parser.add_argument(
+        '--noise',
+        type=float,
+        default=1.0,
+        help='Ruído somado aos chunks usados como pergunta',
+    )
+    main(parser.parse_args())
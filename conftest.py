@@ -22,6 +22,14 @@ from app.utils.db import (
     generate_test_db_name,
     get_test_db_url,
 )
+from documents import ingestion as ingestion_module
+from documents import purger as purger_module
+from rag import answer_cache as answer_cache_module
+from rag import bm25_index as bm25_index_module
+from rag import embedding_cache as embedding_cache_module
+from rag import process as process_module
+from rag import rag_chain as rag_chain_module
+from rag import tombstones as tombstones_module
 from rag import vector_store as vector_store_module
 
 TEST_DB_NAME = generate_test_db_name()
@@ -45,9 +53,7 @@ async def engine(test_db):
 @pytest_asyncio.fixture(scope='function')
 async def session(engine):
     AsyncSessionLocal = sessionmaker(
-        bind=engine,
-        class_=AsyncSession,
-        expire_on_commit=False
+        bind=engine, class_=AsyncSession, expire_on_commit=False
     )
 
     async with engine.begin() as conn:
@@ -68,7 +74,9 @@ async def client(session):
     app.dependency_overrides[get_async_session] = override_get_async_session
 
     transport = ASGITransport(app=app)
-    async with AsyncClient(transport=transport, base_url='http://testserver') as client:
+    async with AsyncClient(
+        transport=transport, base_url='http://testserver'
+    ) as client:
         yield client
 
     app.dependency_overrides.clear()
@@ -78,12 +86,19 @@ async def client(session):
 def api_key():
     return settings.API_KEY
 
+
 @pytest.fixture
 def dummy_documents():
     """Fixture que retorna uma lista de documentos LangChain simulados."""
     return [
-        Document(page_content='Este é o primeiro documento.', metadata={'source': 'doc1'}),
-        Document(page_content='Este é o segundo documento, um pouco mais longo para teste.', metadata={'source': 'doc2'}),
+        Document(
+            page_content='Este é o primeiro documento.',
+            metadata={'source': 'doc1'},
+        ),
+        Document(
+            page_content='Este é o segundo documento, um pouco mais longo para teste.',
+            metadata={'source': 'doc2'},
+        ),
     ]
 
 
@@ -94,15 +109,15 @@ def fake_pdf_upload_file():
     """
     pdf = FPDF()
     pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt="Conteúdo de teste do PDF.", ln=1, align='L')
+    pdf.set_font('Arial', size=12)
+    pdf.cell(200, 10, txt='Conteúdo de teste do PDF.', ln=1, align='L')
 
     # output como string (dest='S') e depois converter para bytes
     pdf_content_str = pdf.output(dest='S')
     pdf_bytes = io.BytesIO(pdf_content_str.encode('latin1'))  # fpdf usa latin1
     pdf_bytes.seek(0)
 
-    return StarletteUploadFile(filename="fake_test.pdf", file=pdf_bytes)
+    return StarletteUploadFile(filename='fake_test.pdf', file=pdf_bytes)
 
 
 @pytest.fixture
@@ -125,11 +140,33 @@ def mock_vector_store(mock_retriever):
 @pytest.fixture(autouse=True)
 def reset_vector_store_singleton():
     """
-    Fixture que reseta o singleton da vector store antes e depois de cada teste.
+    Fixture que reseta os singletons (vector store, caches) antes e depois de cada teste.
     `autouse=True` garante que será executado para todos os testes.
     """
     # Antes do teste
     vector_store_module._global_instance_vector_store = None
+    vector_store_module._global_instance_query_batcher = None
+    answer_cache_module._global_instance_answer_cache = None
+    embedding_cache_module._global_instance_embedding_cache = None
+    bm25_index_module._global_instance_bm25_index = None
+    process_module._global_instance_pool_slots = None
+    rag_chain_module._global_instance_batch_llm_slots = None
+    ingestion_module._global_instance_ingestion_pool = None
+    purger_module._global_instance_purger = None
+    tombstones_module._global_instance_tombstones = None
     yield
     # Depois do teste
     vector_store_module._global_instance_vector_store = None
+    vector_store_module._global_instance_query_batcher = None
+    answer_cache_module._global_instance_answer_cache = None
+    embedding_cache_module._global_instance_embedding_cache = None
+    bm25_index_module._global_instance_bm25_index = None
+    tombstones_module._global_instance_tombstones = None
+
+
+@pytest.fixture(autouse=True)
+def isolate_bm25_index(tmp_path, monkeypatch):
+    """Grava o índice BM25 em um diretório temporário durante os testes."""
+    monkeypatch.setattr(
+        settings, 'BM25_INDEX_PATH', str(tmp_path / 'bm25_index.json')
+    )
@@ -0,0 +1,84 @@
+"""
+Consultas à tabela `document_chunks`, que relaciona cada chunk do vector
+store ao seu documento.
+"""
+
+from typing import Dict, Iterable, List
+from uuid import UUID
+
+from langchain_core.documents import Document
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from rag.embedding_cache import content_hash
+
+from .models import DocumentChunk
+
+
+def build_document_chunks(
+    document_id: UUID, chunks: List[Document], chunk_ids: List[str]
+) -> List[DocumentChunk]:
+    return [
+        DocumentChunk(
+            chunk_id=chunk_id,
+            document_id=document_id,
+            ordinal=ordinal,
+            content_hash=content_hash(chunk.page_content),
+            page=chunk.metadata.get('page'),
+            token_count=chunk.metadata.get('token_count'),
+        )
+        for ordinal, (chunk, chunk_id) in enumerate(zip(chunks, chunk_ids))
+    ]
+
+
+async def get_chunk_ids(session: AsyncSession, document_id: UUID) -> List[str]:
+    """Ids dos chunks do documento, na ordem em que aparecem no PDF."""
+    result = await session.execute(
+        select(DocumentChunk.chunk_id)
+        .where(DocumentChunk.document_id == document_id)
+        .order_by(DocumentChunk.ordinal)
+    )
+    return list(result.scalars().all())
+
+
+async def get_chunk_ids_by_document(
+    session: AsyncSession, document_ids: Iterable[UUID]
+) -> Dict[UUID, List[str]]:
+    """Ids dos chunks de vários documentos em uma única consulta."""
+    result = await session.execute(
+        select(DocumentChunk.document_id, DocumentChunk.chunk_id)
+        .where(DocumentChunk.document_id.in_(list(document_ids)))
+        .order_by(DocumentChunk.document_id, DocumentChunk.ordinal)
+    )
+    chunk_ids: Dict[UUID, List[str]] = {}
+    for document_id, chunk_id in result.all():
+        chunk_ids.setdefault(document_id, []).append(chunk_id)
+    return chunk_ids
+
+
+async def get_chunk_counts(
+    session: AsyncSession, document_ids: Iterable[UUID]
+) -> Dict[UUID, int]:
+    """Quantidade de chunks de cada documento, sem carregar os ids."""
+    result = await session.execute(
+        select(DocumentChunk.document_id, func.count())
+        .where(DocumentChunk.document_id.in_(list(document_ids)))
+        .group_by(DocumentChunk.document_id)
+    )
+    return dict(result.all())
+
+
+async def replace_document_chunks(
+    session: AsyncSession,
+    document_id: UUID,
+    chunks: List[Document],
+    chunk_ids: List[str],
+):
+    """
+    Substitui os chunks do documento na sessão; o commit fica a cargo de quem
+    chama, junto com a atualização do documento.
+    """
+    await session.execute(
+        delete(DocumentChunk).where(DocumentChunk.document_id == document_id)
+    )
+    session.add_all(build_document_chunks(document_id, chunks, chunk_ids))
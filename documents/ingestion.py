@@ -0,0 +1,394 @@
+"""
+Fila persistente de indexação de documentos.
+
+O upload grava o documento e sua tarefa de indexação (`IngestionJob`) na
+mesma transação; um pool de workers assíncronos reivindica as tarefas com
+`SELECT ... FOR UPDATE SKIP LOCKED` em lotes, gera os embeddings e grava os
+chunks de vários documentos em uma única escrita no vector store. Falhas são
+reprocessadas com backoff exponencial e uma tarefa cujo worker morreu é
+retomada quando o lease expira.
+
+Para rodar os workers fora do processo da API:
+    python -m documents.ingestion
+"""
+
+import asyncio
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from langchain_core.documents import Document
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.metrics import BACKGROUND_TASK_FAILURES, CHUNKS_INGESTED
+from app.settings import settings
+from rag.vector_store import add_chunks_to_vector_store, delete_chunks_by_ids
+
+from .models import IngestionJob, IngestionStatus
+
+_global_instance_ingestion_pool: Optional['IngestionWorkerPool'] = None
+
+
+def serialize_chunks(
+    chunks: List[Document], chunk_ids: List[str]
+) -> List[dict]:
+    return [
+        {
+            'id': chunk_id,
+            'page_content': chunk.page_content,
+            'metadata': chunk.metadata,
+        }
+        for chunk, chunk_id in zip(chunks, chunk_ids)
+    ]
+
+
+def deserialize_chunks(
+    payload: List[dict],
+) -> Tuple[List[Document], List[str]]:
+    chunks = [
+        Document(page_content=item['page_content'], metadata=item['metadata'])
+        for item in payload
+    ]
+    return chunks, [item['id'] for item in payload]
+
+
+def enqueue_ingestion_job(
+    session: AsyncSession,
+    document_id: UUID,
+    chunks: List[Document],
+    chunk_ids: List[str],
+) -> IngestionJob:
+    """
+    Adiciona a tarefa de indexação à sessão; o commit fica a cargo de quem
+    chama, junto com o registro do documento.
+    """
+    job = IngestionJob(
+        document_id=document_id,
+        payload=serialize_chunks(chunks, chunk_ids),
+    )
+    session.add(job)
+    return job
+
+
+def retry_backoff_seconds(attempts: int) -> float:
+    """Espera antes da próxima tentativa: base * 2^(tentativas - 1), limitada."""
+    delay = settings.INGESTION_RETRY_BACKOFF_SECONDS * 2 ** max(
+        attempts - 1, 0
+    )
+    return min(delay, settings.INGESTION_RETRY_BACKOFF_MAX_SECONDS)
+
+
+async def claim_next_jobs(session: AsyncSession, limit: int = 1):
+    """
+    Reivindica até `limit` tarefas prontas (na fila ou com lease expirado).
+
+    `SKIP LOCKED` deixa cada worker pegar linhas diferentes sem bloquear os
+    demais; o status passa a `embedding` com um lease de
+    `INGESTION_LEASE_SECONDS`.
+    """
+    candidates = (
+        select(IngestionJob.id)
+        .where(
+            IngestionJob.status.in_([
+                IngestionStatus.QUEUED.value,
+                IngestionStatus.EMBEDDING.value,
+            ]),
+            IngestionJob.next_attempt_at <= func.now(),
+        )
+        .order_by(IngestionJob.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+    result = await session.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id.in_(candidates))
+        .values(
+            status=IngestionStatus.EMBEDDING.value,
+            attempts=IngestionJob.attempts + 1,
+            next_attempt_at=func.now()
+            + timedelta(seconds=settings.INGESTION_LEASE_SECONDS),
+            updated_at=func.now(),
+        )
+        .returning(
+            IngestionJob.id,
+            IngestionJob.document_id,
+            IngestionJob.payload,
+            IngestionJob.attempts,
+        )
+    )
+    jobs = result.all()
+    await session.commit()
+    return jobs
+
+
+async def mark_jobs_indexed(
+    session: AsyncSession, job_ids: Iterable[UUID]
+) -> Set[UUID]:
+    """
+    Conclui as tarefas e descarta seus payloads. Retorna os ids das tarefas
+    que ainda existiam (as demais foram removidas junto com o documento).
+    """
+    result = await session.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id.in_(list(job_ids)))
+        .values(
+            status=IngestionStatus.INDEXED.value,
+            payload=None,
+            last_error=None,
+            updated_at=func.now(),
+        )
+        .returning(IngestionJob.id)
+    )
+    updated = set(result.scalars().all())
+    await session.commit()
+    return updated
+
+
+async def mark_job_failed_attempt(
+    session: AsyncSession, job_id: UUID, attempts: int, error: str
+):
+    """Reagenda a tarefa com backoff ou a marca como `failed` na última tentativa."""
+    if attempts >= settings.INGESTION_MAX_ATTEMPTS:
+        values = {'status': IngestionStatus.FAILED.value}
+    else:
+        values = {
+            'status': IngestionStatus.QUEUED.value,
+            'next_attempt_at': func.now()
+            + timedelta(seconds=retry_backoff_seconds(attempts)),
+        }
+
+    await session.execute(
+        update(IngestionJob)
+        .where(IngestionJob.id == job_id)
+        .values(last_error=error, updated_at=func.now(), **values)
+    )
+    await session.commit()
+
+
+class IngestionWorkerPool:
+    """
+    Pool de workers assíncronos que consomem a fila de indexação.
+
+    `concurrency` limita quantos lotes são indexados ao mesmo tempo; cada
+    worker reivindica até `batch_size` tarefas e grava os chunks de todas em
+    uma única escrita no vector store; se ela falhar, cada tarefa é refeita
+    isoladamente e só as que falharem de novo perdem uma tentativa. Sem
+    tarefas prontas, cada worker espera `poll_interval` segundos ou até ser
+    acordado por `notify()` após um novo upload.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        poll_interval: float,
+        batch_size: int = 1,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+
+        self._tasks: List[asyncio.Task] = []
+        # Um evento por worker: quem acorda limpa apenas o seu
+        self._wakeups: List[asyncio.Event] = []
+
+    def start(self):
+        if self._tasks:
+            return
+        self._wakeups = [asyncio.Event() for _ in range(self.concurrency)]
+        self._tasks = [
+            asyncio.create_task(
+                self._worker(wakeup), name=f'ingestion-worker-{i}'
+            )
+            for i, wakeup in enumerate(self._wakeups)
+        ]
+
+    async def stop(self):
+        """
+        Interrompe os workers. Uma tarefa em andamento permanece em `embedding`
+        e é retomada por outro worker quando o lease expira.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeups = []
+
+    def notify(self):
+        for wakeup in self._wakeups:
+            wakeup.set()
+
+    async def run_once(self) -> bool:
+        """Processa um lote de tarefas, se houver. Retorna False quando a fila está vazia."""
+        async with self.session_factory() as session:
+            jobs = await claim_next_jobs(session, limit=self.batch_size)
+
+        if not jobs:
+            return False
+
+        async with self.session_factory() as session:
+            ready = []
+            for job in jobs:
+                if job.attempts > settings.INGESTION_MAX_ATTEMPTS:
+                    # O worker anterior morreu durante a última tentativa
+                    await mark_job_failed_attempt(
+                        session, job.id, job.attempts, 'Worker lease expired.'
+                    )
+                else:
+                    ready.append(job)
+
+            if not ready:
+                return True
+
+            # Uma única escrita no vector store para os chunks de todo o lote
+            payloads = {
+                job.id: deserialize_chunks(job.payload or []) for job in ready
+            }
+            chunks = [
+                chunk
+                for job_chunks, _ in payloads.values()
+                for chunk in job_chunks
+            ]
+            chunk_ids = [
+                chunk_id
+                for _, job_chunk_ids in payloads.values()
+                for chunk_id in job_chunk_ids
+            ]
+
+            try:
+                if chunk_ids:
+                    await add_chunks_to_vector_store(chunks, chunk_ids)
+            except Exception as e:
+                if len(ready) == 1:
+                    await self._record_failure(session, ready[0], e)
+                    return True
+                # Uma tarefa com problema não consome tentativas das demais:
+                # cada uma é refeita isoladamente, com os seus chunks
+                ready = await self._index_separately(session, ready, payloads)
+                if not ready:
+                    return True
+
+            chunk_ids_by_job = {job.id: payloads[job.id][1] for job in ready}
+            CHUNKS_INGESTED.inc(
+                sum(
+                    len(job_chunk_ids)
+                    for job_chunk_ids in chunk_ids_by_job.values()
+                )
+            )
+            indexed = await mark_jobs_indexed(session, chunk_ids_by_job)
+
+            # Documentos removidos durante a indexação: descarta os vetores órfãos
+            orphan_ids = [
+                chunk_id
+                for job_id, job_chunk_ids in chunk_ids_by_job.items()
+                if job_id not in indexed
+                for chunk_id in job_chunk_ids
+            ]
+            if orphan_ids:
+                await delete_chunks_by_ids(orphan_ids)
+
+        return True
+
+    async def _index_separately(
+        self,
+        session: AsyncSession,
+        jobs: List[IngestionJob],
+        payloads: Dict[UUID, Tuple[List[Document], List[str]]],
+    ) -> List[IngestionJob]:
+        """Indexa cada tarefa em uma escrita própria; retorna as que foram indexadas."""
+        indexed = []
+        for job in jobs:
+            job_chunks, job_chunk_ids = payloads[job.id]
+            try:
+                if job_chunk_ids:
+                    await add_chunks_to_vector_store(job_chunks, job_chunk_ids)
+            except Exception as e:
+                await self._record_failure(session, job, e)
+            else:
+                indexed.append(job)
+        return indexed
+
+    @staticmethod
+    async def _record_failure(
+        session: AsyncSession, job: IngestionJob, error: Exception
+    ):
+        print(f'Error indexing document {job.document_id}: {error}')
+        BACKGROUND_TASK_FAILURES.inc(task='ingestion')
+        await mark_job_failed_attempt(
+            session, job.id, job.attempts, str(error)
+        )
+
+    async def _worker(self, wakeup: asyncio.Event):
+        while True:
+            # Limpo antes de consultar a fila: um `notify()` durante o lote
+            # não se perde e o worker volta a consultar sem esperar
+            wakeup.clear()
+            try:
+                found = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'Error in ingestion worker: {e}')
+                BACKGROUND_TASK_FAILURES.inc(task='ingestion')
+                found = False
+
+            if not found:
+                try:
+                    await asyncio.wait_for(
+                        wakeup.wait(), timeout=self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+
+def get_ingestion_pool() -> IngestionWorkerPool:
+    global _global_instance_ingestion_pool
+
+    if _global_instance_ingestion_pool is None:
+        _global_instance_ingestion_pool = IngestionWorkerPool(
+            concurrency=settings.INGESTION_WORKER_CONCURRENCY,
+            poll_interval=settings.INGESTION_POLL_INTERVAL_SECONDS,
+            batch_size=settings.INGESTION_BATCH_MAX_JOBS,
+        )
+    return _global_instance_ingestion_pool
+
+
+def start_ingestion_workers():
+    if settings.INGESTION_WORKER_CONCURRENCY > 0:
+        get_ingestion_pool().start()
+
+
+async def stop_ingestion_workers():
+    global _global_instance_ingestion_pool
+
+    if _global_instance_ingestion_pool is not None:
+        await _global_instance_ingestion_pool.stop()
+        _global_instance_ingestion_pool = None
+
+
+def notify_ingestion_workers():
+    """Acorda os workers locais após enfileirar uma tarefa."""
+    if _global_instance_ingestion_pool is not None:
+        _global_instance_ingestion_pool.notify()
+
+
+async def run_workers():
+    """Executa os workers em um processo dedicado (ao menos um worker)."""
+    pool = IngestionWorkerPool(
+        concurrency=max(settings.INGESTION_WORKER_CONCURRENCY, 1),
+        poll_interval=settings.INGESTION_POLL_INTERVAL_SECONDS,
+        batch_size=settings.INGESTION_BATCH_MAX_JOBS,
+    )
+    pool.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(run_workers())
@@ -1,8 +1,9 @@
 import uuid
 from datetime import datetime
-from typing import List
+from enum import Enum
+from typing import List, Optional
 
-from sqlalchemy import Float, String, func
+from sqlalchemy import Float, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -12,6 +13,16 @@ from app.database import table_registry
 @table_registry.mapped_as_dataclass
 class DocumentRecord:
     __tablename__ = 'document_records'
+    __table_args__ = (
+        # Paginação por keyset na listagem (ordem created_at DESC, id DESC)
+        Index('ix_document_records_created_at_id', 'created_at', 'id'),
+        # Filtro por prefixo (LIKE 'prefixo%') independente da collation do banco
+        Index(
+            'ix_document_records_filename_prefix',
+            'filename',
+            postgresql_ops={'filename': 'text_pattern_ops'},
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -19,11 +30,111 @@ class DocumentRecord:
         default=uuid.uuid4,
         unique=True,
         nullable=False,
-        init=False
+        init=False,
     )
     filename: Mapped[str] = mapped_column(String, nullable=False)
     size_mb: Mapped[float] = mapped_column(Float, nullable=False)
-    chunks_ids: Mapped[List[str]] = mapped_column(JSONB, nullable=False)
+    # sha256 do conteúdo do PDF; uploads idênticos reaproveitam o registro existente
+    sha256: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True, unique=True, index=True, default=None
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+    # Tombstone: documento removido cujos vetores ainda serão apagados pelo purger
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(
+        nullable=True, index=True, default=None
+    )
+
+
+@table_registry.mapped_as_dataclass
+class DocumentChunk:
+    """Chunk de um documento, identificado pelo mesmo id usado no vector store."""
+
+    __tablename__ = 'document_chunks'
+    __table_args__ = (
+        Index(
+            'ix_document_chunks_document_id_ordinal', 'document_id', 'ordinal'
+        ),
+    )
+
+    chunk_id: Mapped[str] = mapped_column(String, primary_key=True)
+    document_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey('document_records.id', ondelete='CASCADE'),
+        nullable=False,
+    )
+    # Posição do chunk no documento
+    ordinal: Mapped[int] = mapped_column(Integer, nullable=False)
+    # sha256 do texto do chunk; nulo para chunks migrados do antigo `chunks_ids`
+    content_hash: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True, default=None
+    )
+    page: Mapped[Optional[int]] = mapped_column(
+        Integer, nullable=True, default=None
+    )
+    token_count: Mapped[Optional[int]] = mapped_column(
+        Integer, nullable=True, default=None
+    )
+
+
+@table_registry.mapped_as_dataclass
+class ChunkDeletion:
+    """Chunk que deixou de existir em um documento atualizado e cujo vetor ainda será apagado pelo purger."""
+
+    __tablename__ = 'chunk_deletions'
+
+    chunk_id: Mapped[str] = mapped_column(String, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+class IngestionStatus(str, Enum):
+    QUEUED = 'queued'
+    EMBEDDING = 'embedding'
+    INDEXED = 'indexed'
+    FAILED = 'failed'
+
+
+@table_registry.mapped_as_dataclass
+class IngestionJob:
+    """Tarefa persistente de indexação dos chunks de um documento no vector store."""
+
+    __tablename__ = 'ingestion_jobs'
+    __table_args__ = (
+        Index(
+            'ix_ingestion_jobs_status_next_attempt_at',
+            'status',
+            'next_attempt_at',
+        ),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, init=False
+    )
+    document_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey('document_records.id', ondelete='CASCADE'),
+        index=True,
+        nullable=False,
+    )
+    # Chunks a indexar ([{id, page_content, metadata}]); limpo após a indexação
+    payload: Mapped[Optional[List[dict]]] = mapped_column(JSONB, nullable=True)
+    status: Mapped[str] = mapped_column(
+        String(16), nullable=False, default=IngestionStatus.QUEUED.value
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(
+        Text, nullable=True, default=None
+    )
+    # Próxima tentativa (status queued) ou fim do lease do worker (status embedding)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
     created_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now()
     )
+    updated_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now(), onupdate=func.now()
+    )
@@ -0,0 +1,28 @@
+"""
+Cursores da paginação por keyset da listagem de documentos.
+
+O cursor codifica o `(created_at, id)` do último item da página; a próxima
+página começa logo depois dele na ordenação `created_at DESC, id DESC`, sem
+OFFSET, usando o índice `ix_document_records_created_at_id`.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+
+def encode_cursor(created_at: datetime, document_id: UUID) -> str:
+    payload = json.dumps([created_at.isoformat(), str(document_id)])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Decodifica o cursor; lança ValueError se ele for inválido."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, document_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), UUID(document_id)
+    except Exception as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
@@ -0,0 +1,260 @@
+"""
+Remoção em segundo plano dos documentos marcados como tombstone.
+
+`DELETE /documents/{id}` apenas marca o documento (`deleted_at`) e registra
+seus chunks no conjunto de tombstones, que a recuperação usa para descartá-los
+dos resultados. O purger apaga os vetores em lotes de `PURGE_BATCH_SIZE`
+chunks e remove o registro do documento quando não restam chunks.
+
+Os chunks que deixam de existir em um documento atualizado
+(`PUT /documents/{id}`) são registrados em `chunk_deletions` na mesma
+transação da atualização e apagados pelo mesmo purger.
+"""
+
+import asyncio
+from itertools import chain
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.metrics import BACKGROUND_TASK_FAILURES
+from app.settings import settings
+from rag.answer_cache import invalidate_answer_cache
+from rag.tombstones import get_tombstones
+from rag.vector_store import delete_chunks_by_ids
+
+from .chunks import get_chunk_ids_by_document
+from .models import ChunkDeletion, DocumentChunk, DocumentRecord, IngestionJob
+
+_global_instance_purger: Optional['TombstonePurger'] = None
+
+
+async def tombstone_documents(
+    session: AsyncSession, document_ids: Iterable[UUID]
+) -> Dict[UUID, List[str]]:
+    """
+    Marca os documentos como removidos e faz o commit.
+
+    O sha256 é liberado para que o mesmo PDF possa ser enviado de novo e as
+    tarefas de indexação pendentes são canceladas (um worker em andamento
+    descarta os vetores ao concluir). Retorna os ids dos chunks de cada
+    documento marcado; ids inexistentes ou já removidos ficam de fora.
+    """
+    result = await session.execute(
+        update(DocumentRecord)
+        .where(
+            DocumentRecord.id.in_(list(document_ids)),
+            DocumentRecord.deleted_at.is_(None),
+        )
+        .values(deleted_at=func.now(), sha256=None)
+        .returning(DocumentRecord.id)
+    )
+    tombstoned = list(result.scalars().all())
+    if not tombstoned:
+        await session.rollback()
+        return {}
+
+    chunk_ids = await get_chunk_ids_by_document(session, tombstoned)
+    await session.execute(
+        delete(IngestionJob).where(IngestionJob.document_id.in_(tombstoned))
+    )
+    await session.commit()
+
+    tombstone_chunks(chain.from_iterable(chunk_ids.values()))
+
+    return {
+        document_id: chunk_ids.get(document_id, [])
+        for document_id in tombstoned
+    }
+
+
+def schedule_chunk_deletion(session: AsyncSession, chunk_ids: Iterable[str]):
+    """
+    Registra na sessão chunks a apagar pelo purger; o commit fica a cargo de
+    quem chama, junto com a alteração que os removeu. Após o commit, chame
+    `tombstone_chunks` para escondê-los das buscas na hora.
+    """
+    session.add_all([
+        ChunkDeletion(chunk_id=chunk_id) for chunk_id in chunk_ids
+    ])
+
+
+def tombstone_chunks(chunk_ids: Iterable[str]):
+    """Descarta os chunks das buscas e acorda o purger para apagá-los."""
+    get_tombstones().add(chunk_ids)
+    invalidate_answer_cache()
+    notify_purger()
+
+
+async def get_tombstoned_chunk_ids(session: AsyncSession) -> List[str]:
+    result = await session.execute(
+        select(DocumentChunk.chunk_id)
+        .join(DocumentRecord, DocumentRecord.id == DocumentChunk.document_id)
+        .where(DocumentRecord.deleted_at.is_not(None))
+        .union_all(select(ChunkDeletion.chunk_id))
+    )
+    return list(result.scalars().all())
+
+
+async def purge_tombstoned_chunks(
+    session: AsyncSession, batch_size: int
+) -> int:
+    """
+    Apaga do vector store até `batch_size` chunks de documentos removidos ou
+    registrados em `chunk_deletions`, e os registros dos documentos que
+    ficaram sem chunks. Retorna a quantidade de chunks apagados.
+
+    `SKIP LOCKED` permite vários purgers (um por processo da API) sem que
+    apaguem os mesmos chunks.
+    """
+    result = await session.execute(
+        select(ChunkDeletion.chunk_id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    chunk_ids = list(result.scalars().all())
+
+    if len(chunk_ids) < batch_size:
+        result = await session.execute(
+            select(DocumentChunk.chunk_id)
+            .join(
+                DocumentRecord, DocumentRecord.id == DocumentChunk.document_id
+            )
+            .where(DocumentRecord.deleted_at.is_not(None))
+            .limit(batch_size - len(chunk_ids))
+            .with_for_update(of=DocumentChunk, skip_locked=True)
+        )
+        chunk_ids.extend(result.scalars().all())
+
+    try:
+        if chunk_ids:
+            # Os vetores são apagados antes das linhas: uma falha mantém o lote para a próxima rodada
+            await delete_chunks_by_ids(chunk_ids)
+            await session.execute(
+                delete(ChunkDeletion).where(
+                    ChunkDeletion.chunk_id.in_(chunk_ids)
+                )
+            )
+            await session.execute(
+                delete(DocumentChunk).where(
+                    DocumentChunk.chunk_id.in_(chunk_ids)
+                )
+            )
+
+        await session.execute(
+            delete(DocumentRecord).where(
+                DocumentRecord.deleted_at.is_not(None),
+                ~exists().where(
+                    DocumentChunk.document_id == DocumentRecord.id
+                ),
+            )
+        )
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+
+    get_tombstones().discard(chunk_ids)
+    return len(chunk_ids)
+
+
+class TombstonePurger:
+    """
+    Tarefa assíncrona que sincroniza o conjunto de tombstones com o banco e
+    apaga os chunks dos documentos removidos, lote a lote, até não restar
+    nenhum. Entre as rodadas espera `poll_interval` segundos ou até ser
+    acordada por `notify()` após uma remoção.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float,
+        batch_size: int,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name='tombstone-purger')
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def sync_tombstones(self):
+        """Recarrega os tombstones do banco (inclui remoções feitas por outros processos)."""
+        async with self.session_factory() as session:
+            get_tombstones().replace(await get_tombstoned_chunk_ids(session))
+
+    async def run_once(self) -> bool:
+        """Apaga um lote. Retorna False quando não há mais chunks a apagar."""
+        async with self.session_factory() as session:
+            purged = await purge_tombstoned_chunks(session, self.batch_size)
+        return purged > 0
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync_tombstones()
+                while await self.run_once():
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'Error purging deleted documents: {e}')
+                BACKGROUND_TASK_FAILURES.inc(task='purger')
+
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.poll_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+def get_purger() -> TombstonePurger:
+    global _global_instance_purger
+
+    if _global_instance_purger is None:
+        _global_instance_purger = TombstonePurger(
+            poll_interval=settings.PURGE_POLL_INTERVAL_SECONDS,
+            batch_size=settings.PURGE_BATCH_SIZE,
+        )
+    return _global_instance_purger
+
+
+def start_purger():
+    get_purger().start()
+
+
+async def stop_purger():
+    global _global_instance_purger
+
+    if _global_instance_purger is not None:
+        await _global_instance_purger.stop()
+        _global_instance_purger = None
+
+
+def notify_purger():
+    """Acorda o purger local após uma remoção."""
+    if _global_instance_purger is not None:
+        _global_instance_purger.notify()
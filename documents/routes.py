@@ -1,150 +1,623 @@
-from typing import List
+import asyncio
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
-    File,
+    Depends,
     HTTPException,
     Path,
-    UploadFile,
+    Query,
+    Request,
     status,
-    Depends
 )
-from sqlalchemy import delete, select
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.dependencies import T_Session
 from app.security import get_api_key
 from app.settings import settings
+from app.utils.uploads import SpooledUpload, receive_pdf_uploads
 from rag.process import process_pdf
 from rag.vector_store import (
     add_chunks_to_vector_store,
     delete_chunks_by_ids,
+    diff_chunks,
     generate_chunks_ids,
-    get_chunks_by_ids
+    get_chunks_by_ids,
+    update_chunks_metadata,
 )
 
-from .models import DocumentRecord
-from .schemas import DocumentRecordSchema, UploadResponse
+from .chunks import (
+    build_document_chunks,
+    get_chunk_counts,
+    get_chunk_ids,
+    get_chunk_ids_by_document,
+    replace_document_chunks,
+)
+from .ingestion import enqueue_ingestion_job, notify_ingestion_workers
+from .models import DocumentRecord, IngestionJob, IngestionStatus
+from .pagination import decode_cursor, encode_cursor
+from .purger import (
+    schedule_chunk_deletion,
+    tombstone_chunks,
+    tombstone_documents,
+)
+from .schemas import (
+    BulkDeleteRequest,
+    BulkDeleteResponse,
+    DocumentListResponse,
+    IngestionStatusSchema,
+    UpdateResponse,
+    UploadResponse,
+)
 
 router = APIRouter(
     prefix='/documents',
     tags=['Documents'],
-    dependencies=[Depends(get_api_key)]
+    dependencies=[Depends(get_api_key)],
 )
 
-@router.post('', response_model=UploadResponse)
+
+@router.post(
+    '',
+    response_model=UploadResponse,
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {
+                'multipart/form-data': {
+                    'schema': {
+                        'type': 'object',
+                        'required': ['files'],
+                        'properties': {
+                            'files': {
+                                'type': 'array',
+                                'items': {
+                                    'type': 'string',
+                                    'format': 'binary',
+                                },
+                            }
+                        },
+                    }
+                }
+            },
+        }
+    },
+)
 async def add_documents(
-    session: T_Session, 
-    background_tasks: BackgroundTasks, 
-    files: List[UploadFile] = File(...),
+    request: Request,
+    session: T_Session,
 ):
     """
-    Recebe um arquivo PDF, extrai seu conteúdo em chunks e indexa no vector store.
+    Recebe um arquivo PDF, extrai seu conteúdo em chunks e enfileira a indexação no vector store.
+
+    Os arquivos são lidos em streaming: formato e tamanho são validados à medida
+    que os bytes chegam, sem carregar o upload inteiro em memória. Os PDFs são
+    processados concorrentemente e gravados em uma única transação. PDFs já
+    enviados (mesmo sha256) não são processados novamente e são listados em
+    `deduplicated_files` com o id do documento existente. Com
+    `UPLOAD_ALL_OR_NOTHING=false`, os arquivos que falharem são listados em
+    `failed_files` e os demais são salvos. A indexação é feita pelos workers da
+    fila de ingestão; o andamento pode ser consultado em
+    `GET /documents/{document_id}/status`.
     """
-    filenames = []
-    total_chunks = 0
+    uploads = await receive_pdf_uploads(
+        request,
+        max_file_size_mb=settings.MAX_FILE_SIZE_MB,
+        max_upload_size_mb=settings.MAX_UPLOAD_SIZE_MB,
+        spool_max_size_mb=settings.UPLOAD_SPOOL_MAX_SIZE_MB,
+    )
+
+    try:
+        # Arquivos já enviados (mesmo sha256) não são processados nem indexados novamente
+        (
+            existing_ids,
+            new_uploads,
+            duplicate_uploads,
+        ) = await _split_duplicate_uploads(session, uploads)
+
+        # Processa os arquivos concorrentemente, limitado por UPLOAD_FILE_CONCURRENCY
+        semaphore = asyncio.Semaphore(settings.UPLOAD_FILE_CONCURRENCY)
 
-    for file in files:
-        if file.content_type != 'application/pdf' or not file.filename.endswith('.pdf'):
+        async def process_upload(upload):
+            async with semaphore:
+                return await process_pdf(upload, upload.filename)
+
+        results = await asyncio.gather(
+            *(process_upload(upload) for upload in new_uploads),
+            return_exceptions=True,
+        )
+    finally:
+        for upload in uploads:
+            upload.close()
+
+    failed_files = [
+        upload.filename
+        for upload, result in zip(new_uploads, results)
+        if isinstance(result, Exception)
+    ]
+    nothing_saved = len(failed_files) == len(new_uploads) and not existing_ids
+    if failed_files and (settings.UPLOAD_ALL_OR_NOTHING or nothing_saved):
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f'Error processing file: {failed_files[0]}',
+        )
+
+    processed = [
+        (upload, chunks)
+        for upload, chunks in zip(new_uploads, results)
+        if not isinstance(chunks, Exception)
+    ]
+
+    # Salva todos os documentos e suas tarefas de indexação em uma única transação
+    records = []
+    for upload, chunks in processed:
+        # Gera chunk_ids únicos por arquivo
+        chunk_ids = generate_chunks_ids(
+            filename=upload.filename, chunks=chunks
+        )
+        records.append((
+            DocumentRecord(
+                filename=upload.filename,
+                size_mb=round(upload.size_mb, 2),
+                sha256=upload.sha256,
+            ),
+            chunks,
+            chunk_ids,
+        ))
+
+    try:
+        session.add_all([record for record, _, _ in records])
+        await session.flush()
+
+        for record, chunks, chunk_ids in records:
+            session.add_all(
+                build_document_chunks(record.id, chunks, chunk_ids)
+            )
+            enqueue_ingestion_job(session, record.id, chunks, chunk_ids)
+        await session.commit()
+    except IntegrityError:
+        # Outro upload do mesmo arquivo foi salvo entre a verificação e o commit
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail='One or more files were uploaded concurrently by another request. Please retry.',
+        )
+    notify_ingestion_workers()
+
+    # Cópias repetidas no mesmo upload apontam para o registro criado agora
+    existing_ids.update({record.sha256: record.id for record, _, _ in records})
+    deduplicated_files = []
+    for upload in duplicate_uploads:
+        if upload.sha256 in existing_ids:
+            deduplicated_files.append({
+                'filename': upload.filename,
+                'document_id': existing_ids[upload.sha256],
+            })
+        else:
+            failed_files.append(upload.filename)
+
+    return {
+        'filenames': [upload.filename for upload, _ in processed],
+        'total_files': len(processed),
+        'total_chunks': sum(len(chunks) for _, chunks in processed),
+        'failed_files': failed_files,
+        'deduplicated_files': deduplicated_files,
+        'message': 'Files processed and chunks sent for indexing.',
+    }
+
+
+async def _split_duplicate_uploads(
+    session: AsyncSession, uploads: List[SpooledUpload]
+) -> Tuple[Dict[str, UUID], List[SpooledUpload], List[SpooledUpload]]:
+    """
+    Separa os uploads inéditos dos que repetem um PDF já salvo (ou outro
+    arquivo do mesmo upload), comparando o sha256 do conteúdo.
+
+    Retorna o id dos documentos existentes por sha256, os uploads a processar
+    e os uploads duplicados.
+    """
+    result = await session.execute(
+        select(DocumentRecord.sha256, DocumentRecord.id).where(
+            DocumentRecord.sha256.in_({upload.sha256 for upload in uploads})
+        )
+    )
+    existing_ids = dict(result.all())
+
+    new_uploads, duplicate_uploads = [], []
+    seen = set(existing_ids)
+    for upload in uploads:
+        if upload.sha256 in seen:
+            duplicate_uploads.append(upload)
+        else:
+            seen.add(upload.sha256)
+            new_uploads.append(upload)
+
+    return existing_ids, new_uploads, duplicate_uploads
+
+
+@router.get(
+    '', response_model=DocumentListResponse, response_model_exclude_unset=True
+)
+async def list_files(
+    session: T_Session,
+    limit: int = Query(50, ge=1, le=200, description='Documentos por página'),
+    cursor: Optional[str] = Query(
+        None, description='`next_cursor` da página anterior'
+    ),
+    filename_prefix: Optional[str] = Query(
+        None, description='Filtra pelo início do nome do arquivo'
+    ),
+    include_chunk_ids: bool = Query(
+        False, description='Inclui os ids dos chunks de cada documento'
+    ),
+):
+    """
+    Lista os documentos do mais recente para o mais antigo, paginados por keyset.
+
+    Cada item traz apenas a quantidade de chunks; os ids são incluídos com
+    `include_chunk_ids=true`. Para a próxima página, envie o `next_cursor`
+    retornado (nulo na última página).
+    """
+    stmt = (
+        select(
+            DocumentRecord.id,
+            DocumentRecord.filename,
+            DocumentRecord.size_mb,
+            DocumentRecord.created_at,
+        )
+        .where(DocumentRecord.deleted_at.is_(None))
+        .order_by(DocumentRecord.created_at.desc(), DocumentRecord.id.desc())
+        .limit(limit + 1)
+    )
+
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid file format for '{file.filename}'. Only PDF files are supported."
+                detail='Invalid cursor.',
             )
+        stmt = stmt.where(
+            tuple_(DocumentRecord.created_at, DocumentRecord.id)
+            < tuple_(cursor_created_at, cursor_id)
+        )
+
+    if filename_prefix:
+        # Padrão montado aqui (e não com `||` no SQL) para o índice de prefixo ser usado
+        escaped = (
+            filename_prefix.replace('/', '//')
+            .replace('%', '/%')
+            .replace('_', '/_')
+        )
+        stmt = stmt.where(
+            DocumentRecord.filename.like(f'{escaped}%', escape='/')
+        )
+
+    try:
+        result = await session.execute(stmt)
+        documents = result.all()
+
+        # Uma linha a mais indica que existe próxima página
+        has_more = len(documents) > limit
+        documents = documents[:limit]
+        document_ids = [document.id for document in documents]
+
+        if include_chunk_ids:
+            chunk_ids = await get_chunk_ids_by_document(session, document_ids)
+            chunk_counts = {
+                document_id: len(ids) for document_id, ids in chunk_ids.items()
+            }
+        else:
+            chunk_counts = await get_chunk_counts(session, document_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    items = []
+    for document in documents:
+        item = {
+            'id': document.id,
+            'filename': document.filename,
+            'size_mb': document.size_mb,
+            'chunk_count': chunk_counts.get(document.id, 0),
+            'created_at': document.created_at,
+        }
+        if include_chunk_ids:
+            item['chunks_ids'] = chunk_ids.get(document.id, [])
+        items.append(item)
+
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(documents[-1].created_at, documents[-1].id)
+
+    return {'items': items, 'next_cursor': next_cursor}
+
+
+@router.get('/{document_id}/status', response_model=IngestionStatusSchema)
+async def get_document_status(
+    session: T_Session,
+    document_id: UUID = Path(..., description='ID do documento'),
+):
+    """
+    Retorna o estado da indexação do documento: queued, embedding, indexed ou failed.
+
+    Documentos enviados antes da fila de ingestão não possuem tarefa e são
+    reportados como `unknown`.
+    """
+    result = await session.execute(
+        select(DocumentRecord.id).where(
+            DocumentRecord.id == document_id,
+            DocumentRecord.deleted_at.is_(None),
+        )
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail='Document not found.')
 
-        # Lê o conteúdo do arquivo para validar tamanho
-        content = await file.read()
-        size_mb = len(content) / (1024 * 1024)  # bytes -> MB
-        
-        # Valida o tamanho do arquivo
-        if size_mb > settings.MAX_FILE_SIZE_MB:
+    job = await _get_latest_job(session, document_id)
+
+    if job is None:
+        return {'document_id': document_id, 'status': 'unknown', 'attempts': 0}
+
+    return {
+        'document_id': document_id,
+        'status': job.status,
+        'attempts': job.attempts,
+        'last_error': job.last_error,
+        'updated_at': job.updated_at,
+    }
+
+
+@router.put(
+    '/{document_id}',
+    response_model=UpdateResponse,
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {
+                'multipart/form-data': {
+                    'schema': {
+                        'type': 'object',
+                        'required': ['file'],
+                        'properties': {
+                            'file': {'type': 'string', 'format': 'binary'}
+                        },
+                    }
+                }
+            },
+        }
+    },
+)
+async def update_document(
+    request: Request,
+    session: T_Session,
+    document_id: UUID = Path(
+        ..., description='ID do documento a ser substituído'
+    ),
+):
+    """
+    Substitui o PDF de um documento reindexando apenas os chunks alterados.
+
+    Os novos chunks são comparados com os armazenados pelo hash do conteúdo:
+    chunks idênticos mantêm o id e o embedding, apenas os novos são embutidos
+    e apenas os que deixaram de existir são removidos do vector store. Os
+    chunks do documento são trocados em um único commit, que também registra
+    os removidos para o purger apagar em segundo plano.
+    """
+    result = await session.execute(
+        select(DocumentRecord).where(
+            DocumentRecord.id == document_id,
+            DocumentRecord.deleted_at.is_(None),
+        )
+    )
+    document = result.scalar_one_or_none()
+
+    if not document:
+        raise HTTPException(status_code=404, detail='Document not found.')
+
+    job = await _get_latest_job(session, document_id)
+    if job is not None and job.status in {
+        IngestionStatus.QUEUED.value,
+        IngestionStatus.EMBEDDING.value,
+    }:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail='Document is still being indexed. Please retry later.',
+        )
+
+    uploads = await receive_pdf_uploads(
+        request,
+        max_file_size_mb=settings.MAX_FILE_SIZE_MB,
+        max_upload_size_mb=settings.MAX_UPLOAD_SIZE_MB,
+        spool_max_size_mb=settings.UPLOAD_SPOOL_MAX_SIZE_MB,
+        field_name='file',
+    )
+
+    try:
+        if len(uploads) != 1:
             raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"File '{file.filename}' exceeds maximum size of {settings.MAX_FILE_SIZE_MB}MB. File size: {size_mb:.2f}MB"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Send exactly one PDF file to replace a document.',
             )
-        
-        # Reposiciona o ponteiro para processar o arquivo
-        await file.seek(0)
+        upload = uploads[0]
+        chunk_ids = await get_chunk_ids(session, document_id)
+
+        if upload.sha256 == document.sha256:
+            # Conteúdo idêntico: nada a reprocessar
+            return {
+                'document_id': document.id,
+                'filename': document.filename,
+                'total_chunks': len(chunk_ids),
+                'added_chunks': 0,
+                'removed_chunks': 0,
+                'unchanged_chunks': len(chunk_ids),
+                'message': 'Document content is unchanged.',
+            }
 
         try:
-            chunks = await process_pdf(file, file.filename)
+            new_chunks = await process_pdf(upload, upload.filename)
         except Exception:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f'Error processing file: {file.filename}'
+                detail=f'Error processing file: {upload.filename}',
             )
+    finally:
+        for item in uploads:
+            item.close()
 
-        # Gera chunk_ids únicos por arquivo
-        chunk_ids = generate_chunks_ids(filename=file.filename, chunks=chunks)
+    stored_chunks = await get_chunks_by_ids(chunk_ids)
+    diff = diff_chunks(upload.filename, stored_chunks, new_chunks)
+    added_ids = [diff.chunk_ids[i] for i in diff.added]
+
+    try:
+        # Embeddings calculados apenas para os chunks novos
+        if diff.added:
+            await add_chunks_to_vector_store(
+                [new_chunks[i] for i in diff.added], added_ids
+            )
+        if diff.metadata_changed:
+            await update_chunks_metadata(
+                [new_chunks[i] for i in diff.metadata_changed],
+                [diff.chunk_ids[i] for i in diff.metadata_changed],
+            )
 
-        # Salva no DB
-        document_record = DocumentRecord(
-            filename=file.filename,
-            chunks_ids=chunk_ids,
-            size_mb=round(size_mb, 2)
+        await replace_document_chunks(
+            session, document.id, new_chunks, diff.chunk_ids
         )
-        session.add(document_record)
+        # Os vetores dos chunks removidos são apagados pelo purger, que refaz a remoção se ela falhar
+        schedule_chunk_deletion(session, diff.removed_ids)
+        document.filename = upload.filename
+        document.size_mb = round(upload.size_mb, 2)
+        document.sha256 = upload.sha256
+        if job is not None and job.status == IngestionStatus.FAILED.value:
+            # Os chunks que faltavam foram indexados agora
+            job.status = IngestionStatus.INDEXED.value
+            job.payload = None
+            job.last_error = None
         await session.commit()
+    except Exception as e:
+        await session.rollback()
+        if added_ids:
+            await delete_chunks_by_ids(added_ids)
+        if isinstance(e, IntegrityError):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail='Another document already has this content.',
+            )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f'Error updating document: {str(e)}',
+        )
 
-        # Adiciona tarefa assíncrona para adicionar os chunks ao vector store
-        background_tasks.add_task(add_chunks_to_vector_store, chunks, chunk_ids)
-
-        filenames.append(file.filename)
-        total_chunks += len(chunks)
+    # Os chunks antigos somem das buscas só depois que o documento aponta para os novos
+    if diff.removed_ids:
+        tombstone_chunks(diff.removed_ids)
 
     return {
-        'filenames': filenames,
-        'total_files': len(filenames),
-        'total_chunks': total_chunks,
-        'message': 'Files processed and chunks sent for indexing.'
+        'document_id': document.id,
+        'filename': document.filename,
+        'total_chunks': len(diff.chunk_ids),
+        'added_chunks': len(diff.added),
+        'removed_chunks': len(diff.removed_ids),
+        'unchanged_chunks': len(diff.chunk_ids) - len(diff.added),
+        'message': 'Document updated and changed chunks re-indexed.',
     }
 
 
-@router.get('', response_model=List[DocumentRecordSchema])
-async def list_files(session: T_Session):
-    try:
-        result = await session.execute(select(DocumentRecord))
-        documents = result.scalars().all()
-        return documents
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.delete('/{document_id}', description='Remove um arquivo e seus chunks usando o ID.')
+@router.delete(
+    '/{document_id}',
+    description='Remove um arquivo e seus chunks usando o ID.',
+)
 async def delete_document(
     session: T_Session,
-    document_id: UUID = Path(..., description='ID do documento a ser removido')
+    document_id: UUID = Path(
+        ..., description='ID do documento a ser removido'
+    ),
 ):
     """
-    Deleta todos os chunks relacionados ao ID do arquivo PDF e remove o registro no banco.
-    """
+    Remove o documento imediatamente, marcando-o como tombstone.
 
-    result = await session.execute(select(DocumentRecord).where(DocumentRecord.id == document_id))
-    document = result.scalar_one_or_none()
-
-    if not document:
+    Seus chunks deixam de aparecer nas buscas na hora; os vetores são
+    apagados em segundo plano pelo purger.
+    """
+    result = await session.execute(
+        select(DocumentRecord.id).where(
+            DocumentRecord.id == document_id,
+            DocumentRecord.deleted_at.is_(None),
+        )
+    )
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail='Document not found.')
 
-    chunk_ids = document.chunks_ids
+    chunk_counts = await get_chunk_counts(session, [document_id])
 
-    if not chunk_ids:
-        raise HTTPException(status_code=404, detail='No associated chunks found for this document.')
+    if not chunk_counts.get(document_id):
+        raise HTTPException(
+            status_code=404,
+            detail='No associated chunks found for this document.',
+        )
 
     try:
-        # Deleta os chunks da vector store
-        await delete_chunks_by_ids(chunk_ids)
-        
-        print(await get_chunks_by_ids(chunk_ids))
+        tombstoned = await tombstone_documents(session, [document_id])
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f'Error deleting document and chunks: {str(e)}',
+        )
+
+    if document_id not in tombstoned:
+        # Removido por outra requisição entre a verificação e a marcação
+        raise HTTPException(status_code=404, detail='Document not found.')
+
+    total_chunks = len(tombstoned[document_id])
+    return {
+        'message': f'{total_chunks} chunk(s) scheduled for deletion and document removed successfully.'
+    }
 
-        # Deleta registro do documento no Postgres
-        await session.execute(delete(DocumentRecord).where(DocumentRecord.id == document_id))
-        await session.commit()
 
-        return {'message': f"{len(chunk_ids)} chunk(s) deleted and document removed successfully."}
+@router.post('/bulk-delete', response_model=BulkDeleteResponse)
+async def bulk_delete_documents(
+    payload: BulkDeleteRequest, session: T_Session
+):
+    """
+    Remove vários documentos em uma única transação, pelo mesmo caminho de
+    `DELETE /documents/{document_id}`: os documentos são marcados como
+    tombstone e os vetores apagados em segundo plano. Ids inexistentes ou já
+    removidos são listados em `not_found`.
+    """
+    document_ids = list(dict.fromkeys(payload.document_ids))
 
+    try:
+        tombstoned = await tombstone_documents(session, document_ids)
     except Exception as e:
         await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f'Error deleting document and chunks: {str(e)}'
+            detail=f'Error deleting documents: {str(e)}',
         )
+
+    return {
+        'deleted': list(tombstoned),
+        'not_found': [
+            document_id
+            for document_id in document_ids
+            if document_id not in tombstoned
+        ],
+        'total_chunks': sum(
+            len(chunk_ids) for chunk_ids in tombstoned.values()
+        ),
+        'message': 'Documents removed; their chunks are being purged in the background.',
+    }
+
+
+async def _get_latest_job(session: AsyncSession, document_id: UUID):
+    result = await session.execute(
+        select(IngestionJob)
+        .where(IngestionJob.document_id == document_id)
+        .order_by(IngestionJob.created_at.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
@@ -1,14 +1,31 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+
+class DeduplicatedFile(BaseModel):
+    filename: str
+    document_id: UUID
 
 
 class UploadResponse(BaseModel):
     filenames: List[str]
     total_files: int
     total_chunks: int
+    failed_files: List[str] = []
+    deduplicated_files: List[DeduplicatedFile] = []
+    message: str
+
+
+class UpdateResponse(BaseModel):
+    document_id: UUID
+    filename: str
+    total_chunks: int
+    added_chunks: int
+    removed_chunks: int
+    unchanged_chunks: int
     message: str
 
 
@@ -16,5 +33,32 @@ class DocumentRecordSchema(BaseModel):
     id: UUID
     filename: str
     size_mb: float
-    chunks_ids: List[str]
+    chunk_count: int
+    # Apenas com `include_chunk_ids=true`
+    chunks_ids: Optional[List[str]] = None
     created_at: datetime
+
+
+class DocumentListResponse(BaseModel):
+    items: List[DocumentRecordSchema]
+    # Cursor da próxima página; nulo na última página
+    next_cursor: Optional[str] = None
+
+
+class IngestionStatusSchema(BaseModel):
+    document_id: UUID
+    status: str
+    attempts: int
+    last_error: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+
+class BulkDeleteRequest(BaseModel):
+    document_ids: List[UUID] = Field(..., min_length=1, max_length=1000)
+
+
+class BulkDeleteResponse(BaseModel):
+    deleted: List[UUID]
+    not_found: List[UUID]
+    total_chunks: int
+    message: str
@@ -0,0 +1,97 @@
+import pytest
+from langchain_core.documents import Document
+
+from documents.chunks import (
+    build_document_chunks,
+    get_chunk_ids,
+    get_chunk_ids_by_document,
+    replace_document_chunks,
+)
+from documents.models import DocumentRecord
+from rag.embedding_cache import content_hash
+
+
+def test_build_document_chunks_keeps_order_and_metadata():
+    """
+    Tests whether chunk rows carry their position, content hash, page and token count.
+    """
+    chunks = [
+        Document(
+            page_content='primeiro', metadata={'page': 0, 'token_count': 2}
+        ),
+        Document(page_content='segundo', metadata={'page': 3}),
+    ]
+
+    rows = build_document_chunks('doc-id', chunks, ['c0', 'c1'])
+
+    assert [(row.chunk_id, row.ordinal, row.page) for row in rows] == [
+        ('c0', 0, 0),
+        ('c1', 1, 3),
+    ]
+    assert rows[0].content_hash == content_hash('primeiro')
+    assert (rows[0].token_count, rows[1].token_count) == (2, None)
+    assert all(row.document_id == 'doc-id' for row in rows)
+
+
+# Testes com o banco de dados
+async def create_document_with_chunks(session, filename, chunk_ids):
+    document = DocumentRecord(filename=filename, size_mb=1.0)
+    session.add(document)
+    await session.flush()
+    chunks = [
+        Document(page_content=chunk_id, metadata={}) for chunk_id in chunk_ids
+    ]
+    session.add_all(build_document_chunks(document.id, chunks, chunk_ids))
+    await session.commit()
+    return document
+
+
+@pytest.mark.asyncio
+async def test_chunk_lookups(session):
+    """
+    Tests whether chunks are listed in order per document.
+    """
+    first = await create_document_with_chunks(
+        session, 'a.pdf', ['a-0', 'a-1', 'a-2']
+    )
+    second = await create_document_with_chunks(session, 'b.pdf', ['b-0'])
+
+    assert await get_chunk_ids(session, first.id) == ['a-0', 'a-1', 'a-2']
+    assert await get_chunk_ids_by_document(session, [first.id, second.id]) == {
+        first.id: ['a-0', 'a-1', 'a-2'],
+        second.id: ['b-0'],
+    }
+
+
+@pytest.mark.asyncio
+async def test_replace_document_chunks_keeps_reused_ids(session):
+    """
+    Tests whether replacing the chunks of a document keeps reused ids and drops vanished ones.
+    """
+    document = await create_document_with_chunks(
+        session, 'a.pdf', ['a-0', 'a-1']
+    )
+
+    chunks = [
+        Document(page_content='novo', metadata={}),
+        Document(page_content='a-0', metadata={}),
+    ]
+    await replace_document_chunks(
+        session, document.id, chunks, ['a-new', 'a-0']
+    )
+    await session.commit()
+
+    assert await get_chunk_ids(session, document.id) == ['a-new', 'a-0']
+
+
+@pytest.mark.asyncio
+async def test_deleting_document_deletes_its_chunks(session):
+    """
+    Tests whether chunk rows are removed together with their document.
+    """
+    document = await create_document_with_chunks(session, 'a.pdf', ['a-0'])
+
+    await session.delete(document)
+    await session.commit()
+
+    assert await get_chunk_ids(session, document.id) == []
@@ -0,0 +1,357 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import pytest
+from langchain_core.documents import Document
+from sqlalchemy import select
+
+from documents import ingestion
+from documents.ingestion import (
+    IngestionWorkerPool,
+    claim_next_jobs,
+    deserialize_chunks,
+    enqueue_ingestion_job,
+    mark_job_failed_attempt,
+    mark_jobs_indexed,
+    retry_backoff_seconds,
+    serialize_chunks,
+)
+from documents.models import DocumentRecord, IngestionJob, IngestionStatus
+
+
+def make_pool(batch_size=1):
+    session = MagicMock()
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return IngestionWorkerPool(
+        concurrency=1,
+        poll_interval=0.01,
+        batch_size=batch_size,
+        session_factory=session_factory,
+    )
+
+
+def make_claimed_job(attempts=1, filename='doc.pdf'):
+    return SimpleNamespace(
+        id=uuid4(),
+        document_id=uuid4(),
+        attempts=attempts,
+        payload=[
+            {
+                'id': f'{filename}_chunk_0',
+                'page_content': 'conteúdo',
+                'metadata': {'page': 0},
+            }
+        ],
+    )
+
+
+def test_serialize_chunks_roundtrip():
+    """
+    Tests whether chunks and their ids survive the JSON payload roundtrip.
+    """
+    chunks = [
+        Document(
+            page_content='texto', metadata={'source': 'doc.pdf', 'page': 1}
+        )
+    ]
+
+    restored_chunks, restored_ids = deserialize_chunks(
+        serialize_chunks(chunks, ['id-1'])
+    )
+
+    assert restored_chunks == chunks
+    assert restored_ids == ['id-1']
+
+
+def test_retry_backoff_is_exponential_and_capped(mocker):
+    """
+    Tests whether the retry delay doubles on each attempt up to the configured maximum.
+    """
+    mocker.patch.object(
+        ingestion.settings, 'INGESTION_RETRY_BACKOFF_SECONDS', 5
+    )
+    mocker.patch.object(
+        ingestion.settings, 'INGESTION_RETRY_BACKOFF_MAX_SECONDS', 30
+    )
+
+    assert [retry_backoff_seconds(n) for n in range(1, 6)] == [
+        5,
+        10,
+        20,
+        30,
+        30,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_run_once_returns_false_when_queue_is_empty(mocker):
+    """
+    Tests whether a worker reports an empty queue without touching the vector store.
+    """
+    mocker.patch('documents.ingestion.claim_next_jobs', return_value=[])
+    mock_add = mocker.patch('documents.ingestion.add_chunks_to_vector_store')
+
+    assert await make_pool().run_once() is False
+    mock_add.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_run_once_indexes_job(mocker):
+    """
+    Tests whether a claimed job is written to the vector store and marked as indexed.
+    """
+    job = make_claimed_job()
+    mocker.patch('documents.ingestion.claim_next_jobs', return_value=[job])
+    mock_add = mocker.patch('documents.ingestion.add_chunks_to_vector_store')
+    mock_indexed = mocker.patch(
+        'documents.ingestion.mark_jobs_indexed', return_value={job.id}
+    )
+    mock_delete = mocker.patch('documents.ingestion.delete_chunks_by_ids')
+
+    assert await make_pool().run_once() is True
+
+    chunks, ids = mock_add.call_args[0]
+    assert ids == ['doc.pdf_chunk_0']
+    assert chunks[0].page_content == 'conteúdo'
+    assert list(mock_indexed.call_args[0][1]) == [job.id]
+    mock_delete.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_run_once_batches_vector_store_write_across_jobs(mocker):
+    """
+    Tests whether the chunks of every claimed job are written to the vector store in a single call.
+    """
+    jobs = [
+        make_claimed_job(filename='a.pdf'),
+        make_claimed_job(filename='b.pdf'),
+    ]
+    mock_claim = mocker.patch(
+        'documents.ingestion.claim_next_jobs', return_value=jobs
+    )
+    mock_add = mocker.patch('documents.ingestion.add_chunks_to_vector_store')
+    mocker.patch(
+        'documents.ingestion.mark_jobs_indexed',
+        return_value={job.id for job in jobs},
+    )
+
+    await make_pool(batch_size=8).run_once()
+
+    assert mock_claim.call_args.kwargs['limit'] == 8
+    mock_add.assert_called_once()
+    assert mock_add.call_args[0][1] == ['a.pdf_chunk_0', 'b.pdf_chunk_0']
+
+
+@pytest.mark.asyncio
+async def test_run_once_records_failed_attempt(mocker):
+    """
+    Tests whether an indexing error is recorded so the job can be retried.
+    """
+    job = make_claimed_job(attempts=2)
+    mocker.patch('documents.ingestion.claim_next_jobs', return_value=[job])
+    mocker.patch(
+        'documents.ingestion.add_chunks_to_vector_store',
+        side_effect=RuntimeError('rate limited'),
+    )
+    mock_failed = mocker.patch('documents.ingestion.mark_job_failed_attempt')
+    mock_indexed = mocker.patch('documents.ingestion.mark_jobs_indexed')
+
+    assert await make_pool().run_once() is True
+
+    _, job_id, attempts, error = mock_failed.call_args[0]
+    assert (job_id, attempts, error) == (job.id, 2, 'rate limited')
+    mock_indexed.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_run_once_retries_jobs_separately_when_the_batch_write_fails(
+    mocker,
+):
+    """
+    Tests whether a failed batch write is retried job by job, charging an attempt only to the failing job.
+    """
+    good, bad = (
+        make_claimed_job(filename='good.pdf'),
+        make_claimed_job(filename='bad.pdf'),
+    )
+    mocker.patch(
+        'documents.ingestion.claim_next_jobs', return_value=[good, bad]
+    )
+
+    async def add_chunks(chunks, ids):
+        if 'bad.pdf_chunk_0' in ids:
+            raise RuntimeError('invalid input')
+
+    mock_add = mocker.patch(
+        'documents.ingestion.add_chunks_to_vector_store',
+        side_effect=add_chunks,
+    )
+    mock_failed = mocker.patch('documents.ingestion.mark_job_failed_attempt')
+    mock_indexed = mocker.patch(
+        'documents.ingestion.mark_jobs_indexed', return_value={good.id}
+    )
+
+    assert await make_pool(batch_size=2).run_once() is True
+
+    assert [call.args[1] for call in mock_add.call_args_list] == [
+        ['good.pdf_chunk_0', 'bad.pdf_chunk_0'],
+        ['good.pdf_chunk_0'],
+        ['bad.pdf_chunk_0'],
+    ]
+    mock_failed.assert_called_once()
+    _, job_id, attempts, error = mock_failed.call_args[0]
+    assert (job_id, attempts, error) == (bad.id, 1, 'invalid input')
+    assert mock_indexed.call_args[0][1] == {good.id: ['good.pdf_chunk_0']}
+
+
+@pytest.mark.asyncio
+async def test_run_once_removes_vectors_of_deleted_document(mocker):
+    """
+    Tests whether vectors are discarded when the document is deleted while being indexed.
+    """
+    kept, deleted = (
+        make_claimed_job(filename='kept.pdf'),
+        make_claimed_job(filename='deleted.pdf'),
+    )
+    mocker.patch(
+        'documents.ingestion.claim_next_jobs', return_value=[kept, deleted]
+    )
+    mocker.patch('documents.ingestion.add_chunks_to_vector_store')
+    mocker.patch(
+        'documents.ingestion.mark_jobs_indexed', return_value={kept.id}
+    )
+    mock_delete = mocker.patch('documents.ingestion.delete_chunks_by_ids')
+
+    await make_pool(batch_size=2).run_once()
+
+    mock_delete.assert_called_once_with(['deleted.pdf_chunk_0'])
+
+
+@pytest.mark.asyncio
+async def test_run_once_fails_job_with_expired_lease_after_last_attempt(
+    mocker,
+):
+    """
+    Tests whether a job whose worker died on the last attempt is marked as failed instead of retried.
+    """
+    mocker.patch.object(ingestion.settings, 'INGESTION_MAX_ATTEMPTS', 3)
+    mocker.patch(
+        'documents.ingestion.claim_next_jobs',
+        return_value=[make_claimed_job(attempts=4)],
+    )
+    mock_add = mocker.patch('documents.ingestion.add_chunks_to_vector_store')
+    mock_failed = mocker.patch('documents.ingestion.mark_job_failed_attempt')
+
+    await make_pool().run_once()
+
+    mock_add.assert_not_called()
+    assert mock_failed.call_args[0][3] == 'Worker lease expired.'
+
+
+@pytest.mark.asyncio
+async def test_notify_wakes_a_worker_that_was_busy_when_another_woke_up():
+    """
+    Tests whether a worker busy during `notify()` still polls again right away after another idle worker consumed the wakeup.
+    """
+    pool = IngestionWorkerPool(concurrency=2, poll_interval=60)
+    release = asyncio.Event()
+    calls = {'ingestion-worker-0': 0, 'ingestion-worker-1': 0}
+
+    async def run_once():
+        name = asyncio.current_task().get_name()
+        calls[name] += 1
+        if name == 'ingestion-worker-0' and calls[name] == 1:
+            await release.wait()
+        return False
+
+    pool.run_once = run_once
+    pool.start()
+    try:
+        await asyncio.sleep(0.01)
+        pool.notify()
+        await asyncio.sleep(0.01)
+        assert calls['ingestion-worker-1'] == 2
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert calls['ingestion-worker-0'] == 2
+    finally:
+        await pool.stop()
+
+
+# Testes com o banco de dados
+async def create_document_with_job(session):
+    document = DocumentRecord(filename='doc.pdf', size_mb=1.0)
+    session.add(document)
+    await session.flush()
+    job = enqueue_ingestion_job(
+        session,
+        document.id,
+        [Document(page_content='conteúdo', metadata={})],
+        ['doc.pdf_chunk_0'],
+    )
+    await session.commit()
+    return document, job
+
+
+@pytest.mark.asyncio
+async def test_claim_next_job_leases_queued_job(session):
+    """
+    Tests whether claiming moves a queued job to embedding and increments its attempts.
+    """
+    _, job = await create_document_with_job(session)
+
+    [claimed] = await claim_next_jobs(session, limit=5)
+
+    assert claimed.id == job.id
+    assert claimed.attempts == 1
+    assert claimed.payload[0]['id'] == 'doc.pdf_chunk_0'
+
+    # O lease impede que outro worker reivindique a mesma tarefa
+    assert await claim_next_jobs(session) == []
+
+    await session.refresh(job)
+    assert job.status == IngestionStatus.EMBEDDING.value
+
+
+@pytest.mark.asyncio
+async def test_failed_attempt_requeues_then_fails(session, mocker):
+    """
+    Tests whether failed attempts are requeued until the maximum and then marked as failed.
+    """
+    mocker.patch.object(ingestion.settings, 'INGESTION_MAX_ATTEMPTS', 2)
+    _, job = await create_document_with_job(session)
+
+    await mark_job_failed_attempt(session, job.id, attempts=1, error='timeout')
+    await session.refresh(job)
+    assert job.status == IngestionStatus.QUEUED.value
+    assert job.last_error == 'timeout'
+
+    await mark_job_failed_attempt(session, job.id, attempts=2, error='timeout')
+    await session.refresh(job)
+    assert job.status == IngestionStatus.FAILED.value
+
+
+@pytest.mark.asyncio
+async def test_mark_jobs_indexed_clears_payload(session):
+    """
+    Tests whether an indexed job drops its chunk payload, and reports deleted jobs.
+    """
+    document, job = await create_document_with_job(session)
+
+    assert await mark_jobs_indexed(session, [job.id]) == {job.id}
+    await session.refresh(job)
+    assert job.status == IngestionStatus.INDEXED.value
+    assert job.payload is None
+
+    await session.delete(document)
+    await session.commit()
+    result = await session.execute(
+        select(IngestionJob).where(IngestionJob.id == job.id)
+    )
+    assert result.scalar_one_or_none() is None
+    assert await mark_jobs_indexed(session, [job.id]) == set()
@@ -0,0 +1,33 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from documents.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_roundtrip():
+    """
+    Tests whether a cursor decodes back to the same created_at and id.
+    """
+    created_at, document_id = (
+        datetime(2026, 10, 18, 12, 30, 5, 123456),
+        uuid4(),
+    )
+
+    cursor = encode_cursor(created_at, document_id)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == (created_at, document_id)
+
+
+@pytest.mark.parametrize(
+    'cursor',
+    ['', 'invalido', encode_cursor(datetime(2026, 1, 1), uuid4())[:-4]],
+)
+def test_decode_invalid_cursor_raises_value_error(cursor):
+    """
+    Tests whether malformed cursors raise ValueError.
+    """
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor(cursor)
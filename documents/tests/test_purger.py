@@ -0,0 +1,176 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import select
+
+from documents.models import (
+    ChunkDeletion,
+    DocumentChunk,
+    DocumentRecord,
+    IngestionJob,
+)
+from documents.purger import (
+    TombstonePurger,
+    get_tombstoned_chunk_ids,
+    purge_tombstoned_chunks,
+    schedule_chunk_deletion,
+    tombstone_documents,
+)
+from rag.tombstones import get_tombstones
+
+
+def make_purger():
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__ = AsyncMock(
+        return_value=MagicMock()
+    )
+    session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return TombstonePurger(
+        poll_interval=0.01, batch_size=2, session_factory=session_factory
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_once_reports_whether_chunks_were_purged(mocker):
+    """
+    Tests whether the purger keeps going while batches are purged and stops on an empty batch.
+    """
+    mock_purge = mocker.patch(
+        'documents.purger.purge_tombstoned_chunks', side_effect=[2, 0]
+    )
+    purger = make_purger()
+
+    assert await purger.run_once() is True
+    assert await purger.run_once() is False
+    assert mock_purge.call_args[0][1] == 2
+
+
+@pytest.mark.asyncio
+async def test_sync_tombstones_replaces_local_set(mocker):
+    """
+    Tests whether syncing loads tombstones from the database, dropping ids purged elsewhere.
+    """
+    mocker.patch(
+        'documents.purger.get_tombstoned_chunk_ids', return_value=['c1']
+    )
+    get_tombstones().add(['purged-by-other-process'])
+
+    await make_purger().sync_tombstones()
+
+    assert 'c1' in get_tombstones()
+    assert 'purged-by-other-process' not in get_tombstones()
+
+
+# Testes com o banco de dados
+async def create_document(session, chunk_ids):
+    document = DocumentRecord(filename='doc.pdf', size_mb=1.0, sha256='b' * 64)
+    session.add(document)
+    await session.flush()
+    session.add_all([
+        DocumentChunk(
+            chunk_id=chunk_id, document_id=document.id, ordinal=ordinal
+        )
+        for ordinal, chunk_id in enumerate(chunk_ids)
+    ])
+    session.add(IngestionJob(document_id=document.id, payload=[]))
+    await session.commit()
+    return document
+
+
+@pytest.mark.asyncio
+async def test_tombstone_documents_cancels_pending_jobs(session, mocker):
+    """
+    Tests whether tombstoning frees the sha256, cancels pending jobs and ignores repeated calls.
+    """
+    mocker.patch('documents.purger.invalidate_answer_cache')
+    document = await create_document(session, ['c0', 'c1'])
+
+    assert await tombstone_documents(session, [document.id]) == {
+        document.id: ['c0', 'c1']
+    }
+    assert await tombstone_documents(session, [document.id]) == {}
+
+    await session.refresh(document)
+    assert document.sha256 is None
+    result = await session.execute(
+        select(IngestionJob).where(IngestionJob.document_id == document.id)
+    )
+    assert result.scalar_one_or_none() is None
+
+
+@pytest.mark.asyncio
+async def test_purge_deletes_vectors_in_batches_then_document(session, mocker):
+    """
+    Tests whether purging removes at most batch_size vectors per call and the record once no chunks remain.
+    """
+    mocker.patch('documents.purger.invalidate_answer_cache')
+    mock_delete = mocker.patch('documents.purger.delete_chunks_by_ids')
+    document = await create_document(session, ['c0', 'c1', 'c2'])
+    await tombstone_documents(session, [document.id])
+
+    assert await purge_tombstoned_chunks(session, batch_size=2) == 2
+    assert await purge_tombstoned_chunks(session, batch_size=2) == 1
+    assert await purge_tombstoned_chunks(session, batch_size=2) == 0
+
+    purged = [
+        chunk_id
+        for call in mock_delete.call_args_list
+        for chunk_id in call[0][0]
+    ]
+    assert sorted(purged) == ['c0', 'c1', 'c2']
+    assert len(get_tombstones()) == 0
+    assert (
+        await session.get(DocumentRecord, document.id, populate_existing=True)
+        is None
+    )
+
+
+@pytest.mark.asyncio
+async def test_purge_deletes_chunks_removed_by_document_updates(
+    session, mocker
+):
+    """
+    Tests whether chunks scheduled for deletion are tombstoned on sync and purged before those of deleted documents.
+    """
+    mocker.patch('documents.purger.invalidate_answer_cache')
+    mock_delete = mocker.patch('documents.purger.delete_chunks_by_ids')
+    document = await create_document(session, ['c0'])
+    await tombstone_documents(session, [document.id])
+    schedule_chunk_deletion(session, ['old-0', 'old-1'])
+    await session.commit()
+
+    assert sorted(await get_tombstoned_chunk_ids(session)) == [
+        'c0',
+        'old-0',
+        'old-1',
+    ]
+    assert await purge_tombstoned_chunks(session, batch_size=2) == 2
+    assert await purge_tombstoned_chunks(session, batch_size=2) == 1
+
+    assert [call[0][0] for call in mock_delete.call_args_list] == [
+        ['old-0', 'old-1'],
+        ['c0'],
+    ]
+    result = await session.execute(select(ChunkDeletion))
+    assert result.scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_purge_keeps_chunks_when_vector_store_fails(session, mocker):
+    """
+    Tests whether a vector store failure leaves the batch in place to be retried.
+    """
+    mocker.patch('documents.purger.invalidate_answer_cache')
+    mocker.patch(
+        'documents.purger.delete_chunks_by_ids',
+        side_effect=RuntimeError('chroma down'),
+    )
+    document = await create_document(session, ['c0'])
+    await tombstone_documents(session, [document.id])
+
+    with pytest.raises(RuntimeError):
+        await purge_tombstoned_chunks(session, batch_size=10)
+
+    result = await session.execute(select(DocumentChunk.chunk_id))
+    assert result.scalars().all() == ['c0']
+    assert 'c0' in get_tombstones()
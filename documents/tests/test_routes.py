@@ -1,62 +1,130 @@
+import hashlib
 from uuid import uuid4
 
 import pytest
+from fpdf import FPDF
 from langchain_core.documents import Document
-from sqlalchemy import insert, select
+from sqlalchemy import select
 
-from documents.models import DocumentRecord
+from documents.chunks import get_chunk_ids
+from documents.models import (
+    ChunkDeletion,
+    DocumentChunk,
+    DocumentRecord,
+    IngestionJob,
+    IngestionStatus,
+)
+from rag.tombstones import get_tombstones
+
+
+def make_pdf_bytes(text):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font('Arial', size=12)
+    pdf.cell(200, 10, txt=text, ln=1, align='L')
+    return pdf.output(dest='S').encode('latin1')
+
+
+async def create_document(session, chunk_ids, **fields):
+    document = DocumentRecord(**fields)
+    session.add(document)
+    await session.flush()
+    session.add_all([
+        DocumentChunk(
+            chunk_id=chunk_id, document_id=document.id, ordinal=ordinal
+        )
+        for ordinal, chunk_id in enumerate(chunk_ids)
+    ])
+    await session.commit()
+    return document
 
 
 # Test POST /api/documents
 @pytest.mark.asyncio
-async def test_add_douments_success(mocker, client, session, api_key, fake_pdf_upload_file):
+async def test_add_douments_success(
+    mocker, client, session, api_key, fake_pdf_upload_file
+):
     """
     Successful single PDF upload with chunk generation and DB persistence
     """
-    mock_add_chunks = mocker.patch('documents.routes.add_chunks_to_vector_store')
+    mock_notify = mocker.patch('documents.routes.notify_ingestion_workers')
 
     fake_pdf_upload_file.file.seek(0)
     file_content = fake_pdf_upload_file.file.read()
 
     files_to_upload = [
-        ('files', (fake_pdf_upload_file.filename, file_content, 'application/pdf')),
+        (
+            'files',
+            (fake_pdf_upload_file.filename, file_content, 'application/pdf'),
+        ),
     ]
 
-    response = await client.post('/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key})
+    response = await client.post(
+        '/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key}
+    )
     assert response.status_code == 200
 
     response_data = response.json()
     assert response_data['filenames'] == [fake_pdf_upload_file.filename]
     assert response_data['total_files'] == 1
     assert response_data['total_chunks'] >= 1
-    assert response_data['message'] == 'Files processed and chunks sent for indexing.'
+    assert (
+        response_data['message']
+        == 'Files processed and chunks sent for indexing.'
+    )
 
-    mock_add_chunks.assert_called_once()
-    call_args = mock_add_chunks.call_args[0][0]
-    assert isinstance(call_args, list)
-    assert all(isinstance(chunk, Document) for chunk in call_args)
-    assert len(call_args) == response_data['total_chunks']
+    mock_notify.assert_called_once()
 
-    stmt = select(DocumentRecord).where(DocumentRecord.filename == fake_pdf_upload_file.filename)
+    stmt = select(DocumentRecord).where(
+        DocumentRecord.filename == fake_pdf_upload_file.filename
+    )
     result = await session.execute(stmt)
     document_record_db = result.scalar_one_or_none()
     assert document_record_db is not None
-    assert document_record_db.chunks_ids[0].startswith(f'{fake_pdf_upload_file.filename}_chunk_0_')
+    chunk_ids = await get_chunk_ids(session, document_record_db.id)
+    assert chunk_ids[0].startswith(f'{fake_pdf_upload_file.filename}_chunk_0_')
+
+    # A indexação fica enfileirada com os chunks do documento
+    result = await session.execute(
+        select(IngestionJob).where(
+            IngestionJob.document_id == document_record_db.id
+        )
+    )
+    job = result.scalar_one()
+    assert job.status == IngestionStatus.QUEUED.value
+    assert job.attempts == 0
+    assert [item['id'] for item in job.payload] == chunk_ids
+    assert len(job.payload) == response_data['total_chunks']
 
 
 @pytest.mark.asyncio
-async def test_add_documents_multiple_files_coverage(mocker, client, api_key, fake_pdf_upload_file):
-    mocker.patch('documents.routes.add_chunks_to_vector_store')
-
-    fake_pdf_upload_file.file.seek(0)
-    file_bytes = fake_pdf_upload_file.file.read()
+async def test_add_documents_multiple_files_coverage(
+    mocker, client, api_key, fake_pdf_upload_file
+):
+    mocker.patch('documents.routes.notify_ingestion_workers')
 
     files_to_upload = [
-        ('files', (f'one_{fake_pdf_upload_file.filename}', file_bytes, 'application/pdf')),
-        ('files', (f'two_{fake_pdf_upload_file.filename}', file_bytes, 'application/pdf')),
+        (
+            'files',
+            (
+                f'one_{fake_pdf_upload_file.filename}',
+                make_pdf_bytes('Arquivo um.'),
+                'application/pdf',
+            ),
+        ),
+        (
+            'files',
+            (
+                f'two_{fake_pdf_upload_file.filename}',
+                make_pdf_bytes('Arquivo dois.'),
+                'application/pdf',
+            ),
+        ),
     ]
 
-    response = await client.post('/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key})
+    response = await client.post(
+        '/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key}
+    )
 
     assert response.status_code == 200
     data = response.json()
@@ -75,14 +143,21 @@ async def test_add_documents_unauthorized(client, fake_pdf_upload_file):
     file_content = fake_pdf_upload_file.file.read()
 
     files_to_upload = [
-        ('files', (fake_pdf_upload_file.filename, file_content, 'application/pdf')),
+        (
+            'files',
+            (fake_pdf_upload_file.filename, file_content, 'application/pdf'),
+        ),
     ]
 
     response = await client.post('/api/documents', files=files_to_upload)
     assert response.status_code == 401
     assert response.json()['detail'] == 'Unauthorized'
 
-    response = await client.post('/api/documents', files=files_to_upload, headers={'X-API-KEY': 'wrong-key'})
+    response = await client.post(
+        '/api/documents',
+        files=files_to_upload,
+        headers={'X-API-KEY': 'wrong-key'},
+    )
     assert response.status_code == 401
     assert response.json()['detail'] == 'Unauthorized'
 
@@ -92,14 +167,45 @@ async def test_add_douments_invalid_content_type(client, session, api_key):
     """
     Rejects non-PDF file upload with 400 error
     """
+    files_to_upload = [('files', ('test.txt', b'not a pdf', 'text/plain'))]
+
+    response = await client.post(
+        '/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key}
+    )
+
+    assert response.status_code == 400
+    assert (
+        response.json()['detail']
+        == "Invalid file format for 'test.txt'. Only PDF files are supported."
+    )
+
+    stmt = select(DocumentRecord)
+    result = await session.execute(stmt)
+    assert result.scalar_one_or_none() is None
+
+
+@pytest.mark.asyncio
+async def test_add_documents_file_too_large(mocker, client, session, api_key):
+    """
+    Rejects a file larger than MAX_FILE_SIZE_MB with 413 while it is being streamed
+    """
+    mocker.patch('documents.routes.settings.MAX_FILE_SIZE_MB', 1)
+    mock_process_pdf = mocker.patch('documents.routes.process_pdf')
+
     files_to_upload = [
-        ('files', ('test.txt', b'not a pdf', 'text/plain'))
+        ('files', ('big.pdf', b'0' * (1024 * 1024 + 1), 'application/pdf'))
     ]
 
-    response = await client.post('/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key})
+    response = await client.post(
+        '/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key}
+    )
 
-    assert response.status_code == 400
-    assert response.json()['detail'] == "Invalid file format for 'test.txt'. Only PDF files are supported."
+    assert response.status_code == 413
+    assert (
+        response.json()['detail']
+        == "File 'big.pdf' exceeds maximum size of 1MB."
+    )
+    mock_process_pdf.assert_not_called()
 
     stmt = select(DocumentRecord)
     result = await session.execute(stmt)
@@ -111,13 +217,18 @@ async def test_add_douments_processing_error(mocker, client, session, api_key):
     """
     Handles PDF processing failure with 500 error
     """
-    mocker.patch('documents.routes.process_pdf', side_effect=Exception('Simulated failure'))
+    mocker.patch(
+        'documents.routes.process_pdf',
+        side_effect=Exception('Simulated failure'),
+    )
 
     files_to_upload = [
         ('files', ('error.pdf', b'pdf content', 'application/pdf'))
     ]
 
-    response = await client.post('/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key})
+    response = await client.post(
+        '/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key}
+    )
 
     assert response.status_code == 500
     assert response.json() == {'detail': 'Error processing file: error.pdf'}
@@ -128,20 +239,93 @@ async def test_add_douments_processing_error(mocker, client, session, api_key):
 
 
 @pytest.mark.asyncio
-async def test_add_multiple_files_success(mocker, client, api_key, fake_pdf_upload_file):
+async def test_add_documents_all_or_nothing_rolls_back_every_file(
+    mocker, client, session, api_key, fake_pdf_upload_file
+):
     """
-    Uploads multiple PDF files and persists each
+    Tests whether a failure in one file persists none of the uploaded files by default.
+    """
+    mocker.patch('documents.routes.notify_ingestion_workers')
+    fake_pdf_upload_file.file.seek(0)
+    content = fake_pdf_upload_file.file.read()
+
+    files_to_upload = [
+        ('files', ('good.pdf', content, 'application/pdf')),
+        ('files', ('broken.pdf', b'not really a pdf', 'application/pdf')),
+    ]
+
+    response = await client.post(
+        '/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key}
+    )
+
+    assert response.status_code == 500
+    assert response.json() == {'detail': 'Error processing file: broken.pdf'}
+
+    result = await session.execute(select(DocumentRecord))
+    assert result.scalars().all() == []
+
+
+@pytest.mark.asyncio
+async def test_add_documents_partial_success(
+    mocker, client, session, api_key, fake_pdf_upload_file
+):
+    """
+    Tests whether, with all-or-nothing disabled, valid files are saved and failed ones are reported.
     """
-    mocker.patch('documents.routes.add_chunks_to_vector_store')
+    mocker.patch('documents.routes.notify_ingestion_workers')
+    mocker.patch('documents.routes.settings.UPLOAD_ALL_OR_NOTHING', False)
     fake_pdf_upload_file.file.seek(0)
     content = fake_pdf_upload_file.file.read()
 
     files_to_upload = [
-        ('files', (f'copy1_{fake_pdf_upload_file.filename}', content, 'application/pdf')),
-        ('files', (f'copy2_{fake_pdf_upload_file.filename}', content, 'application/pdf')),
+        ('files', ('good.pdf', content, 'application/pdf')),
+        ('files', ('broken.pdf', b'not really a pdf', 'application/pdf')),
+    ]
+
+    response = await client.post(
+        '/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['filenames'] == ['good.pdf']
+    assert data['failed_files'] == ['broken.pdf']
+
+    result = await session.execute(select(DocumentRecord.filename))
+    assert result.scalars().all() == ['good.pdf']
+
+
+@pytest.mark.asyncio
+async def test_add_multiple_files_success(
+    mocker, client, api_key, fake_pdf_upload_file
+):
+    """
+    Uploads multiple PDF files and persists each
+    """
+    mocker.patch('documents.routes.notify_ingestion_workers')
+
+    files_to_upload = [
+        (
+            'files',
+            (
+                f'copy1_{fake_pdf_upload_file.filename}',
+                make_pdf_bytes('Primeiro.'),
+                'application/pdf',
+            ),
+        ),
+        (
+            'files',
+            (
+                f'copy2_{fake_pdf_upload_file.filename}',
+                make_pdf_bytes('Segundo.'),
+                'application/pdf',
+            ),
+        ),
     ]
 
-    response = await client.post('/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key})
+    response = await client.post(
+        '/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key}
+    )
     assert response.status_code == 200
     data = response.json()
     assert data['total_files'] == 2
@@ -150,11 +334,82 @@ async def test_add_multiple_files_success(mocker, client, api_key, fake_pdf_uplo
 
 
 @pytest.mark.asyncio
-async def test_chunk_id_format(client, session, api_key, fake_pdf_upload_file, mocker):
+async def test_add_documents_deduplicates_previously_uploaded_file(
+    mocker, client, session, api_key, fake_pdf_upload_file
+):
+    """
+    Tests whether re-uploading an identical PDF reuses the existing record without parsing it again.
+    """
+    mocker.patch('documents.routes.notify_ingestion_workers')
+    fake_pdf_upload_file.file.seek(0)
+    content = fake_pdf_upload_file.file.read()
+
+    document = await create_document(
+        session,
+        ['chunk1'],
+        filename='original.pdf',
+        size_mb=0.01,
+        sha256=hashlib.sha256(content).hexdigest(),
+    )
+
+    mock_process_pdf = mocker.patch('documents.routes.process_pdf')
+
+    files_to_upload = [('files', ('copia.pdf', content, 'application/pdf'))]
+    response = await client.post(
+        '/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['total_files'] == 0
+    assert data['deduplicated_files'] == [
+        {'filename': 'copia.pdf', 'document_id': str(document.id)}
+    ]
+    mock_process_pdf.assert_not_called()
+
+    result = await session.execute(select(DocumentRecord))
+    assert len(result.scalars().all()) == 1
+
+
+@pytest.mark.asyncio
+async def test_add_documents_deduplicates_copies_within_upload(
+    mocker, client, session, api_key, fake_pdf_upload_file
+):
+    """
+    Tests whether the same PDF sent twice in one upload is stored once and the copy is reported.
+    """
+    mocker.patch('documents.routes.notify_ingestion_workers')
+    fake_pdf_upload_file.file.seek(0)
+    content = fake_pdf_upload_file.file.read()
+
+    files_to_upload = [
+        ('files', ('copy1.pdf', content, 'application/pdf')),
+        ('files', ('copy2.pdf', content, 'application/pdf')),
+    ]
+    response = await client.post(
+        '/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['filenames'] == ['copy1.pdf']
+
+    result = await session.execute(select(DocumentRecord))
+    document = result.scalar_one()
+    assert document.sha256 == hashlib.sha256(content).hexdigest()
+    assert data['deduplicated_files'] == [
+        {'filename': 'copy2.pdf', 'document_id': str(document.id)}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_chunk_id_format(
+    client, session, api_key, fake_pdf_upload_file, mocker
+):
     """
     Ensures chunk_ids follow naming pattern
     """
-    mocker.patch('documents.routes.add_chunks_to_vector_store')
+    mocker.patch('documents.routes.notify_ingestion_workers')
     fake_pdf_upload_file.file.seek(0)
     content = fake_pdf_upload_file.file.read()
 
@@ -162,14 +417,22 @@ async def test_chunk_id_format(client, session, api_key, fake_pdf_upload_file, m
         ('files', (fake_pdf_upload_file.filename, content, 'application/pdf')),
     ]
 
-    response = await client.post('/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key})
+    response = await client.post(
+        '/api/documents', files=files_to_upload, headers={'X-API-KEY': api_key}
+    )
     assert response.status_code == 200
 
-    stmt = select(DocumentRecord).where(DocumentRecord.filename == fake_pdf_upload_file.filename)
+    stmt = select(DocumentRecord).where(
+        DocumentRecord.filename == fake_pdf_upload_file.filename
+    )
     result = await session.execute(stmt)
     doc = result.scalar_one_or_none()
     assert doc
-    assert all(cid.startswith(f'{fake_pdf_upload_file.filename}_chunk_') for cid in doc.chunks_ids)
+    chunk_ids = await get_chunk_ids(session, doc.id)
+    assert all(
+        cid.startswith(f'{fake_pdf_upload_file.filename}_chunk_')
+        for cid in chunk_ids
+    )
 
 
 # Test GET /api/documents
@@ -179,21 +442,27 @@ async def test_list_documents_returns_all_documents(client, session, api_key):
     Returns all document records in DB
     """
     # Cria documentos no banco
-    docs = [
-        {'filename': 'file1.pdf', 'size_mb': 0.5, 'chunks_ids': ['file1_chunk_0']},
-        {'filename': 'file2.pdf', 'size_mb': 1.2, 'chunks_ids': ['file2_chunk_0', 'file2_chunk_1']}
-    ]
-    await session.execute(insert(DocumentRecord), docs)
-    await session.commit()
+    await create_document(
+        session, ['file1_chunk_0'], filename='file1.pdf', size_mb=0.5
+    )
+    await create_document(
+        session,
+        ['file2_chunk_0', 'file2_chunk_1'],
+        filename='file2.pdf',
+        size_mb=1.2,
+    )
 
-    response = await client.get('/api/documents', headers={'X-API-KEY': api_key})
+    response = await client.get(
+        '/api/documents', headers={'X-API-KEY': api_key}
+    )
     assert response.status_code == 200
 
     data = response.json()
-    assert isinstance(data, list)
-    assert len(data) == 2
+    assert isinstance(data['items'], list)
+    assert len(data['items']) == 2
+    assert data['next_cursor'] is None
 
-    filenames = [doc['filename'] for doc in data]
+    filenames = [doc['filename'] for doc in data['items']]
     assert 'file1.pdf' in filenames
     assert 'file2.pdf' in filenames
 
@@ -203,37 +472,130 @@ async def test_list_documents_returns_empty_list(client, api_key):
     """
     Returns empty list when no documents exist
     """
-    response = await client.get('/api/documents', headers={'X-API-KEY': api_key})
+    response = await client.get(
+        '/api/documents', headers={'X-API-KEY': api_key}
+    )
     assert response.status_code == 200
-    assert response.json() == []
+    assert response.json() == {'items': [], 'next_cursor': None}
 
 
 @pytest.mark.asyncio
 async def test_list_documents_schema_format(client, session, api_key):
     """
-    Response matches schema: filename, size_mb, chunks_ids, created_at
+    Response matches schema: filename, size_mb, chunk_count, created_at
     """
-    document = DocumentRecord(
-        filename='example.pdf',
-        size_mb=1.0,
-        chunks_ids=['chunk_1', 'chunk_2']
+    await create_document(
+        session, ['chunk_1', 'chunk_2'], filename='example.pdf', size_mb=1.0
     )
-    session.add(document)
-    await session.commit()
 
-    response = await client.get('/api/documents', headers={'X-API-KEY': api_key})
+    response = await client.get(
+        '/api/documents', headers={'X-API-KEY': api_key}
+    )
     assert response.status_code == 200
 
     data = response.json()
-    assert isinstance(data, list)
-    assert len(data) == 1
-    item = data[0]
-
-    assert set(item.keys()) == {'id', 'filename', 'size_mb', 'chunks_ids', 'created_at'}
+    assert len(data['items']) == 1
+    item = data['items'][0]
+
+    assert set(item.keys()) == {
+        'id',
+        'filename',
+        'size_mb',
+        'chunk_count',
+        'created_at',
+    }
     assert item['filename'] == 'example.pdf'
     assert item['size_mb'] == 1.0
-    assert isinstance(item['chunks_ids'], list)
-    assert len(item['chunks_ids']) == 2
+    assert item['chunk_count'] == 2
+
+
+@pytest.mark.asyncio
+async def test_list_documents_includes_chunk_ids_on_request(
+    client, session, api_key
+):
+    """
+    Tests whether chunk ids are returned, in order, only when include_chunk_ids is set.
+    """
+    await create_document(
+        session, ['chunk_1', 'chunk_2'], filename='example.pdf', size_mb=1.0
+    )
+
+    response = await client.get(
+        '/api/documents?include_chunk_ids=true', headers={'X-API-KEY': api_key}
+    )
+
+    assert response.status_code == 200
+    assert response.json()['items'][0]['chunks_ids'] == ['chunk_1', 'chunk_2']
+
+
+@pytest.mark.asyncio
+async def test_list_documents_keyset_pagination(client, session, api_key):
+    """
+    Tests whether following next_cursor walks every document exactly once, newest first.
+    """
+    for i in range(5):
+        await create_document(
+            session, [f'chunk_{i}'], filename=f'file{i}.pdf', size_mb=1.0
+        )
+
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 2}
+        if cursor:
+            params['cursor'] = cursor
+        response = await client.get(
+            '/api/documents', params=params, headers={'X-API-KEY': api_key}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data['items']) <= 2
+        seen.extend(item['filename'] for item in data['items'])
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+
+    assert sorted(seen) == [f'file{i}.pdf' for i in range(5)]
+    assert len(set(seen)) == 5
+
+
+@pytest.mark.asyncio
+async def test_list_documents_filters_by_filename_prefix(
+    client, session, api_key
+):
+    """
+    Tests whether filename_prefix matches literally, treating LIKE wildcards as plain characters.
+    """
+    await create_document(session, ['c1'], filename='cv_2024.pdf', size_mb=1.0)
+    await create_document(session, ['c2'], filename='cvx2024.pdf', size_mb=1.0)
+    await create_document(
+        session, ['c3'], filename='relatorio.pdf', size_mb=1.0
+    )
+
+    response = await client.get(
+        '/api/documents',
+        params={'filename_prefix': 'cv_'},
+        headers={'X-API-KEY': api_key},
+    )
+
+    assert response.status_code == 200
+    assert [item['filename'] for item in response.json()['items']] == [
+        'cv_2024.pdf'
+    ]
+
+
+@pytest.mark.asyncio
+async def test_list_documents_invalid_cursor(client, api_key):
+    """
+    Tests whether a malformed cursor is rejected with 400.
+    """
+    response = await client.get(
+        '/api/documents',
+        params={'cursor': 'invalido'},
+        headers={'X-API-KEY': api_key},
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {'detail': 'Invalid cursor.'}
 
 
 @pytest.mark.asyncio
@@ -246,48 +608,354 @@ async def test_list_documents_unauthorized(client):
     assert response.status_code == 401
     assert response.json()['detail'] == 'Unauthorized'
 
-    response = await client.get('/api/documents', headers={'X-API-KEY': 'wrong-key'})
+    response = await client.get(
+        '/api/documents', headers={'X-API-KEY': 'wrong-key'}
+    )
     assert response.status_code == 401
     assert response.json()['detail'] == 'Unauthorized'
 
 
 @pytest.mark.asyncio
-async def test_list_documents_db_error_handled(mocker, client, session, api_key):
+async def test_list_documents_db_error_handled(
+    mocker, client, session, api_key
+):
     """
     Simulates DB error and ensures 500 is returned
     """
-    mocker.patch.object(session, 'execute', side_effect=Exception('DB failure'))
+    mocker.patch.object(
+        session, 'execute', side_effect=Exception('DB failure')
+    )
 
-    response = await client.get('/api/documents', headers={'X-API-KEY': api_key})
+    response = await client.get(
+        '/api/documents', headers={'X-API-KEY': api_key}
+    )
 
     assert response.status_code == 500
 
 
+# Test GET /api/documents/{document_id}/status
+@pytest.mark.asyncio
+async def test_get_document_status_returns_job_state(client, session, api_key):
+    """
+    Tests whether the status endpoint reports the state, attempts and last error of the ingestion job.
+    """
+    document = await create_document(
+        session, ['chunk1'], filename='test.pdf', size_mb=1.0
+    )
+    job = IngestionJob(
+        document_id=document.id,
+        payload=None,
+        status=IngestionStatus.FAILED.value,
+        attempts=5,
+        last_error='boom',
+    )
+    session.add(job)
+    await session.commit()
+
+    response = await client.get(
+        f'/api/documents/{document.id}/status', headers={'X-API-KEY': api_key}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['document_id'] == str(document.id)
+    assert data['status'] == 'failed'
+    assert data['attempts'] == 5
+    assert data['last_error'] == 'boom'
+
+
+@pytest.mark.asyncio
+async def test_get_document_status_without_job(client, session, api_key):
+    """
+    Tests whether documents without an ingestion job are reported as unknown.
+    """
+    document = await create_document(
+        session, ['chunk1'], filename='legacy.pdf', size_mb=1.0
+    )
+
+    response = await client.get(
+        f'/api/documents/{document.id}/status', headers={'X-API-KEY': api_key}
+    )
+
+    assert response.status_code == 200
+    assert response.json()['status'] == 'unknown'
+
+
+@pytest.mark.asyncio
+async def test_get_document_status_not_found(client, api_key):
+    """
+    Tests whether the status endpoint returns 404 for an unknown document.
+    """
+    response = await client.get(
+        f'/api/documents/{uuid4()}/status', headers={'X-API-KEY': api_key}
+    )
+
+    assert response.status_code == 404
+    assert response.json() == {'detail': 'Document not found.'}
+
+
+# Test PUT /api/documents/{document_id}
+@pytest.mark.asyncio
+async def test_update_document_reindexes_only_changed_chunks(
+    mocker, client, session, api_key
+):
+    """
+    Tests whether replacing a document embeds only new chunks, removes only vanished ones
+    and keeps the ids of unchanged chunks.
+    """
+    document = await create_document(
+        session,
+        ['old-0', 'old-1'],
+        filename='cv.pdf',
+        size_mb=1.0,
+        sha256='a' * 64,
+    )
+
+    mocker.patch(
+        'documents.routes.get_chunks_by_ids',
+        return_value=[
+            Document(
+                id='old-0',
+                page_content='Mantido',
+                metadata={'source': 'cv.pdf', 'page': 0},
+            ),
+            Document(
+                id='old-1',
+                page_content='Removido',
+                metadata={'source': 'cv.pdf', 'page': 1},
+            ),
+        ],
+    )
+    mocker.patch(
+        'documents.routes.process_pdf',
+        return_value=[
+            Document(
+                page_content='Mantido',
+                metadata={'source': 'cv.pdf', 'page': 0},
+            ),
+            Document(
+                page_content='Novo', metadata={'source': 'cv.pdf', 'page': 1}
+            ),
+        ],
+    )
+    mock_add = mocker.patch('documents.routes.add_chunks_to_vector_store')
+    mock_delete = mocker.patch('documents.routes.delete_chunks_by_ids')
+    mock_update_metadata = mocker.patch(
+        'documents.routes.update_chunks_metadata'
+    )
+    mocker.patch('documents.purger.invalidate_answer_cache')
+
+    files = [
+        ('file', ('cv.pdf', make_pdf_bytes('Nova versão.'), 'application/pdf'))
+    ]
+    response = await client.put(
+        f'/api/documents/{document.id}',
+        files=files,
+        headers={'X-API-KEY': api_key},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (
+        data['added_chunks'],
+        data['removed_chunks'],
+        data['unchanged_chunks'],
+    ) == (1, 1, 1)
+
+    added_chunks, added_ids = mock_add.call_args[0]
+    assert [chunk.page_content for chunk in added_chunks] == ['Novo']
+    # O vetor removido fica para o purger, registrado na mesma transação
+    mock_delete.assert_not_called()
+    result = await session.execute(select(ChunkDeletion.chunk_id))
+    assert result.scalars().all() == ['old-1']
+    assert 'old-1' in get_tombstones()
+    mock_update_metadata.assert_not_called()
+
+    await session.refresh(document)
+    assert await get_chunk_ids(session, document.id) == ['old-0', added_ids[0]]
+    assert document.sha256 != 'a' * 64
+
+
+@pytest.mark.asyncio
+async def test_update_document_with_identical_file_is_noop(
+    mocker, client, session, api_key
+):
+    """
+    Tests whether re-sending the same PDF does not parse or touch the vector store.
+    """
+    content = make_pdf_bytes('Mesmo conteúdo.')
+    document = await create_document(
+        session,
+        ['c0'],
+        filename='cv.pdf',
+        size_mb=1.0,
+        sha256=hashlib.sha256(content).hexdigest(),
+    )
+    mock_process_pdf = mocker.patch('documents.routes.process_pdf')
+
+    files = [('file', ('cv.pdf', content, 'application/pdf'))]
+    response = await client.put(
+        f'/api/documents/{document.id}',
+        files=files,
+        headers={'X-API-KEY': api_key},
+    )
+
+    assert response.status_code == 200
+    assert response.json()['message'] == 'Document content is unchanged.'
+    mock_process_pdf.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_update_document_accepts_a_file_of_the_maximum_size(
+    mocker, client, session, api_key
+):
+    """
+    Tests whether a file of exactly MAX_FILE_SIZE_MB is accepted, the multipart overhead counting only against MAX_UPLOAD_SIZE_MB.
+    """
+    mocker.patch('documents.routes.settings.MAX_FILE_SIZE_MB', 1)
+    content = b'0' * (1024 * 1024)
+    document = await create_document(
+        session,
+        ['c0'],
+        filename='cv.pdf',
+        size_mb=1.0,
+        sha256=hashlib.sha256(content).hexdigest(),
+    )
+
+    files = [('file', ('cv.pdf', content, 'application/pdf'))]
+    response = await client.put(
+        f'/api/documents/{document.id}',
+        files=files,
+        headers={'X-API-KEY': api_key},
+    )
+
+    assert response.status_code == 200
+    assert response.json()['message'] == 'Document content is unchanged.'
+
+
+@pytest.mark.asyncio
+async def test_update_document_not_found(client, api_key):
+    """
+    Tests whether replacing an unknown document returns 404.
+    """
+    files = [('file', ('cv.pdf', make_pdf_bytes('x'), 'application/pdf'))]
+    response = await client.put(
+        f'/api/documents/{uuid4()}',
+        files=files,
+        headers={'X-API-KEY': api_key},
+    )
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_update_document_while_indexing_returns_conflict(
+    client, session, api_key
+):
+    """
+    Tests whether a document whose ingestion job is still pending cannot be replaced.
+    """
+    document = await create_document(
+        session, ['c0'], filename='cv.pdf', size_mb=1.0
+    )
+    session.add(IngestionJob(document_id=document.id, payload=[]))
+    await session.commit()
+
+    files = [('file', ('cv.pdf', make_pdf_bytes('x'), 'application/pdf'))]
+    response = await client.put(
+        f'/api/documents/{document.id}',
+        files=files,
+        headers={'X-API-KEY': api_key},
+    )
+
+    assert response.status_code == 409
+
+
 # Test DELETE /api/documents
 @pytest.mark.asyncio
 async def test_delete_document_success(mocker, client, session, api_key):
     """
-    Deletes document and chunks successfully, checking DB integration.
+    Tombstones the document without touching the vector store, hiding it and its chunks immediately.
     """
     fake_chunk_ids = ['chunk1', 'chunk2']
 
     # Cria e salva documento no banco real de teste
-    document = DocumentRecord(filename='test.pdf', chunks_ids=fake_chunk_ids, size_mb=1.0)
-    session.add(document)
-    await session.commit()
+    document = await create_document(
+        session,
+        fake_chunk_ids,
+        filename='test.pdf',
+        size_mb=1.0,
+        sha256='a' * 64,
+    )
 
-    # Mock delete_chunks_by_ids para simular sucesso sem executar a função real
-    mock_delete_chunks = mocker.patch('documents.routes.delete_chunks_by_ids', return_value=None)
+    mock_delete_chunks = mocker.patch('documents.purger.delete_chunks_by_ids')
 
-    response = await client.delete(f'/api/documents/{document.id}', headers={'X-API-KEY': api_key})
+    response = await client.delete(
+        f'/api/documents/{document.id}', headers={'X-API-KEY': api_key}
+    )
 
     assert response.status_code == 200
-    assert response.json() == {'message': f"{len(fake_chunk_ids)} chunk(s) deleted and document removed successfully."}
-    mock_delete_chunks.assert_called_once_with(fake_chunk_ids)
+    assert response.json() == {
+        'message': f'{len(fake_chunk_ids)} chunk(s) scheduled for deletion and document removed successfully.'
+    }
+    mock_delete_chunks.assert_not_called()
+    assert all(chunk_id in get_tombstones() for chunk_id in fake_chunk_ids)
 
-    # Verifica se o documento realmente foi removido do DB
-    deleted_doc = await session.get(DocumentRecord, document.id)
-    assert deleted_doc is None
+    # O registro fica como tombstone até o purger apagar os vetores
+    await session.refresh(document)
+    assert document.deleted_at is not None
+    assert document.sha256 is None
+
+    response = await client.get(
+        '/api/documents', headers={'X-API-KEY': api_key}
+    )
+    assert response.json()['items'] == []
+
+    response = await client.delete(
+        f'/api/documents/{document.id}', headers={'X-API-KEY': api_key}
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_documents(client, session, api_key):
+    """
+    Tests whether bulk delete tombstones every existing document in one call and reports unknown ids.
+    """
+    first = await create_document(
+        session, ['a0', 'a1'], filename='a.pdf', size_mb=1.0
+    )
+    second = await create_document(
+        session, ['b0'], filename='b.pdf', size_mb=1.0
+    )
+    unknown = uuid4()
+
+    response = await client.post(
+        '/api/documents/bulk-delete',
+        json={'document_ids': [str(first.id), str(second.id), str(unknown)]},
+        headers={'X-API-KEY': api_key},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data['deleted']) == {str(first.id), str(second.id)}
+    assert data['not_found'] == [str(unknown)]
+    assert data['total_chunks'] == 3
+    assert 'b0' in get_tombstones()
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_requires_ids(client, api_key):
+    """
+    Tests whether bulk delete rejects an empty id list.
+    """
+    response = await client.post(
+        '/api/documents/bulk-delete',
+        json={'document_ids': []},
+        headers={'X-API-KEY': api_key},
+    )
+
+    assert response.status_code == 422
 
 
 @pytest.mark.asyncio
@@ -299,15 +967,17 @@ async def test_delete_documents_unauthorized(client, session):
     fake_chunk_ids = ['chunk1', 'chunk2']
 
     # Cria e salva documento no banco real de teste
-    document = DocumentRecord(filename='test.pdf', chunks_ids=fake_chunk_ids, size_mb=1.0)
-    session.add(document)
-    await session.commit()
+    document = await create_document(
+        session, fake_chunk_ids, filename='test.pdf', size_mb=1.0
+    )
 
     response = await client.delete(f'/api/documents/{document.id}')
     assert response.status_code == 401
     assert response.json()['detail'] == 'Unauthorized'
 
-    response = await client.delete(f'/api/documents/{document.id}', headers={'X-API-KEY': 'wrong-key'})
+    response = await client.delete(
+        f'/api/documents/{document.id}', headers={'X-API-KEY': 'wrong-key'}
+    )
     assert response.status_code == 401
     assert response.json()['detail'] == 'Unauthorized'
 
@@ -319,7 +989,9 @@ async def test_delete_document_not_found(client, api_key):
     """
     non_existent_uuid = uuid4()  # UUID válido, mas inexistente no DB
 
-    response = await client.delete(f'/api/documents/{non_existent_uuid}', headers={'X-API-KEY': api_key})
+    response = await client.delete(
+        f'/api/documents/{non_existent_uuid}', headers={'X-API-KEY': api_key}
+    )
     assert response.status_code == 404
     assert response.json()['detail'] == 'Document not found.'
 
@@ -330,30 +1002,42 @@ async def test_delete_document_no_chunks(client, session, api_key):
     Returns 404 if document has no associated chunks.
     """
     # Cria documento sem chunks
-    document = DocumentRecord(filename='empty.pdf', chunks_ids=[], size_mb=1.0)
-    session.add(document)
-    await session.commit()
+    document = await create_document(
+        session, [], filename='empty.pdf', size_mb=1.0
+    )
 
-    response = await client.delete(f'/api/documents/{document.id}', headers={'X-API-KEY': api_key})
+    response = await client.delete(
+        f'/api/documents/{document.id}', headers={'X-API-KEY': api_key}
+    )
     assert response.status_code == 404
-    assert response.json()['detail'] == 'No associated chunks found for this document.'
+    assert (
+        response.json()['detail']
+        == 'No associated chunks found for this document.'
+    )
 
 
 @pytest.mark.asyncio
-async def test_delete_document_internal_error(mocker, client, session, api_key):
+async def test_delete_document_internal_error(
+    mocker, client, session, api_key
+):
     """
     Returns 500 if an error occurs during chunk deletion.
     """
     fake_chunk_ids = ['chunk1']
 
-    document = DocumentRecord(filename='error.pdf', chunks_ids=fake_chunk_ids, size_mb=1.0)
-    session.add(document)
-    await session.commit()
+    document = await create_document(
+        session, fake_chunk_ids, filename='error.pdf', size_mb=1.0
+    )
 
-    # Força erro na função de deletar chunks
-    mocker.patch('documents.routes.delete_chunks_by_ids', side_effect=Exception('Vector store error'))
+    # Força erro ao marcar o documento como removido
+    mocker.patch(
+        'documents.routes.tombstone_documents',
+        side_effect=Exception('Database error'),
+    )
 
-    response = await client.delete(f'/api/documents/{document.id}', headers={'X-API-KEY': api_key})
+    response = await client.delete(
+        f'/api/documents/{document.id}', headers={'X-API-KEY': api_key}
+    )
 
     assert response.status_code == 500
     assert 'Error deleting document and chunks' in response.json()['detail']
@@ -0,0 +1,219 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+import numpy as np
+
+from app.metrics import CACHE_REQUESTS
+from app.settings import settings
+
+
+@dataclass
+class _CacheEntry:
+    question: str
+    embedding: np.ndarray
+    response: Dict[str, Any]
+    created_at: float
+    size_bytes: int
+
+
+class SemanticAnswerCache:
+    """
+    Cache de respostas indexado pela similaridade semântica das perguntas.
+
+    Perguntas cujo embedding tenha similaridade de cosseno maior ou igual a
+    `similarity_threshold` com uma pergunta já respondida reaproveitam a
+    resposta armazenada, evitando a busca no vector store e a chamada ao LLM.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float,
+        max_entries: int,
+        ttl_seconds: int,
+        max_memory_mb: float,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+
+        self._entries: 'OrderedDict[str, _CacheEntry]' = OrderedDict()
+        self._memory_bytes = 0
+        self._generation = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """Versão do corpus; muda a cada invalidação."""
+        return self._generation
+
+    def lookup(self, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Retorna a resposta da pergunta mais similar, se acima do limiar."""
+        self._evict_expired()
+
+        if not self._entries:
+            return self._miss()
+
+        query = _normalize(embedding)
+        matrix = self._get_matrix()
+        if matrix.shape[1] != query.shape[0]:
+            return self._miss()
+
+        similarities = matrix @ query
+        best = int(np.argmax(similarities))
+
+        if similarities[best] < self.similarity_threshold:
+            return self._miss()
+
+        key = self._matrix_keys[best]
+        self._entries.move_to_end(key)
+        self.hits += 1
+        CACHE_REQUESTS.inc(cache='answer', result='hit')
+        return dict(self._entries[key].response)
+
+    def _miss(self) -> None:
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache='answer', result='miss')
+
+    def store(
+        self,
+        question: str,
+        embedding: List[float],
+        response: Dict[str, Any],
+        generation: Optional[int] = None,
+    ):
+        """
+        Armazena a resposta de uma pergunta.
+
+        Se `generation` for informado e o corpus tiver sido invalidado desde
+        então, a resposta é descartada para não cachear um resultado obsoleto.
+        """
+        if generation is not None and generation != self._generation:
+            return
+
+        vector = _normalize(embedding)
+        entry = _CacheEntry(
+            question=question,
+            embedding=vector,
+            response=dict(response),
+            created_at=time.monotonic(),
+            size_bytes=_estimate_size(question, vector, response),
+        )
+        if entry.size_bytes > self.max_memory_bytes:
+            return
+
+        self._entries[uuid4().hex] = entry
+        self._memory_bytes += entry.size_bytes
+        self._matrix = None
+
+        self._evict_overflow()
+
+    def invalidate(self):
+        """Remove todas as entradas (o corpus de documentos mudou)."""
+        self._entries.clear()
+        self._memory_bytes = 0
+        self._matrix = None
+        self._matrix_keys = []
+        self._generation += 1
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'memory_bytes': self._memory_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def _get_matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries.keys())
+            self._matrix = np.vstack([
+                self._entries[key].embedding for key in self._matrix_keys
+            ])
+        return self._matrix
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._memory_bytes -= entry.size_bytes
+        self._matrix = None
+
+    def _evict_expired(self):
+        if not self.ttl_seconds:
+            return
+
+        now = time.monotonic()
+        # As entradas estão em ordem de uso, não de criação
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if now - entry.created_at > self.ttl_seconds
+        ]
+        for key in expired:
+            self._remove(key)
+            self.evictions += 1
+
+    def _evict_overflow(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or self._memory_bytes > self.max_memory_bytes
+        ):
+            # Remove a entrada usada há mais tempo (LRU)
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+
+def _normalize(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _estimate_size(
+    question: str, vector: np.ndarray, response: Dict[str, Any]
+) -> int:
+    """Estimativa aproximada do espaço ocupado por uma entrada."""
+    answer = response.get('answer') or ''
+    sources = response.get('sources') or []
+    return (
+        vector.nbytes
+        + len(question.encode('utf-8'))
+        + len(answer.encode('utf-8'))
+        + 128 * len(sources)
+        + 256
+    )
+
+
+_global_instance_answer_cache: Optional[SemanticAnswerCache] = None
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    global _global_instance_answer_cache
+
+    if _global_instance_answer_cache is None:
+        _global_instance_answer_cache = SemanticAnswerCache(
+            similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+            max_memory_mb=settings.ANSWER_CACHE_MAX_MEMORY_MB,
+        )
+    return _global_instance_answer_cache
+
+
+def invalidate_answer_cache():
+    """Invalida o cache de respostas após mudanças no corpus."""
+    if _global_instance_answer_cache is not None:
+        _global_instance_answer_cache.invalidate()
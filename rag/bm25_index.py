@@ -0,0 +1,374 @@
+import fcntl
+import glob
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
+from heapq import nlargest
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.settings import settings
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+# O log de alterações é compactado quando passa do número de chunks do
+# índice (e deste mínimo): o custo de persistir fica proporcional ao lote
+_COMPACTION_MIN_ENTRIES = 1000
+
+_global_instance_bm25_index: Optional['BM25Index'] = None
+
+
+def _stat_signature(stat: os.stat_result) -> Tuple[int, int, int]:
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """Identifica a versão de um arquivo (inode, mtime, tamanho) sem lê-lo."""
+    try:
+        return _stat_signature(os.stat(path))
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Serializa as gravações do índice em `path` entre processos."""
+    with open(f'{path}.lock', 'a', encoding='utf-8') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sem acentos, separado em palavras (`langchain-chroma` -> langchain, chroma)."""
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    normalized = ''.join(
+        char for char in normalized if not unicodedata.combining(char)
+    )
+    return _TOKEN_PATTERN.findall(normalized)
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 dos chunks, mantido em memória.
+
+    Atualizado incrementalmente a cada inclusão/remoção de chunks. Em disco,
+    um snapshot JSON com o conteúdo e os metadados dos chunks e um log
+    (JSON lines) com as alterações posteriores: `save` apenas acrescenta ao
+    log as alterações pendentes e reescreve o snapshot só na compactação.
+    Snapshot e log são identificados por uma geração, e ao carregar apenas o
+    log da geração do snapshot é aplicado; as listas invertidas são
+    reconstruídas ao carregar.
+
+    Outros processos (workers de ingestão, réplicas da API) gravam nos mesmos
+    arquivos: as gravações são serializadas por um `flock`, e cada busca
+    aplica o que foi acrescentado ao log (ou relê um snapshot novo) desde a
+    última leitura.
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75
+    ):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+
+        self._documents: Dict[str, Document] = {}
+        self._term_freqs: Dict[str, Counter] = {}
+        self._lengths: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._pending: List[dict] = []
+        self._generation = 0
+        self._snapshot_signature: Optional[Tuple[int, int, int]] = None
+        self._log_offset = 0
+        self._log_entries = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, documents: List[Document], ids: List[str]):
+        """Indexa os chunks; ids já existentes são substituídos."""
+        with self._lock:
+            for document, doc_id in zip(documents, ids):
+                self._add(document, doc_id)
+                if self.path:
+                    self._pending.append({
+                        'op': 'add',
+                        'id': doc_id,
+                        'page_content': document.page_content,
+                        'metadata': document.metadata,
+                    })
+
+    def remove(self, ids: List[str]):
+        with self._lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+                if self.path:
+                    self._pending.append({'op': 'remove', 'id': doc_id})
+
+    def _add(self, document: Document, doc_id: str):
+        self._remove(doc_id)
+
+        term_freqs = Counter(tokenize(document.page_content))
+        self._documents[doc_id] = Document(
+            id=doc_id,
+            page_content=document.page_content,
+            metadata=dict(document.metadata),
+        )
+        self._term_freqs[doc_id] = term_freqs
+        self._lengths[doc_id] = sum(term_freqs.values())
+        self._total_length += self._lengths[doc_id]
+        for term, freq in term_freqs.items():
+            self._postings.setdefault(term, {})[doc_id] = freq
+
+    def _remove(self, doc_id: str):
+        term_freqs = self._term_freqs.pop(doc_id, None)
+        if term_freqs is None:
+            return
+
+        del self._documents[doc_id]
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in term_freqs:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def _apply(self, op: dict):
+        if op['op'] == 'add':
+            self._add(
+                Document(
+                    page_content=op['page_content'], metadata=op['metadata']
+                ),
+                op['id'],
+            )
+        else:
+            self._remove(op['id'])
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """Retorna até `k` chunks com maior pontuação BM25 para a consulta."""
+        with self._lock:
+            self._refresh()
+
+            total_docs = len(self._documents)
+            if total_docs == 0:
+                return []
+
+            average_length = self._total_length / total_docs
+            scores: Dict[str, float] = {}
+
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+
+                doc_freq = len(postings)
+                idf = math.log(
+                    1 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5)
+                )
+
+                for doc_id, freq in postings.items():
+                    norm = self.k1 * (
+                        1
+                        - self.b
+                        + self.b * self._lengths[doc_id] / average_length
+                    )
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (
+                        self.k1 + 1
+                    ) / (freq + norm)
+
+            top = nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(self._documents[doc_id], score) for doc_id, score in top]
+
+    def _log_path(self, generation: int) -> str:
+        return f'{self.path}.{generation}.log'
+
+    # Estado em disco (chamados com `_lock`)
+    def _refresh(self):
+        """
+        Aplica as alterações gravadas por outros processos: relê tudo se o
+        snapshot mudou (compactação) ou apenas as linhas novas do log.
+        Alterações locais ainda não salvas são reaplicadas por cima.
+        """
+        if not self.path:
+            return
+
+        if _file_signature(self.path) != self._snapshot_signature:
+            self._reload()
+        elif not self._catch_up():
+            return
+        for op in self._pending:
+            self._apply(op)
+
+    def _reload(self):
+        self._documents, self._term_freqs, self._lengths, self._postings = (
+            {},
+            {},
+            {},
+            {},
+        )
+        self._total_length = 0
+        self._generation = 0
+        self._snapshot_signature = None
+        self._log_offset = 0
+        self._log_entries = 0
+
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                # Assinatura do arquivo aberto: uma troca durante a leitura é vista na próxima
+                self._snapshot_signature = _stat_signature(
+                    os.fstat(f.fileno())
+                )
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {'documents': []}
+
+        for item in data['documents']:
+            self._add(
+                Document(
+                    page_content=item['page_content'],
+                    metadata=item['metadata'],
+                ),
+                item['id'],
+            )
+        self._generation = data.get('generation', 0)
+        self._catch_up()
+
+    def _catch_up(self) -> bool:
+        """Aplica as linhas acrescentadas ao log desde a última leitura."""
+        log_path = self._log_path(self._generation)
+        try:
+            if os.path.getsize(log_path) <= self._log_offset:
+                return False
+            with open(log_path, 'rb') as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return False
+
+        # Uma linha incompleta (gravação em andamento ou interrompida) não é aplicada
+        complete = data[: data.rfind(b'\n') + 1]
+        if not complete:
+            return False
+        for line in complete.splitlines():
+            self._apply(json.loads(line))
+            self._log_entries += 1
+        self._log_offset += len(complete)
+        return True
+
+    def _append_log(self, pending: List[dict]):
+        data = ''.join(
+            json.dumps(op, ensure_ascii=False) + '\n' for op in pending
+        ).encode('utf-8')
+        with open(self._log_path(self._generation), 'ab') as f:
+            # Descarta a linha incompleta de uma gravação interrompida
+            f.truncate(self._log_offset)
+            f.write(data)
+        self._log_offset += len(data)
+        self._log_entries += len(pending)
+
+    def save(self):
+        """
+        Persiste as alterações pendentes, acrescentando-as ao log. Quando o log
+        fica maior que o índice, grava um novo snapshot de forma atômica
+        (arquivo temporário + rename) e descarta o log anterior.
+        """
+        if not self.path:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._save_lock, _file_lock(self.path):
+            with self._lock:
+                # Alterações de outros processos entram antes das pendentes, na ordem do log
+                self._refresh()
+                pending, self._pending = self._pending, []
+                compact = self._snapshot_signature is None or (
+                    self._log_entries + len(pending)
+                    > max(len(self._documents), _COMPACTION_MIN_ENTRIES)
+                )
+                if not compact:
+                    if pending:
+                        self._append_log(pending)
+                    return
+
+                previous_generation = self._generation
+                data = {
+                    'version': 1,
+                    'generation': previous_generation + 1,
+                    'documents': [
+                        {
+                            'id': doc_id,
+                            'page_content': doc.page_content,
+                            'metadata': doc.metadata,
+                        }
+                        for doc_id, doc in self._documents.items()
+                    ],
+                }
+
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+                signature = _stat_signature(os.fstat(f.fileno()))
+            os.replace(tmp_path, self.path)
+
+            with self._lock:
+                # Uma busca concorrente pode já ter relido o snapshot novo
+                self._generation = data['generation']
+                self._snapshot_signature = signature
+                self._log_offset = 0
+                self._log_entries = 0
+
+            # O log antigo já está no snapshot (e seria ignorado ao carregar)
+            if os.path.exists(self._log_path(previous_generation)):
+                os.remove(self._log_path(previous_generation))
+
+    @classmethod
+    def load(cls, path: str) -> 'BM25Index':
+        """Carrega o índice do disco; retorna um índice vazio se o arquivo não existir."""
+        index = cls(path=path)
+        with index._lock:
+            index._reload()
+        return index
+
+
+def get_bm25_index() -> BM25Index:
+    global _global_instance_bm25_index
+
+    if _global_instance_bm25_index is None:
+        _global_instance_bm25_index = BM25Index.load(settings.bm25_index_path)
+    return _global_instance_bm25_index
+
+
+def discard_bm25_index():
+    """
+    Apaga o índice do disco, que deixou de acompanhar o vector store (com
+    `RETRIEVAL_MODE=vector` ele não é atualizado); `ensure_bm25_index` o
+    reconstrói quando a busca léxica for ativada.
+    """
+    global _global_instance_bm25_index
+
+    _global_instance_bm25_index = None
+    path = settings.bm25_index_path
+    if not os.path.exists(path):
+        return
+
+    with _file_lock(path):
+        # Logs antes do snapshot: sem o snapshot, o índice é sempre reconstruído
+        for log_path in glob.glob(f'{glob.escape(path)}.*.log'):
+            os.remove(log_path)
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,159 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.settings import settings
+from rag.tokens import count_tokens
+
+# Maior distância (em caracteres) entre dois chunks para considerá-los
+# vizinhos: o separador removido pelo splitter ("\n\n", "\n" ou " ")
+_ADJACENT_GAP = 2
+
+
+def _token_count(document: Document) -> int:
+    # Calculado na ingestão; chunks antigos sem o metadado são contados agora
+    token_count = document.metadata.get('token_count')
+    if token_count is None:
+        return count_tokens(document.page_content)
+    return token_count
+
+
+class _Block:
+    """Trecho contínuo de uma página, formado por um ou mais chunks."""
+
+    def __init__(self, document: Document, rank: int):
+        self.documents = [document]
+        self.rank = rank
+        self.text = document.page_content
+        self.start = document.metadata.get('start_index')
+        self.end = None if self.start is None else self.start + len(self.text)
+        self.tokens = _token_count(document)
+
+    def touches(self, start: int) -> bool:
+        return start <= self.end + _ADJACENT_GAP
+
+    def extend(self, document: Document, rank: int):
+        start = document.metadata['start_index']
+        end = start + len(document.page_content)
+        if end > self.end:
+            # Apenas o texto além do fim do bloco: a sobreposição não se repete
+            new_text = document.page_content[max(self.end - start, 0) :]
+            separator = '\n' if start > self.end else ''
+            self.text += separator + new_text
+            # Tokens proporcionais ao trecho novo, sem tokenizar de novo
+            self.tokens += math.ceil(
+                _token_count(document)
+                * len(new_text)
+                / max(len(document.page_content), 1)
+            )
+            self.end = end
+        self.documents.append(document)
+        self.rank = min(self.rank, rank)
+
+    def to_document(self) -> Document:
+        if len(self.documents) == 1:
+            return self.documents[0]
+        first = self.documents[0]
+        return Document(
+            id=first.id,
+            page_content=self.text,
+            metadata={
+                **first.metadata,
+                'start_index': self.start,
+                'token_count': self.tokens,
+            },
+        )
+
+
+def _merge_blocks(documents: List[Document]) -> List[_Block]:
+    """Une chunks sobrepostos ou vizinhos da mesma página (mesmo source e page)."""
+    blocks: List[_Block] = []
+    by_page: Dict[Tuple, List[Tuple[int, Document]]] = {}
+
+    for rank, document in enumerate(documents):
+        if document.metadata.get('start_index') is None:
+            # Indexado antes de `start_index` existir: posição desconhecida
+            blocks.append(_Block(document, rank))
+        else:
+            key = (
+                document.metadata.get('source'),
+                document.metadata.get('page'),
+            )
+            by_page.setdefault(key, []).append((rank, document))
+
+    for chunks in by_page.values():
+        chunks.sort(key=lambda item: item[1].metadata['start_index'])
+        block: Optional[_Block] = None
+        for rank, document in chunks:
+            if block is not None and block.touches(
+                document.metadata['start_index']
+            ):
+                block.extend(document, rank)
+            else:
+                block = _Block(document, rank)
+                blocks.append(block)
+
+    return blocks
+
+
+def assemble_context(
+    documents: List[Document],
+    token_budget: Optional[int] = None,
+    merge: Optional[bool] = None,
+    kept: Optional[List[Document]] = None,
+) -> List[Document]:
+    """
+    Monta o contexto enviado ao LLM a partir dos chunks recuperados (em ordem
+    de relevância).
+
+    Chunks da mesma página que se sobrepõem (`CHUNK_OVERLAP`) ou são vizinhos
+    viram um único trecho, sem o texto repetido. Os trechos são então
+    incluídos em ordem de relevância enquanto couberem em `token_budget`
+    (padrão: `CONTEXT_TOKEN_BUDGET`); um trecho que não cabe é pulado e os
+    seguintes, menores, ainda podem entrar. O mais relevante é sempre
+    incluído, mesmo acima do orçamento.
+
+    Os tokens vêm do metadado `token_count`, calculado na ingestão.
+
+    Com `kept`, os chunks recuperados que chegaram ao contexto (inteiros ou
+    unidos a outros) são adicionados à lista, em ordem de relevância (usado
+    no modo debug de `/ask-question`).
+    """
+    token_budget = (
+        settings.CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    )
+    merge = settings.CONTEXT_MERGE_CHUNKS if merge is None else merge
+
+    if not merge and token_budget == 0:
+        if kept is not None:
+            kept.extend(documents)
+        return list(documents)
+
+    if merge:
+        blocks = sorted(_merge_blocks(documents), key=lambda block: block.rank)
+    else:
+        blocks = [
+            _Block(document, rank) for rank, document in enumerate(documents)
+        ]
+
+    packed: List[_Block] = []
+    used_tokens = 0
+    for block in blocks:
+        if (
+            token_budget == 0
+            or not packed
+            or used_tokens + block.tokens <= token_budget
+        ):
+            packed.append(block)
+            used_tokens += block.tokens
+
+    if kept is not None:
+        included = {
+            id(document) for block in packed for document in block.documents
+        }
+        kept.extend(
+            document for document in documents if id(document) in included
+        )
+
+    return [block.to_document() for block in packed]
@@ -0,0 +1,244 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.metrics import CACHE_REQUESTS
+from app.settings import settings
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Cache persistente (SQLite) de embeddings de chunks.
+
+    Cada entrada é identificada por (namespace, sha256 do texto), onde o
+    namespace identifica o modelo de embedding. Os vetores são gravados como
+    float32 e as entradas usadas há mais tempo são removidas quando o arquivo
+    ultrapassa `max_size_mb`.
+    """
+
+    def __init__(self, path: str, max_size_mb: float):
+        self.path = path
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._size_bytes = 0
+        self._entries = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Conexão aberta sob demanda, na primeira utilização do cache
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS embeddings ('
+                ' namespace TEXT NOT NULL,'
+                ' content_hash TEXT NOT NULL,'
+                ' vector BLOB NOT NULL,'
+                ' last_used REAL NOT NULL,'
+                ' PRIMARY KEY (namespace, content_hash))'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_embeddings_last_used'
+                ' ON embeddings (last_used)'
+            )
+            self._connection = connection
+            self._refresh_totals()
+        return self._connection
+
+    def _refresh_totals(self):
+        self._entries, self._size_bytes = self._connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings'
+        ).fetchone()
+
+    def get_many(
+        self, namespace: str, hashes: List[str]
+    ) -> Dict[str, List[float]]:
+        """Retorna os vetores encontrados no cache, indexados pelo hash."""
+        unique_hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            connection = self._connect()
+            # Consulta em lotes para respeitar o limite de parâmetros do SQLite
+            for start in range(0, len(unique_hashes), 500):
+                batch = unique_hashes[start : start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = connection.execute(
+                    'SELECT content_hash, vector FROM embeddings'
+                    f' WHERE namespace = ? AND content_hash IN ({placeholders})',
+                    [namespace, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                connection.executemany(
+                    'UPDATE embeddings SET last_used = ?'
+                    ' WHERE namespace = ? AND content_hash = ?',
+                    [(time.time(), namespace, key) for key in found],
+                )
+                connection.commit()
+
+        hits = sum(1 for key in hashes if key in found)
+        self.hits += hits
+        self.misses += len(hashes) - hits
+        CACHE_REQUESTS.inc(hits, cache='embedding', result='hit')
+        CACHE_REQUESTS.inc(
+            len(hashes) - hits, cache='embedding', result='miss'
+        )
+        return found
+
+    def put_many(self, namespace: str, vectors: Dict[str, List[float]]):
+        now = time.time()
+        rows = [
+            (
+                namespace,
+                key,
+                np.asarray(vector, dtype=np.float32).tobytes(),
+                now,
+            )
+            for key, vector in vectors.items()
+        ]
+
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(
+                'INSERT OR REPLACE INTO embeddings'
+                ' (namespace, content_hash, vector, last_used)'
+                ' VALUES (?, ?, ?, ?)',
+                rows,
+            )
+            connection.commit()
+            self._refresh_totals()
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection):
+        while self._size_bytes > self.max_size_bytes and self._entries:
+            # Remove em lotes as entradas usadas há mais tempo
+            rows = connection.execute(
+                'SELECT namespace, content_hash, LENGTH(vector)'
+                ' FROM embeddings ORDER BY last_used LIMIT 100'
+            ).fetchall()
+            removed = 0
+            for namespace, key, size in rows:
+                if self._size_bytes <= self.max_size_bytes:
+                    break
+                connection.execute(
+                    'DELETE FROM embeddings'
+                    ' WHERE namespace = ? AND content_hash = ?',
+                    (namespace, key),
+                )
+                self._size_bytes -= size
+                self._entries -= 1
+                removed += 1
+            self.evictions += removed
+            connection.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            self._connect()
+        lookups = self.hits + self.misses
+        return {
+            'entries': self._entries,
+            'size_bytes': self._size_bytes,
+            'max_size_bytes': self.max_size_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings que consultam o `EmbeddingCache` antes do provedor.
+
+    Apenas os textos ausentes do cache são enviados ao modelo; embeddings de
+    perguntas (`embed_query`) não passam pelo cache.
+    """
+
+    def __init__(
+        self, embeddings: Embeddings, cache: EmbeddingCache, namespace: str
+    ):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.namespace = namespace
+
+    def _lookup(self, texts: List[str]):
+        hashes = [content_hash(text) for text in texts]
+        vectors = self.cache.get_many(self.namespace, hashes)
+
+        # Textos repetidos no mesmo lote são enviados uma única vez
+        missing: Dict[str, str] = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        return hashes, vectors, missing
+
+    def _store(self, vectors, missing, new_vectors):
+        computed = dict(zip(missing.keys(), new_vectors))
+        self.cache.put_many(self.namespace, computed)
+        vectors.update(computed)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, vectors, missing = self._lookup(texts)
+        if missing:
+            new_vectors = self.embeddings.embed_documents(
+                list(missing.values())
+            )
+            self._store(vectors, missing, new_vectors)
+        return [vectors[key] for key in hashes]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, vectors, missing = self._lookup(texts)
+        if missing:
+            new_vectors = await self.embeddings.aembed_documents(
+                list(missing.values())
+            )
+            self._store(vectors, missing, new_vectors)
+        return [vectors[key] for key in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
+
+
+_global_instance_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _global_instance_embedding_cache
+
+    if _global_instance_embedding_cache is None:
+        _global_instance_embedding_cache = EmbeddingCache(
+            path=settings.embedding_cache_path,
+            max_size_mb=settings.EMBEDDING_CACHE_MAX_SIZE_MB,
+        )
+    return _global_instance_embedding_cache
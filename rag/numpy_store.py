@@ -0,0 +1,834 @@
+"""
+Vector store de busca exata sobre uma matriz float32 mapeada em memória.
+
+Layout do diretório (`NUMPY_STORE_PATH`):
+
+- `meta.json`: dimensão dos vetores, geração atual dos arquivos e metadados
+  da coleção (ex.: modelo de embedding)
+- `embeddings-<geração>.f32`: matriz de embeddings normalizados, uma linha
+  por chunk, apenas acrescentada
+- `log-<geração>.jsonl`: log das operações (`add`, `delete`, `update`) com o
+  id, o conteúdo e os metadados de cada chunk
+- `embeddings-<geração>.f16` ou `embeddings-<geração>.i8` (+ `scales-<geração>.f32`):
+  cópia comprimida da matriz, quando a quantização está ativa
+
+Com quantização (`float16` ou `int8` com escala por linha), a busca percorre
+apenas a cópia comprimida (2x ou 4x menor, a parte que precisa ficar em RAM)
+e recalcula o score exato, na matriz float32, somente dos
+`k * rescore_factor` melhores candidatos; o float32 é lido do disco por linha
+e não precisa ficar residente.
+
+Removidos e substituídos ficam como linhas mortas até a compactação, que
+regrava apenas as linhas vivas em uma nova geração e troca `meta.json` de
+forma atômica. Outros processos (workers, réplicas da API) leem os mesmos
+arquivos: o mapeamento compartilha o page cache e cada leitura aplica as
+operações acrescentadas ao log desde a última vez. Escritas entre processos
+são serializadas por um `flock`.
+"""
+
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from uuid import uuid4
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+META_FILENAME = 'meta.json'
+LOCK_FILENAME = '.lock'
+
+QUANTIZATIONS = ('none', 'float16', 'int8')
+QUANTIZED_SUFFIXES = {'float16': 'f16', 'int8': 'i8'}
+
+# Linhas convertidas para float32 por vez ao pontuar a cópia comprimida
+# (blocos pequenos cabem no cache da CPU)
+SCORE_BLOCK_ROWS = 256
+
+# Perguntas pontuadas por vez na busca em lote (limita a matriz perguntas × chunks)
+QUERY_BLOCK_SIZE = 64
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """Identifica a versão de um arquivo (inode, mtime, tamanho) sem lê-lo."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def quantize(
+    vectors: np.ndarray, quantization: str
+) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Comprime vetores float32: retorna (vetores comprimidos, escala por linha).
+
+    No int8 cada linha é dividida por max(|x|) / 127, de modo que o score
+    aproximado é (q · consulta) * escala.
+    """
+    if quantization == 'float16':
+        return vectors.astype(np.float16), None
+    if quantization == 'int8':
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales = np.where(scales == 0, 1, scales).astype(np.float32)
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales
+    return None, None
+
+
+class _Snapshot:
+    """Estado imutável lido pelas buscas; cada escrita publica um novo."""
+
+    def __init__(
+        self,
+        matrix: Optional[np.ndarray],
+        alive: np.ndarray,
+        row_ids: List[Optional[str]],
+        quantized: Optional[np.ndarray] = None,
+        scales: Optional[np.ndarray] = None,
+        matrix_file: Optional[BinaryIO] = None,
+    ):
+        self.matrix = matrix
+        self.alive = alive
+        self.row_ids = row_ids
+        self.quantized = quantized
+        self.scales = scales
+        # Com quantização as linhas float32 são lidas com pread, sem mapear a matriz inteira
+        self.matrix_file = matrix_file
+
+    def read_rows(self, rows: np.ndarray) -> np.ndarray:
+        row_bytes = self.matrix.shape[1] * 4
+        fd = self.matrix_file.fileno()
+        data = b''.join(
+            os.pread(fd, row_bytes, int(row) * row_bytes) for row in rows
+        )
+        return np.frombuffer(data, dtype=np.float32).reshape(len(rows), -1)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Busca exata (produto interno de vetores normalizados, ou seja, cosseno)
+    com top-k via `np.argpartition`.
+
+    `compaction_threshold` é a fração de linhas mortas a partir da qual uma
+    remoção dispara a compactação dos arquivos. `quantization` (`none`,
+    `float16` ou `int8`) é gravada em `meta.json`; abrir um índice existente
+    com outro valor o converte por meio de uma compactação.
+    `collection_metadata` é gravado apenas na criação do índice, como no Chroma.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embedding_function: Embeddings,
+        compaction_threshold: float = 0.3,
+        quantization: str = 'none',
+        rescore_factor: int = 4,
+        collection_metadata: Optional[dict] = None,
+    ):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f'Unknown quantization: {quantization}.')
+
+        self.path = path
+        self.embedding_function = embedding_function
+        self.compaction_threshold = compaction_threshold
+        self.rescore_factor = rescore_factor
+
+        os.makedirs(path, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._dimensions: Optional[int] = None
+        self._quantization = 'none'
+        self._collection_metadata: dict = {}
+        self._generation = 0
+        self._meta_signature: Optional[Tuple[int, int, int]] = None
+        self._log_offset = 0
+        self._rows = 0
+        # id -> (linha, conteúdo, metadados)
+        self._records: Dict[str, Tuple[int, str, dict]] = {}
+        # Matriz float32 aberta para as releituras com pread, uma por geração
+        self._matrix_files: Dict[int, BinaryIO] = {}
+        self._snapshot = _Snapshot(None, np.zeros(0, dtype=bool), [])
+
+        with self._lock:
+            self._reload()
+            if collection_metadata and not os.path.exists(self._meta_path()):
+                with self._file_lock():
+                    if not os.path.exists(self._meta_path()):
+                        self._collection_metadata = dict(collection_metadata)
+                        self._write_meta(self._dimensions, self._generation)
+                self._refresh()
+            if self._quantization != quantization:
+                self._convert(quantization)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    # Arquivos
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, META_FILENAME)
+
+    def _matrix_path(self, generation: int) -> str:
+        return os.path.join(self.path, f'embeddings-{generation}.f32')
+
+    def _log_path(self, generation: int) -> str:
+        return os.path.join(self.path, f'log-{generation}.jsonl')
+
+    def _quantized_path(self, generation: int, quantization: str) -> str:
+        return os.path.join(
+            self.path,
+            f'embeddings-{generation}.{QUANTIZED_SUFFIXES[quantization]}',
+        )
+
+    def _scales_path(self, generation: int) -> str:
+        return os.path.join(self.path, f'scales-{generation}.f32')
+
+    def _generation_files(self, generation: int) -> List[str]:
+        return [
+            self._matrix_path(generation),
+            self._log_path(generation),
+            self._scales_path(generation),
+            *(
+                self._quantized_path(generation, quantization)
+                for quantization in QUANTIZED_SUFFIXES
+            ),
+        ]
+
+    def _read_meta(self) -> dict:
+        if not os.path.exists(self._meta_path()):
+            return {
+                'version': 1,
+                'dimensions': None,
+                'generation': 0,
+                'quantization': 'none',
+                'metadata': {},
+            }
+        with open(self._meta_path(), encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_meta(self, dimensions: Optional[int], generation: int):
+        tmp_path = f'{self._meta_path()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {
+                    'version': 1,
+                    'dimensions': dimensions,
+                    'generation': generation,
+                    'quantization': self._quantization,
+                    'metadata': self._collection_metadata,
+                },
+                f,
+            )
+        os.replace(tmp_path, self._meta_path())
+
+    def _write_vectors(
+        self, generation: int, first_row: int, vectors: np.ndarray
+    ):
+        """
+        Grava as linhas a partir de `first_row` na matriz float32 e na cópia
+        comprimida. Sobras de uma escrita interrompida (além das linhas
+        registradas no log) são descartadas antes.
+        """
+        quantized, scales = quantize(vectors, self._quantization)
+        files = [(self._matrix_path(generation), vectors)]
+        if quantized is not None:
+            files.append((
+                self._quantized_path(generation, self._quantization),
+                quantized,
+            ))
+        if scales is not None:
+            files.append((self._scales_path(generation), scales))
+
+        for path, array in files:
+            row_bytes = array.itemsize * (
+                array.shape[1] if array.ndim > 1 else 1
+            )
+            with open(path, 'ab') as f:
+                f.truncate(first_row * row_bytes)
+                f.write(np.ascontiguousarray(array).tobytes())
+
+    @contextmanager
+    def _file_lock(self):
+        """Serializa as escritas entre processos."""
+        with open(
+            os.path.join(self.path, LOCK_FILENAME), 'a', encoding='utf-8'
+        ) as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Estado em memória
+    def _reload(self, meta: Optional[dict] = None):
+        """Relê a geração atual (de `meta`, se já lido) desde o início."""
+        if meta is None:
+            self._meta_signature = _file_signature(self._meta_path())
+            meta = self._read_meta()
+        self._dimensions = meta['dimensions']
+        self._generation = meta['generation']
+        self._quantization = meta.get('quantization', 'none')
+        self._collection_metadata = meta.get('metadata', {})
+        self._log_offset = 0
+        self._rows = 0
+        self._records = {}
+        self._snapshot = _Snapshot(None, np.zeros(0, dtype=bool), [])
+        self._catch_up()
+
+    def _catch_up(self):
+        """Aplica as operações acrescentadas ao log desde a última leitura."""
+        log_path = self._log_path(self._generation)
+        log_signature = _file_signature(log_path)
+        if log_signature is None or log_signature[2] == self._log_offset:
+            return
+
+        with open(log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            data = f.read()
+
+        # Uma linha incompleta (escrita em andamento) fica para a próxima leitura
+        complete = data[: data.rfind(b'\n') + 1]
+        if not complete:
+            return
+        self._log_offset += len(complete)
+        self._apply([json.loads(line) for line in complete.splitlines()])
+
+    def _apply(self, operations: List[dict]):
+        alive = self._snapshot.alive
+        row_ids = self._snapshot.row_ids
+        new_rows = max(
+            (
+                operation['row'] + 1
+                for operation in operations
+                if operation['op'] == 'add'
+            ),
+            default=self._rows,
+        )
+        if new_rows > self._rows:
+            alive = np.concatenate([
+                alive,
+                np.zeros(new_rows - self._rows, dtype=bool),
+            ])
+            row_ids = [*row_ids, *[None] * (new_rows - self._rows)]
+        else:
+            alive = alive.copy()
+            row_ids = list(row_ids)
+
+        for operation in operations:
+            chunk_id = operation['id']
+            if operation['op'] == 'add':
+                previous = self._records.get(chunk_id)
+                if previous is not None:
+                    alive[previous[0]] = False
+                    row_ids[previous[0]] = None
+                row = operation['row']
+                self._records[chunk_id] = (
+                    row,
+                    operation['page_content'],
+                    operation['metadata'],
+                )
+                alive[row] = True
+                row_ids[row] = chunk_id
+            elif operation['op'] == 'delete':
+                previous = self._records.pop(chunk_id, None)
+                if previous is not None:
+                    alive[previous[0]] = False
+                    row_ids[previous[0]] = None
+            elif operation['op'] == 'update':
+                previous = self._records.get(chunk_id)
+                if previous is not None:
+                    self._records[chunk_id] = (
+                        previous[0],
+                        previous[1],
+                        operation['metadata'],
+                    )
+
+        self._rows = new_rows
+        self._snapshot = self._map_snapshot(alive, row_ids)
+
+    def _map_snapshot(
+        self, alive: np.ndarray, row_ids: List[Optional[str]]
+    ) -> _Snapshot:
+        if self._rows == 0 or self._dimensions is None:
+            return _Snapshot(None, alive, row_ids)
+
+        shape = (self._rows, self._dimensions)
+        matrix = np.memmap(
+            self._matrix_path(self._generation),
+            dtype=np.float32,
+            mode='r',
+            shape=shape,
+        )
+        if self._quantization == 'none':
+            return _Snapshot(matrix, alive, row_ids)
+
+        quantized = np.memmap(
+            self._quantized_path(self._generation, self._quantization),
+            dtype=np.float16 if self._quantization == 'float16' else np.int8,
+            mode='r',
+            shape=shape,
+        )
+        scales = None
+        if self._quantization == 'int8':
+            scales = np.memmap(
+                self._scales_path(self._generation),
+                dtype=np.float32,
+                mode='r',
+                shape=(self._rows,),
+            )
+        return _Snapshot(
+            matrix, alive, row_ids, quantized, scales, self._open_matrix_file()
+        )
+
+    def _open_matrix_file(self) -> BinaryIO:
+        """
+        Arquivo da matriz float32 da geração atual, aberto uma única vez e
+        compartilhado pelos snapshots dessa geração. O da geração anterior
+        continua aberto para buscas ainda em andamento sobre o snapshot
+        antigo; os mais antigos são fechados.
+        """
+        matrix_file = self._matrix_files.get(self._generation)
+        if matrix_file is None:
+            matrix_file = open(self._matrix_path(self._generation), 'rb')
+            self._matrix_files[self._generation] = matrix_file
+            for generation in sorted(self._matrix_files)[:-2]:
+                self._matrix_files.pop(generation).close()
+        return matrix_file
+
+    def close(self):
+        """Fecha os arquivos abertos para as buscas com quantização."""
+        with self._lock:
+            for matrix_file in self._matrix_files.values():
+                matrix_file.close()
+            self._matrix_files.clear()
+
+    def _refresh(self):
+        """Sincroniza com escritas feitas por outros processos."""
+        with self._lock:
+            # meta.json é trocado por rename a cada escrita: sem mudança no
+            # arquivo, apenas o log pode ter crescido
+            meta_signature = _file_signature(self._meta_path())
+            if meta_signature == self._meta_signature:
+                self._catch_up()
+                return
+
+            self._meta_signature = meta_signature
+            meta = self._read_meta()
+            if meta['generation'] != self._generation:
+                self._reload(meta)
+            else:
+                # A dimensão é definida pela primeira escrita, talvez de outro processo
+                self._dimensions = meta['dimensions']
+                self._quantization = meta.get('quantization', 'none')
+                self._collection_metadata = meta.get('metadata', {})
+                self._catch_up()
+
+    def _append_log(self, operations: List[dict]):
+        with open(
+            self._log_path(self._generation), 'a', encoding='utf-8'
+        ) as f:
+            f.write(
+                ''.join(
+                    json.dumps(operation, ensure_ascii=False) + '\n'
+                    for operation in operations
+                )
+            )
+        self._catch_up()
+
+    # Escrita
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid4()) for _ in texts]
+
+        vectors = np.asarray(
+            self.embedding_function.embed_documents(texts), dtype=np.float32
+        )
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = np.divide(vectors, np.where(norms == 0, 1, norms))
+
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self._dimensions is None:
+                self._dimensions = vectors.shape[1]
+                self._write_meta(self._dimensions, self._generation)
+            elif vectors.shape[1] != self._dimensions:
+                raise ValueError(
+                    f'Embedding dimension {vectors.shape[1]} does not match the store ({self._dimensions}).'
+                )
+
+            # Os vetores são gravados antes do log: uma linha do log sempre aponta para dados existentes
+            first_row = self._rows
+            self._write_vectors(self._generation, first_row, vectors)
+
+            self._append_log([
+                {
+                    'op': 'add',
+                    'row': first_row + i,
+                    'id': chunk_id,
+                    'page_content': text,
+                    'metadata': metadata,
+                }
+                for i, (chunk_id, text, metadata) in enumerate(
+                    zip(ids, texts, metadatas)
+                )
+            ])
+        return ids
+
+    def delete(
+        self, ids: Optional[List[str]] = None, **kwargs: Any
+    ) -> Optional[bool]:
+        if not ids:
+            return None
+
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._append_log([
+                {'op': 'delete', 'id': chunk_id} for chunk_id in ids
+            ])
+
+            dead_rows = self._rows - len(self._records)
+            if (
+                self._rows
+                and dead_rows / self._rows >= self.compaction_threshold
+            ):
+                self._compact()
+        return True
+
+    def update_metadatas(self, ids: List[str], metadatas: List[dict]):
+        """Atualiza apenas os metadados, sem regravar os vetores."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._append_log([
+                {'op': 'update', 'id': chunk_id, 'metadata': metadata}
+                for chunk_id, metadata in zip(ids, metadatas)
+            ])
+
+    def compact(self):
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._compact()
+
+    def _convert(self, quantization: str):
+        """Troca a quantização do índice, regravando-o em uma nova geração."""
+        with self._file_lock():
+            self._refresh()
+            if self._quantization == quantization:
+                return
+            self._quantization = quantization
+            if self._rows:
+                self._compact()
+            else:
+                self._write_meta(self._dimensions, self._generation)
+
+    def _compact(self):
+        """Regrava apenas as linhas vivas em uma nova geração (chamar com os locks)."""
+        old_generation = self._generation
+        new_generation = old_generation + 1
+        matrix = self._snapshot.matrix
+        live = sorted(self._records.items(), key=lambda item: item[1][0])
+
+        for path in self._generation_files(new_generation):
+            if os.path.exists(path):
+                os.remove(path)
+        if live:
+            self._write_vectors(
+                new_generation,
+                0,
+                np.asarray(matrix[[row for _, (row, _, _) in live]]),
+            )
+        with open(self._log_path(new_generation), 'w', encoding='utf-8') as f:
+            for new_row, (chunk_id, (_, page_content, metadata)) in enumerate(
+                live
+            ):
+                f.write(
+                    json.dumps(
+                        {
+                            'op': 'add',
+                            'row': new_row,
+                            'id': chunk_id,
+                            'page_content': page_content,
+                            'metadata': metadata,
+                        },
+                        ensure_ascii=False,
+                    )
+                    + '\n'
+                )
+
+        # A troca de meta.json publica a nova geração para todos os processos
+        self._write_meta(self._dimensions, new_generation)
+        self._reload()
+
+        for path in self._generation_files(old_generation):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def modify_collection_metadata(self, metadata: dict):
+        """Substitui os metadados da coleção (equivalente a `Collection.modify`)."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._collection_metadata = dict(metadata)
+            self._write_meta(self._dimensions, self._generation)
+
+    # Leitura
+    @property
+    def collection_metadata(self) -> dict:
+        self._refresh()
+        return dict(self._collection_metadata)
+
+    @property
+    def dimensions(self) -> Optional[int]:
+        """Dimensão dos vetores armazenados (None antes da primeira escrita)."""
+        self._refresh()
+        return self._dimensions
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._records)
+
+    def count(self) -> int:
+        return len(self)
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        self._refresh()
+        documents = []
+        for chunk_id in ids:
+            record = self._records.get(chunk_id)
+            if record is not None:
+                documents.append(
+                    Document(
+                        id=chunk_id, page_content=record[1], metadata=record[2]
+                    )
+                )
+        return documents
+
+    def get(
+        self,
+        include: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Dict[str, list]:
+        """Chunks na ordem de inclusão, no mesmo formato de `Chroma.get`."""
+        with self._lock:
+            self._refresh()
+            records = list(self._records.items())
+        start = offset or 0
+        records = records[start : start + limit if limit is not None else None]
+        return {
+            'ids': [chunk_id for chunk_id, _ in records],
+            'documents': [page_content for _, (_, page_content, _) in records],
+            'metadatas': [metadata for _, (_, _, metadata) in records],
+        }
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Os `k` chunks mais similares, com a similaridade de cosseno.
+
+        `filter` aceita o subconjunto do `where` do Chroma usado pela API:
+        igualdade (`{'source': 'cv.pdf'}`) e `$in` (`{'source': {'$in': [...]}}`).
+        """
+        self._refresh()
+        snapshot = self._snapshot
+        if snapshot.matrix is None or k <= 0:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        query = np.divide(query, np.linalg.norm(query) or 1)
+
+        allowed = snapshot.alive
+        if filter:
+            allowed = np.logical_and(
+                allowed, self._filter_mask(snapshot, filter)
+            )
+        alive_count = int(allowed.sum())
+        k = min(k, alive_count)
+        if k == 0:
+            return []
+
+        if snapshot.quantized is None:
+            scores = snapshot.matrix @ query
+            scores[~allowed] = -np.inf
+            top = _top_k(scores, k)
+            top_scores = scores[top]
+        else:
+            # Candidatos pela cópia comprimida, score exato só para eles
+            approximate = _approximate_scores(snapshot, query)
+            approximate[~allowed] = -np.inf
+            candidates = np.sort(
+                _top_k(approximate, min(k * self.rescore_factor, alive_count))
+            )
+            exact = snapshot.read_rows(candidates) @ query
+            order = _top_k(exact, k)
+            top, top_scores = candidates[order], exact[order]
+
+        return self._scored_documents(snapshot, top, top_scores)
+
+    def similarity_search_with_score_by_vectors(
+        self, embeddings: List[List[float]], k: int = 4
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Busca em lote: os scores de um bloco de perguntas saem de uma única
+        multiplicação de matrizes, em vez de uma varredura do índice por
+        pergunta. Com quantização, cada pergunta é buscada (e reranqueada)
+        individualmente.
+        """
+        self._refresh()
+        snapshot = self._snapshot
+        if snapshot.matrix is None or snapshot.quantized is not None or k <= 0:
+            return [
+                self.similarity_search_with_score_by_vector(embedding, k)
+                for embedding in embeddings
+            ]
+
+        queries = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = np.divide(queries, np.where(norms == 0, 1, norms))
+
+        k = min(k, int(snapshot.alive.sum()))
+        if k == 0:
+            return [[] for _ in embeddings]
+
+        results = []
+        for start in range(0, len(queries), QUERY_BLOCK_SIZE):
+            scores = (
+                queries[start : start + QUERY_BLOCK_SIZE] @ snapshot.matrix.T
+            )
+            scores[:, ~snapshot.alive] = -np.inf
+            for row_scores in scores:
+                top = _top_k(row_scores, k)
+                results.append(
+                    self._scored_documents(snapshot, top, row_scores[top])
+                )
+        return results
+
+    def _scored_documents(
+        self, snapshot: _Snapshot, rows: np.ndarray, scores: np.ndarray
+    ) -> List[Tuple[Document, float]]:
+        results = []
+        for row, score in zip(rows, scores):
+            chunk_id = snapshot.row_ids[row]
+            record = self._records.get(chunk_id)
+            if record is None:
+                continue
+            results.append((
+                Document(
+                    id=chunk_id, page_content=record[1], metadata=record[2]
+                ),
+                float(score),
+            ))
+        return results
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [
+            document
+            for document, _ in self.similarity_search_with_score_by_vector(
+                embedding, k, filter
+            )
+        ]
+
+    def _filter_mask(self, snapshot: _Snapshot, where: dict) -> np.ndarray:
+        # Percorre os metadados de todas as linhas: custo proporcional ao índice
+        records = self._records
+        return np.fromiter(
+            (
+                chunk_id is not None
+                and chunk_id in records
+                and _matches_filter(records[chunk_id][2], where)
+                for chunk_id in snapshot.row_ids
+            ),
+            dtype=bool,
+            count=len(snapshot.row_ids),
+        )
+
+    def similarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return self.similarity_search_by_vector(
+            self.embedding_function.embed_query(query), k
+        )
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        path: str = 'vector-db/numpy',
+        **kwargs: Any,
+    ) -> 'NumpyVectorStore':
+        store = cls(path=path, embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+
+def _matches_filter(metadata: dict, where: dict) -> bool:
+    for field, condition in where.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict):
+            if set(condition) != {'$in'}:
+                raise ValueError(
+                    f'Unsupported filter operator: {list(condition)}.'
+                )
+            if value not in condition['$in']:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Índices dos `k` maiores scores, em ordem decrescente."""
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _approximate_scores(snapshot: _Snapshot, query: np.ndarray) -> np.ndarray:
+    """Scores sobre a cópia comprimida, convertida para float32 em blocos."""
+    quantized = snapshot.quantized
+    scores = np.empty(len(quantized), dtype=np.float32)
+    buffer = np.empty((SCORE_BLOCK_ROWS, quantized.shape[1]), dtype=np.float32)
+    for start in range(0, len(quantized), SCORE_BLOCK_ROWS):
+        block = quantized[start : start + SCORE_BLOCK_ROWS]
+        converted = buffer[: len(block)]
+        np.copyto(converted, block, casting='unsafe')
+        scores[start : start + len(block)] = converted @ query
+    if snapshot.scales is not None:
+        scores *= snapshot.scales
+    return scores
@@ -1,33 +1,201 @@
+import asyncio
+import io
+import multiprocessing
 import os
 import tempfile
-from typing import List
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Tuple, Union
 
 from fastapi import UploadFile
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_core.documents import Document
+from pypdf import PdfReader
 
+from app.metrics import STAGE_DURATION
+from app.settings import settings
+from app.utils.uploads import SpooledUpload
 from rag.splitter import split_documents
+from rag.tokens import count_tokens
 
+# Conteúdo do PDF: buffer em memória ou caminho de um arquivo em disco
+PdfSource = Union[bytes, bytearray, str]
 
-async def process_pdf(file: UploadFile, filename: str) -> List[Document]:
-    temp_file_path = None
+_global_instance_process_pool: Optional[ProcessPoolExecutor] = None
+_global_instance_pool_slots: Optional[asyncio.Semaphore] = None
 
-    try:
-        content = await file.read()
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+def get_process_pool() -> Optional[Executor]:
+    """
+    Pool de processos usado para extrair e dividir PDFs fora do event loop.
+
+    Com `PDF_PROCESS_POOL_SIZE=0` retorna None e o trabalho roda no thread
+    pool padrão do event loop.
+    """
+    global _global_instance_process_pool
+
+    if settings.PDF_PROCESS_POOL_SIZE == 0:
+        return None
+
+    if _global_instance_process_pool is None:
+        _global_instance_process_pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_PROCESS_POOL_SIZE,
+            # 'spawn' evita herdar locks de threads do processo da API
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _global_instance_process_pool
+
+
+def shutdown_process_pool():
+    global _global_instance_process_pool
+
+    if _global_instance_process_pool is not None:
+        _global_instance_process_pool.shutdown(wait=False, cancel_futures=True)
+        _global_instance_process_pool = None
+
+
+def _get_pool_slots() -> asyncio.Semaphore:
+    """Limita quantas tarefas podem estar enfileiradas no pool ao mesmo tempo."""
+    global _global_instance_pool_slots
+
+    if _global_instance_pool_slots is None:
+        _global_instance_pool_slots = asyncio.Semaphore(
+            settings.PDF_PROCESS_QUEUE_SIZE
+        )
+    return _global_instance_pool_slots
+
+
+def _open_pdf(source: PdfSource) -> PdfReader:
+    if isinstance(source, str):
+        return PdfReader(source)
+    return PdfReader(io.BytesIO(source))
+
+
+def count_pages(source: PdfSource) -> int:
+    return len(_open_pdf(source).pages)
+
 
-        loader = PyPDFLoader(file_path=temp_file_path)
-        docs = loader.load()
+def parse_and_split_pages(
+    source: PdfSource,
+    filename: str,
+    start_page: int,
+    end_page: int,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> List[Document]:
+    """
+    Extrai o texto das páginas [start_page, end_page) e divide em chunks.
 
-        # Atualiza o campo 'source' de todos os documentos
-        for doc in docs:
-            doc.metadata["source"] = filename
+    Os metadados seguem o formato do PyPDFLoader (source, total_pages, page,
+    page_label), acrescidos da quantidade de tokens de cada chunk
+    (token_count).
+    """
+    chunks, _, _ = parse_and_split_pages_timed(
+        source, filename, start_page, end_page, chunk_size, chunk_overlap
+    )
+    return chunks
 
-        return split_documents(docs=docs)
 
+def parse_and_split_pages_timed(
+    source: PdfSource,
+    filename: str,
+    start_page: int,
+    end_page: int,
+    chunk_size: int,
+    chunk_overlap: int,
+) -> Tuple[List[Document], float, float]:
+    """
+    Como `parse_and_split_pages`, retornando também a duração da extração e
+    da divisão. Executada nos processos do pool: as durações voltam ao
+    processo da API, onde as métricas são registradas.
+    """
+    start = time.perf_counter()
+    reader = _open_pdf(source)
+    total_pages = len(reader.pages)
+
+    docs = [
+        Document(
+            page_content=reader.pages[page].extract_text().strip(),
+            metadata={
+                'source': filename,
+                'total_pages': total_pages,
+                'page': page,
+                'page_label': reader.page_labels[page],
+            },
+        )
+        for page in range(start_page, min(end_page, total_pages))
+    ]
+    parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chunks = split_documents(
+        docs=docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    for chunk in chunks:
+        chunk.metadata['token_count'] = count_tokens(chunk.page_content)
+    split_seconds = time.perf_counter() - start
+
+    return chunks, parse_seconds, split_seconds
+
+
+def _write_temp_pdf(source: Union[bytes, bytearray]) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
+        temp_file.write(source)
+    return temp_file.name
+
+
+async def _run_in_pool(func, *args):
+    loop = asyncio.get_running_loop()
+    async with _get_pool_slots():
+        return await loop.run_in_executor(get_process_pool(), func, *args)
+
+
+async def process_pdf(
+    file: Union[UploadFile, SpooledUpload], filename: str
+) -> List[Document]:
+    if isinstance(file, SpooledUpload):
+        # Buffer em memória (arquivos pequenos) ou caminho do arquivo em disco
+        source = file.source
+    else:
+        source = await file.read()
+
+    # Arquivos grandes são divididos em faixas de páginas processadas em paralelo
+    total_pages = await asyncio.to_thread(count_pages, source)
+    pages_per_task = settings.PDF_PAGES_PER_TASK
+    page_ranges = range(0, max(total_pages, 1), pages_per_task)
+
+    # Cada tarefa do pool de processos recebe os argumentos serializados: em
+    # vez de copiar o PDF inteiro para cada faixa, grava-o em disco uma vez e
+    # envia apenas o caminho
+    temp_path = None
+    if (
+        not isinstance(source, str)
+        and len(page_ranges) > 1
+        and get_process_pool() is not None
+    ):
+        temp_path = await asyncio.to_thread(_write_temp_pdf, source)
+        source = temp_path
+
+    try:
+        results = await asyncio.gather(
+            *(
+                _run_in_pool(
+                    parse_and_split_pages_timed,
+                    source,
+                    filename,
+                    start_page,
+                    start_page + pages_per_task,
+                    settings.CHUNK_SIZE,
+                    settings.CHUNK_OVERLAP,
+                )
+                for start_page in page_ranges
+            )
+        )
     finally:
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+        if temp_path is not None:
+            os.remove(temp_path)
+
+    for _, parse_seconds, split_seconds in results:
+        STAGE_DURATION.observe(parse_seconds, stage='pdf_parse')
+        STAGE_DURATION.observe(split_seconds, stage='split')
+
+    return [chunk for chunks, _, _ in results for chunk in chunks]
@@ -1,19 +1,80 @@
-from typing import List, Set
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set
+from uuid import UUID
 
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains.retrieval import create_retrieval_chain
 from langchain.prompts import ChatPromptTemplate
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
 from langchain_openai import ChatOpenAI
 
+from app.metrics import STAGE_DURATION, TOKENS_CONSUMED
 from app.settings import settings
+from rag.answer_cache import get_answer_cache
+from rag.context import assemble_context
+from rag.retrieval import (
+    ChunkScores,
+    retrieve,
+    retrieve_batch,
+    uses_embeddings,
+)
 from rag.schemas import Source
-from rag.vector_store import get_vector_store
+from rag.vector_store import embed_queries, embed_query
+
+_global_instance_batch_llm_slots: Optional[asyncio.Semaphore] = None
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Registra a duração (etapa `llm`) e os tokens de cada chamada ao LLM."""
+
+    # Executado no próprio event loop: apenas atualiza contadores
+    run_inline = True
+
+    def __init__(self):
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id: UUID, **kwargs: Any
+    ):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        self._observe(run_id)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(
+                    getattr(generation, 'message', None),
+                    'usage_metadata',
+                    None,
+                )
+                if usage:
+                    TOKENS_CONSUMED.inc(usage['input_tokens'], kind='prompt')
+                    TOKENS_CONSUMED.inc(
+                        usage['output_tokens'], kind='completion'
+                    )
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ):
+        self._observe(run_id)
+
+    def _observe(self, run_id: UUID):
+        start = self._started.pop(run_id, None)
+        if start is not None:
+            STAGE_DURATION.observe(time.perf_counter() - start, stage='llm')
+
 
 llm = ChatOpenAI(
     model=settings.LLM_MODEL,
     temperature=settings.LLM_TEMPERATURE,
     max_tokens=settings.LLM_MAX_TOKENS,
     api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    # Inclui o uso de tokens também nas respostas em streaming
+    stream_usage=True,
+    callbacks=[LLMMetricsCallback()],
 )
 
 system_prompt = """
@@ -61,30 +122,297 @@ prompt = ChatPromptTemplate.from_messages([
 combine_docs_chain = create_stuff_documents_chain(llm=llm, prompt=prompt)
 
 
-async def ask_question(question: str):
-    """Processa uma pergunta e retorna resposta com fontes."""
-    retriever = get_vector_store().as_retriever(
-        search_kwargs={
-            'k': 5  # Retorna top 5 documentos mais relevantes
-        }
+class QuestionTrace:
+    """
+    Duração de cada etapa de uma pergunta (embed, cache, retrieve, llm) e,
+    no modo debug, as pontuações dos chunks recuperados.
+
+    Medir as etapas custa apenas algumas chamadas a `perf_counter`; as
+    pontuações só são buscadas com `debug=True`.
+    """
+
+    def __init__(self, debug: bool = False):
+        self.timings: Dict[str, float] = {}
+        self.scores: Optional[ChunkScores] = {} if debug else None
+        self.chunks: List[Dict[str, Any]] = []
+        self.cached = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def record_chunks(self, documents: List):
+        if self.scores is None:
+            return
+        for document in documents:
+            self.chunks.append({
+                'id': document.id,
+                'filename': document.metadata.get('source', 'Desconhecido'),
+                'page': document.metadata.get('page'),
+                'scores': self.scores.get(
+                    document.id or document.page_content, {}
+                ),
+            })
+
+
+async def ask_question(question: str, trace: Optional[QuestionTrace] = None):
+    """
+    Processa uma pergunta e retorna resposta com fontes.
+
+    Com `trace`, registra a duração de cada etapa (e, no modo debug, os
+    chunks enviados ao LLM com suas pontuações).
+    """
+    trace = trace or QuestionTrace()
+
+    # Embedding calculado uma única vez: serve ao cache e à busca vetorial
+    with trace.stage('embed'):
+        embedding = await _embed_question(question)
+
+    answer_cache = _get_answer_cache(embedding)
+    if answer_cache:
+        with trace.stage('cache'):
+            cached_response = answer_cache.lookup(embedding)
+        if cached_response is not None:
+            trace.cached = True
+            return cached_response
+        generation = answer_cache.generation
+
+    # Retorna top 5 documentos mais relevantes
+    with trace.stage('retrieve'):
+        documents = await retrieve(
+            question, embedding, k=5, scores=trace.scores
+        )
+
+    # Chunks sobrepostos unidos e limitados a CONTEXT_TOKEN_BUDGET
+    kept_documents: List = []
+    context = assemble_context(documents, kept=kept_documents)
+    # Apenas os chunks que de fato chegam ao LLM
+    trace.record_chunks(kept_documents)
+
+    with trace.stage('llm'):
+        answer = await combine_docs_chain.ainvoke({
+            'input': question,
+            'context': context,
+        })
+
+    response = _build_response(answer, context)
+
+    if answer_cache:
+        answer_cache.store(question, embedding, response, generation)
+
+    return response
+
+
+def _get_batch_llm_slots() -> asyncio.Semaphore:
+    """Limita as chamadas ao LLM de todos os lotes em andamento no processo."""
+    global _global_instance_batch_llm_slots
+
+    if _global_instance_batch_llm_slots is None:
+        _global_instance_batch_llm_slots = asyncio.Semaphore(
+            settings.ASK_BATCH_LLM_CONCURRENCY
+        )
+    return _global_instance_batch_llm_slots
+
+
+async def ask_questions(questions: List[str]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Responde um lote de perguntas, emitindo cada resultado assim que fica
+    pronto (ordem de conclusão, identificado por `index`).
+
+    As perguntas são convertidas em embeddings em uma única chamada e a
+    recuperação é feita em lote; as chamadas ao LLM rodam em paralelo,
+    limitadas por `ASK_BATCH_LLM_CONCURRENCY` em todo o processo, para que
+    lotes offline não consumam a cota usada pelas perguntas interativas.
+    Falhas de uma pergunta viram um resultado com `error`.
+    """
+    embeddings = await embed_queries(questions) if uses_embeddings() else None
+
+    # Perguntas ainda sem resposta e a versão do corpus antes da recuperação
+    pending: Dict[int, Optional[int]] = {}
+    for index, question in enumerate(questions):
+        embedding = embeddings[index] if embeddings else None
+        answer_cache = _get_answer_cache(embedding)
+        cached_response = (
+            answer_cache.lookup(embedding) if answer_cache else None
+        )
+        if cached_response is not None:
+            yield _batch_result(index, question, cached_response, cached=True)
+        else:
+            pending[index] = answer_cache.generation if answer_cache else None
+
+    if not pending:
+        return
+
+    documents_by_question = await retrieve_batch(
+        [questions[index] for index in pending],
+        [embeddings[index] for index in pending] if embeddings else None,
+        k=5,
     )
 
-    retrieval_chain = create_retrieval_chain(
-        retriever=retriever, combine_docs_chain=combine_docs_chain
-    )
-
-    response = await retrieval_chain.ainvoke({'input': question})
-
+    async def answer(index: int, documents: List) -> Dict[str, Any]:
+        question = questions[index]
+        answer_cache = _get_answer_cache(
+            embeddings[index] if embeddings else None
+        )
+        context = assemble_context(documents)
+        try:
+            async with _get_batch_llm_slots():
+                answer = await combine_docs_chain.ainvoke({
+                    'input': question,
+                    'context': context,
+                })
+        except Exception as e:
+            return {'index': index, 'question': question, 'error': str(e)}
+
+        response = _build_response(answer, context)
+        if answer_cache:
+            answer_cache.store(
+                question, embeddings[index], response, pending[index]
+            )
+        return _batch_result(index, question, response, cached=False)
+
+    tasks = [
+        asyncio.ensure_future(answer(index, documents))
+        for index, documents in zip(pending, documents_by_question)
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # Cliente desconectado: interrompe as chamadas ainda pendentes
+        for task in tasks:
+            task.cancel()
+
+
+def _batch_result(
+    index: int, question: str, response: Dict[str, Any], cached: bool
+) -> Dict[str, Any]:
+    return {
+        'index': index,
+        'question': question,
+        'answer': response['answer'],
+        'sources': [source.model_dump() for source in response['sources']],
+        'confidence': response['confidence'],
+        'cached': cached,
+    }
+
+
+def _build_response(answer: str, documents: List) -> Dict[str, Any]:
     # Extrai fontes dos documentos utilizados
-    sources = _extract_sources(response.get('context', []))
+    sources = _extract_sources(documents)
 
     # Extrai nível de confiança da resposta (se mencionado)
-    answer = response.get('answer', '')
     confidence = _extract_confidence(answer)
 
     return {'answer': answer, 'sources': sources, 'confidence': confidence}
 
 
+async def stream_question(question: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Processa uma pergunta emitindo eventos à medida que ficam prontos.
+
+    Eventos emitidos, em ordem:
+    - **sources**: fontes recuperadas, antes da chamada ao LLM
+    - **token**: trechos da resposta conforme o LLM os gera
+    - **done**: nível de confiança e tempos de cada etapa
+    """
+    start_time = time.perf_counter()
+
+    embedding = await _embed_question(question)
+
+    answer_cache = _get_answer_cache(embedding)
+    if answer_cache:
+        cached_response = answer_cache.lookup(embedding)
+        if cached_response is not None:
+            yield _sources_event(cached_response['sources'])
+            yield {
+                'event': 'token',
+                'data': {'content': cached_response['answer']},
+            }
+            yield {
+                'event': 'done',
+                'data': {
+                    'confidence': cached_response['confidence'],
+                    'cached': True,
+                    'timings': {'total_seconds': _elapsed(start_time)},
+                },
+            }
+            return
+        generation = answer_cache.generation
+
+    documents = await retrieve(question, embedding, k=5)
+    context = assemble_context(documents)
+    retrieval_seconds = _elapsed(start_time)
+
+    sources = _extract_sources(context)
+    yield _sources_event(sources)
+
+    answer_parts: List[str] = []
+    first_token_seconds = None
+
+    async for token in combine_docs_chain.astream({
+        'input': question,
+        'context': context,
+    }):
+        if not token:
+            continue
+        if first_token_seconds is None:
+            first_token_seconds = _elapsed(start_time)
+        answer_parts.append(token)
+        yield {'event': 'token', 'data': {'content': token}}
+
+    answer = ''.join(answer_parts)
+    confidence = _extract_confidence(answer)
+
+    if answer_cache:
+        answer_cache.store(
+            question,
+            embedding,
+            {'answer': answer, 'sources': sources, 'confidence': confidence},
+            generation,
+        )
+
+    yield {
+        'event': 'done',
+        'data': {
+            'confidence': confidence,
+            'cached': False,
+            'timings': {
+                'retrieval_seconds': retrieval_seconds,
+                'time_to_first_token_seconds': first_token_seconds,
+                'total_seconds': _elapsed(start_time),
+            },
+        },
+    }
+
+
+async def _embed_question(question: str) -> Optional[List[float]]:
+    # No modo léxico a chamada de embedding é evitada por completo
+    return await embed_query(question) if uses_embeddings() else None
+
+
+def _get_answer_cache(embedding: Optional[List[float]]):
+    # O cache semântico depende do embedding da pergunta
+    if embedding is None or not settings.ANSWER_CACHE_ENABLED:
+        return None
+    return get_answer_cache()
+
+
+def _sources_event(sources: List[Source]) -> Dict[str, Any]:
+    return {
+        'event': 'sources',
+        'data': {'sources': [source.model_dump() for source in sources]},
+    }
+
+
+def _elapsed(start_time: float) -> float:
+    return round(time.perf_counter() - start_time, 3)
+
+
 def _extract_sources(documents: List) -> List[Source]:
     """Extrai informações únicas de fonte dos documentos."""
     sources_set: Set[tuple] = set()
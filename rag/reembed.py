@@ -0,0 +1,128 @@
+"""
+Regera os embeddings de todo o corpus em uma nova coleção.
+
+Usado ao trocar `EMBEDDING_MODEL` ou `EMBEDDING_DIMENSIONS`: lê os chunks
+(conteúdo e metadados) da coleção atual e os grava, em lotes, na coleção
+`--target` com o modelo e a dimensão configurados. Os ids são mantidos, então
+o banco e o índice BM25 continuam válidos.
+
+A cópia pode ser interrompida e executada de novo: chunks já presentes no
+destino não são reenviados, e os removidos da origem são removidos do destino.
+
+Uso (com as novas configurações no ambiente):
+    EMBEDDING_DIMENSIONS=512 python -m rag.reembed --target docs-512
+
+Em seguida, aponte `VECTOR_COLLECTION_NAME` (Chroma) ou `NUMPY_STORE_PATH`
+(numpy) para o destino e reinicie a API.
+"""
+
+import argparse
+import time
+from typing import Iterator, List, Tuple
+
+from langchain_core.documents import Document
+
+from app.settings import settings
+from rag.vector_store import (
+    build_embeddings,
+    embedding_metadata,
+    get_vector_store,
+    open_vector_store,
+)
+
+
+def iter_chunks(
+    vector_store, batch_size: int
+) -> Iterator[Tuple[List[str], List[Document]]]:
+    offset = 0
+    while True:
+        result = vector_store.get(
+            include=['documents', 'metadatas'], limit=batch_size, offset=offset
+        )
+        if not result['ids']:
+            return
+        yield (
+            result['ids'],
+            [
+                Document(page_content=content, metadata=metadata or {})
+                for content, metadata in zip(
+                    result['documents'], result['metadatas']
+                )
+            ],
+        )
+        offset += len(result['ids'])
+
+
+def reembed(source, target, batch_size: int) -> dict:
+    """Copia os chunks de `source` para `target`, gerando os embeddings com `target`."""
+    existing_ids = set(target.get(include=[])['ids'])
+    source_ids = set()
+    copied = 0
+    start = time.perf_counter()
+
+    for ids, chunks in iter_chunks(source, batch_size):
+        source_ids.update(ids)
+        pending = [
+            (chunk_id, chunk)
+            for chunk_id, chunk in zip(ids, chunks)
+            if chunk_id not in existing_ids
+        ]
+        if pending:
+            target.add_documents(
+                [chunk for _, chunk in pending],
+                ids=[chunk_id for chunk_id, _ in pending],
+            )
+            copied += len(pending)
+        print(
+            f'{len(source_ids)} chunks read, {copied} embedded ({time.perf_counter() - start:.1f}s)'
+        )
+
+    stale_ids = list(existing_ids - source_ids)
+    if stale_ids:
+        target.delete(ids=stale_ids)
+
+    return {
+        'chunks': len(source_ids),
+        'embedded': copied,
+        'removed': len(stale_ids),
+    }
+
+
+def main(args):
+    source_name = (
+        settings.numpy_store_path
+        if settings.VECTOR_BACKEND == 'numpy'
+        else settings.VECTOR_COLLECTION_NAME
+    )
+    if args.target == source_name:
+        raise SystemExit(
+            'The target must be a new collection, different from the configured one.'
+        )
+
+    source = get_vector_store()
+    target = open_vector_store(build_embeddings(), args.target)
+    summary = reembed(source, target, args.batch_size)
+
+    print(
+        f'Re-embedded into {args.target!r} with {embedding_metadata()}: {summary}'
+    )
+    setting = (
+        'NUMPY_STORE_PATH'
+        if settings.VECTOR_BACKEND == 'numpy'
+        else 'VECTOR_COLLECTION_NAME'
+    )
+    print(f'Set {setting}={args.target} and restart the API to use it.')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--target',
+        required=True,
+        help='Nova coleção (Chroma) ou diretório (numpy)',
+    )
+    parser.add_argument('--batch-size', type=int, default=256)
+    main(parser.parse_args())
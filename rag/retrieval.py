@@ -0,0 +1,221 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.metrics import STAGE_DURATION
+from app.settings import settings
+from rag.bm25_index import get_bm25_index
+from rag.tombstones import get_tombstones
+from rag.vector_store import (
+    embed_query,
+    search_by_vector,
+    search_by_vector_with_scores,
+    search_by_vectors,
+)
+
+# Pontuações de cada chunk recuperado, por id e origem (vector, bm25, rrf)
+ChunkScores = Dict[str, Dict[str, float]]
+
+
+def uses_embeddings() -> bool:
+    """No modo `lexical` a pergunta não precisa de embedding."""
+    return settings.RETRIEVAL_MODE != 'lexical'
+
+
+def _chunk_key(document: Document) -> str:
+    return document.id or document.page_content
+
+
+def _record_scores(
+    scores: Optional[ChunkScores],
+    origin: str,
+    results: List[Tuple[Document, float]],
+) -> List[Document]:
+    if scores is not None:
+        for document, score in results:
+            scores.setdefault(_chunk_key(document), {})[origin] = round(
+                score, 4
+            )
+    return [document for document, _ in results]
+
+
+async def search_lexical(
+    question: str, k: int, scores: Optional[ChunkScores] = None
+) -> List[Document]:
+    with STAGE_DURATION.time(stage='bm25_query'):
+        results = await asyncio.to_thread(get_bm25_index().search, question, k)
+    return _record_scores(scores, 'bm25', results)
+
+
+async def search_vector(
+    embedding: List[float], k: int, scores: Optional[ChunkScores] = None
+) -> List[Document]:
+    # As pontuações só são buscadas quando pedidas (modo debug)
+    if scores is None:
+        return await search_by_vector(embedding, k=k)
+    return _record_scores(
+        scores, 'vector', await search_by_vector_with_scores(embedding, k=k)
+    )
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Document]],
+    k: int,
+    rrf_k: int = 60,
+    scores: Optional[ChunkScores] = None,
+) -> List[Document]:
+    """
+    Combina rankings pela fórmula RRF: score(d) = Σ 1 / (rrf_k + posição).
+
+    Chunks presentes em mais de um ranking (mesmo id) somam as pontuações.
+    """
+    fused: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+
+    for ranking in rankings:
+        for position, document in enumerate(ranking, start=1):
+            key = _chunk_key(document)
+            fused[key] = fused.get(key, 0.0) + 1 / (rrf_k + position)
+            documents.setdefault(key, document)
+
+    ranked = sorted(fused, key=fused.get, reverse=True)[:k]
+    return _record_scores(
+        scores, 'rrf', [(documents[key], fused[key]) for key in ranked]
+    )
+
+
+async def retrieve(
+    question: str,
+    embedding: Optional[List[float]],
+    k: int,
+    scores: Optional[ChunkScores] = None,
+) -> List[Document]:
+    """
+    Recupera os `k` chunks mais relevantes conforme `RETRIEVAL_MODE`:
+
+    - **vector**: similaridade de embeddings no Chroma
+    - **lexical**: apenas BM25, sem embedding da pergunta
+    - **hybrid**: BM25 e Chroma em paralelo, combinados por RRF
+
+    Chunks de documentos removidos (tombstones) ainda não purgados são
+    descartados; nesse caso mais candidatos são buscados para completar `k`.
+
+    Com `scores`, a pontuação de cada candidato em cada busca é registrada
+    no dicionário (usado no modo debug de `/ask-question`).
+    """
+    tombstones = get_tombstones()
+    candidates = max(k, settings.RETRIEVAL_CANDIDATES_K)
+
+    if settings.RETRIEVAL_MODE == 'lexical':
+        documents = await search_lexical(
+            question, candidates if tombstones else k, scores
+        )
+        return tombstones.filter(documents)[:k]
+
+    if settings.RETRIEVAL_MODE == 'vector':
+        documents = await search_vector(
+            embedding, candidates if tombstones else k, scores
+        )
+        return tombstones.filter(documents)[:k]
+
+    vector_documents, lexical_documents = await asyncio.gather(
+        search_vector(embedding, candidates, scores),
+        search_lexical(question, candidates, scores),
+    )
+    return reciprocal_rank_fusion(
+        [
+            tombstones.filter(vector_documents),
+            tombstones.filter(lexical_documents),
+        ],
+        k=k,
+        rrf_k=settings.RRF_K,
+        scores=scores,
+    )
+
+
+def _search_lexical_all(questions: List[str], k: int) -> List[List[Document]]:
+    index = get_bm25_index()
+    return [
+        [document for document, _ in index.search(question, k)]
+        for question in questions
+    ]
+
+
+async def retrieve_batch(
+    questions: List[str], embeddings: Optional[List[List[float]]], k: int
+) -> List[List[Document]]:
+    """
+    Versão em lote de `retrieve`, com os mesmos modos e o mesmo descarte de
+    tombstones: a busca vetorial de todas as perguntas é uma única consulta
+    ao índice e as buscas BM25 rodam em um único thread.
+    """
+    tombstones = get_tombstones()
+    candidates = max(k, settings.RETRIEVAL_CANDIDATES_K)
+    fetch = candidates if tombstones else k
+
+    if settings.RETRIEVAL_MODE == 'lexical':
+        with STAGE_DURATION.time(stage='bm25_query'):
+            rankings = await asyncio.to_thread(
+                _search_lexical_all, questions, fetch
+            )
+        return [tombstones.filter(documents)[:k] for documents in rankings]
+
+    if settings.RETRIEVAL_MODE == 'vector':
+        rankings = await search_by_vectors(embeddings, k=fetch)
+        return [tombstones.filter(documents)[:k] for documents in rankings]
+
+    async def search_lexical_all():
+        with STAGE_DURATION.time(stage='bm25_query'):
+            return await asyncio.to_thread(
+                _search_lexical_all, questions, candidates
+            )
+
+    vector_rankings, lexical_rankings = await asyncio.gather(
+        search_by_vectors(embeddings, k=candidates), search_lexical_all()
+    )
+    return [
+        reciprocal_rank_fusion(
+            [
+                tombstones.filter(vector_documents),
+                tombstones.filter(lexical_documents),
+            ],
+            k=k,
+            rrf_k=settings.RRF_K,
+        )
+        for vector_documents, lexical_documents in zip(
+            vector_rankings, lexical_rankings
+        )
+    ]
+
+
+async def search_chunks(
+    query: str,
+    k: int,
+    score_threshold: Optional[float] = None,
+    filenames: Optional[List[str]] = None,
+) -> List[Tuple[Document, float]]:
+    """
+    Busca apenas vetorial, sem o LLM: embedding da consulta e uma consulta
+    ao índice, independente de `RETRIEVAL_MODE`.
+
+    Retorna até `k` chunks com a similaridade de cosseno, descartando os
+    abaixo de `score_threshold`; `filenames` restringe a busca aos chunks
+    desses arquivos.
+    """
+    embedding = await embed_query(query)
+
+    tombstones = get_tombstones()
+    where = {'source': {'$in': filenames}} if filenames else None
+    results = await search_by_vector_with_scores(
+        embedding,
+        max(k, settings.RETRIEVAL_CANDIDATES_K) if tombstones else k,
+        where,
+    )
+
+    return [
+        (document, score)
+        for document, score in results
+        if document.id not in tombstones
+        and (score_threshold is None or score >= score_threshold)
+    ][:k]
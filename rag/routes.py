@@ -1,32 +1,53 @@
-from fastapi import APIRouter
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Optional
 
-from rag.rag_chain import ask_question as ask_question_rag
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, status
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from .schemas import AskQuestionRequest, AskQuestionResponse
+from app.security import api_key_header, get_api_key
+from app.settings import settings
+from rag.rag_chain import QuestionTrace, ask_questions, stream_question
+from rag.rag_chain import ask_question as ask_question_rag
+from rag.retrieval import search_chunks
 
-router = APIRouter(
-    prefix='/rag',
-    tags=['RAG']
+from .schemas import (
+    AskBatchRequest,
+    AskQuestionDebug,
+    AskQuestionRequest,
+    AskQuestionResponse,
+    SearchRequest,
+    SearchResponse,
+    SearchResult,
 )
 
+router = APIRouter(prefix='/rag', tags=['RAG'])
+
 
 @router.post('/ask-question', response_model=AskQuestionResponse)
-async def ask_question(data: AskQuestionRequest):
+async def ask_question(
+    data: AskQuestionRequest,
+    debug: bool = Query(
+        False,
+        description='Inclui tempos e chunks recuperados na resposta (requer API Key)',
+    ),
+    api_key: Optional[str] = Security(api_key_header),
+):
     """
     Processa uma pergunta e retorna uma resposta gerada com base em documentos vetorizados.
-    
+
     A resposta inclui:
     - **answer**: Resposta formatada em Markdown
     - **sources**: Lista de documentos/páginas utilizados como fonte
     - **confidence**: Nível de confiança da resposta (Alta/Média/Baixa)
-    
+
     ## Exemplo de Requisição:
     ```json
     {
         "question": "Quais são as principais habilidades técnicas?"
     }
     ```
-    
+
     ## Exemplo de Resposta:
     ```json
     {
@@ -40,6 +61,190 @@ async def ask_question(data: AskQuestionRequest):
         "confidence": "Alta"
     }
     ```
+
+    O header `Server-Timing` traz a duração de cada etapa (embed, cache,
+    retrieve, llm, serialize). Com `?debug=true` e o header `X-API-Key`, o
+    campo `debug` traz os tempos, os ids dos chunks recuperados e suas
+    pontuações.
+    """
+    start_time = time.perf_counter()
+    if debug:
+        get_api_key(api_key)
+
+    trace = QuestionTrace(debug=debug)
+    result = await ask_question_rag(data.question, trace=trace)
+
+    with trace.stage('serialize'):
+        if debug:
+            result = {
+                **result,
+                'debug': AskQuestionDebug(
+                    timings_ms=_to_milliseconds(trace.timings),
+                    cached=trace.cached,
+                    chunks=trace.chunks,
+                ),
+            }
+        content = AskQuestionResponse(**result).model_dump(
+            mode='json', exclude=None if debug else {'debug'}
+        )
+        response = JSONResponse(content)
+
+    trace.timings['total'] = time.perf_counter() - start_time
+    response.headers['Server-Timing'] = _format_server_timing(trace.timings)
+    return response
+
+
+@router.post('/ask-batch', dependencies=[Depends(get_api_key)])
+async def ask_batch(data: AskBatchRequest):
     """
-    result = await ask_question_rag(data.question)
-    return result
+    Responde um lote de perguntas (ex.: avaliações offline), em NDJSON.
+
+    As perguntas são convertidas em embeddings em uma única chamada e a
+    recuperação é feita em lote. As chamadas ao LLM rodam em paralelo até
+    `ASK_BATCH_LLM_CONCURRENCY` (somando todos os lotes), e cada resultado é
+    enviado assim que fica pronto, na ordem de conclusão — use `index` para
+    associá-lo à pergunta.
+
+    ## Exemplo de Resposta (uma linha JSON por pergunta):
+    ```text
+    {"index": 1, "question": "Onde trabalhou?", "answer": "...", "sources": [{"filename": "curriculo.pdf", "page": 1}], "confidence": null, "cached": false}
+    {"index": 0, "question": "Quais linguagens?", "error": "Rate limit reached"}
+    ```
+    """
+    if len(data.questions) > settings.ASK_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f'At most {settings.ASK_BATCH_MAX_QUESTIONS} questions per batch.',
+        )
+
+    return StreamingResponse(
+        _to_ndjson(ask_questions(data.questions)),
+        media_type='application/x-ndjson',
+        headers={'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.post(
+    '/search',
+    response_model=SearchResponse,
+    dependencies=[Depends(get_api_key)],
+)
+async def search(data: SearchRequest):
+    """
+    Retorna os chunks mais similares à consulta, sem gerar resposta com o LLM.
+
+    A latência se resume ao embedding da consulta e a uma busca no índice
+    vetorial. O `score` é a similaridade de cosseno (maior é melhor).
+    Exige a API Key, pois retorna o texto dos chunks de todos os documentos.
+
+    ## Exemplo de Requisição:
+    ```json
+    {
+        "query": "experiência com FastAPI",
+        "k": 3,
+        "score_threshold": 0.3,
+        "filenames": ["curriculo.pdf"]
+    }
+    ```
+
+    ## Exemplo de Resposta:
+    ```json
+    {
+        "results": [
+            {
+                "id": "curriculo.pdf_chunk_0_0b6f...",
+                "content": "Desenvolvimento de APIs com FastAPI...",
+                "filename": "curriculo.pdf",
+                "page": 1,
+                "score": 0.62
+            }
+        ]
+    }
+    ```
+    """
+    results = await search_chunks(
+        data.query, data.k, data.score_threshold, data.filenames
+    )
+    return SearchResponse(
+        results=[
+            SearchResult(
+                id=document.id,
+                content=document.page_content,
+                filename=document.metadata.get('source', 'Desconhecido'),
+                page=document.metadata.get('page'),
+                score=round(score, 4),
+            )
+            for document, score in results
+        ]
+    )
+
+
+@router.post('/ask-question/stream')
+async def ask_question_stream(data: AskQuestionRequest):
+    """
+    Versão em streaming (Server-Sent Events) de `/ask-question`.
+
+    As fontes são enviadas antes da geração da resposta e os tokens chegam
+    conforme o LLM os produz, reduzindo o tempo até o primeiro byte.
+
+    ## Eventos:
+    ```text
+    event: sources
+    data: {"sources": [{"filename": "curriculo.pdf", "page": 1}]}
+
+    event: token
+    data: {"content": "**Principais"}
+
+    event: done
+    data: {"confidence": null, "cached": false, "timings": {"retrieval_seconds": 0.21, "time_to_first_token_seconds": 0.64, "total_seconds": 2.87}}
+    ```
+
+    Em caso de falha durante a geração, um evento `error` é enviado.
+    """
+    return StreamingResponse(
+        _to_server_sent_events(stream_question(data.question)),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Desativa o buffering de proxies (ex.: nginx) para o streaming
+            'X-Accel-Buffering': 'no',
+        },
+    )
+
+
+async def _to_server_sent_events(
+    events: AsyncIterator[Dict[str, Any]],
+) -> AsyncIterator[str]:
+    try:
+        async for event in events:
+            yield _format_sse(event['event'], event['data'])
+    except Exception as e:
+        yield _format_sse('error', {'detail': str(e)})
+
+
+async def _to_ndjson(
+    results: AsyncIterator[Dict[str, Any]],
+) -> AsyncIterator[str]:
+    try:
+        async for result in results:
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+    except Exception as e:
+        # Falha do lote inteiro (ex.: embeddings), depois do início da resposta
+        yield json.dumps({'error': str(e)}, ensure_ascii=False) + '\n'
+
+
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+def _to_milliseconds(timings: Dict[str, float]) -> Dict[str, float]:
+    return {
+        name: round(seconds * 1000, 2) for name, seconds in timings.items()
+    }
+
+
+def _format_server_timing(timings: Dict[str, float]) -> str:
+    return ', '.join(
+        f'{name};dur={milliseconds}'
+        for name, milliseconds in _to_milliseconds(timings).items()
+    )
@@ -1,18 +1,103 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
+
 from pydantic import BaseModel, Field
 
 
 class AskQuestionRequest(BaseModel):
-    question: str = Field(..., description="Pergunta a ser respondida com base nos documentos")
+    question: str = Field(
+        ..., description='Pergunta a ser respondida com base nos documentos'
+    )
 
 
 class Source(BaseModel):
     """Informação sobre a fonte de um trecho da resposta."""
-    filename: str = Field(..., description="Nome do arquivo fonte")
-    page: Optional[int] = Field(None, description="Número da página (se disponível)")
+
+    filename: str = Field(..., description='Nome do arquivo fonte')
+    page: Optional[int] = Field(
+        None, description='Número da página (se disponível)'
+    )
+
+
+class RetrievedChunk(BaseModel):
+    """Chunk recuperado para a pergunta, com suas pontuações (modo debug)."""
+
+    id: Optional[str] = Field(None, description='Id do chunk')
+    filename: str = Field(..., description='Nome do arquivo fonte')
+    page: Optional[int] = Field(
+        None, description='Número da página (se disponível)'
+    )
+    scores: Dict[str, float] = Field(
+        default_factory=dict,
+        description='Pontuação por busca: vector (similaridade de cosseno), bm25 e rrf (modo híbrido)',
+    )
+
+
+class AskQuestionDebug(BaseModel):
+    timings_ms: Dict[str, float] = Field(
+        ..., description='Duração de cada etapa, em milissegundos'
+    )
+    cached: bool = Field(
+        ..., description='Se a resposta veio do cache semântico'
+    )
+    chunks: List[RetrievedChunk] = Field(
+        default_factory=list, description='Chunks enviados ao LLM, em ordem'
+    )
 
 
 class AskQuestionResponse(BaseModel):
-    answer: str = Field(..., description="Resposta gerada pelo LLM")
-    sources: List[Source] = Field(default_factory=list, description="Fontes utilizadas na resposta")
-    confidence: Optional[str] = Field(None, description="Nível de confiança da resposta")
+    answer: str = Field(..., description='Resposta gerada pelo LLM')
+    sources: List[Source] = Field(
+        default_factory=list, description='Fontes utilizadas na resposta'
+    )
+    confidence: Optional[str] = Field(
+        None, description='Nível de confiança da resposta'
+    )
+    debug: Optional[AskQuestionDebug] = Field(
+        None,
+        description='Tempos e chunks recuperados (apenas com `debug=true`)',
+    )
+
+
+class SearchRequest(BaseModel):
+    query: str = Field(
+        ..., min_length=1, description='Texto a ser buscado nos documentos'
+    )
+    k: int = Field(
+        5, ge=1, le=50, description='Quantidade máxima de chunks retornados'
+    )
+    score_threshold: Optional[float] = Field(
+        None,
+        ge=-1,
+        le=1,
+        description='Similaridade de cosseno mínima dos chunks retornados',
+    )
+    filenames: Optional[List[str]] = Field(
+        None,
+        min_length=1,
+        description='Restringe a busca aos chunks destes arquivos',
+    )
+
+
+class SearchResult(BaseModel):
+    id: Optional[str] = Field(None, description='Id do chunk')
+    content: str = Field(..., description='Texto do chunk')
+    filename: str = Field(..., description='Nome do arquivo fonte')
+    page: Optional[int] = Field(
+        None, description='Número da página (se disponível)'
+    )
+    score: float = Field(
+        ..., description='Similaridade de cosseno com a consulta'
+    )
+
+
+class SearchResponse(BaseModel):
+    results: List[SearchResult] = Field(
+        default_factory=list,
+        description='Chunks em ordem decrescente de similaridade',
+    )
+
+
+class AskBatchRequest(BaseModel):
+    questions: List[str] = Field(
+        ..., min_length=1, description='Perguntas a serem respondidas'
+    )
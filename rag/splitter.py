@@ -7,21 +7,25 @@ from app.settings import settings
 
 
 def split_documents(
-    docs: List[Document], 
-    chunk_size: Optional[int] = None, 
-    chunk_overlap: Optional[int] = None
+    docs: List[Document],
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
 ):
     """
     Divide documentos em chunks usando configurações do settings ou parâmetros customizados.
-    
+
     Args:
         docs: Lista de documentos para dividir
         chunk_size: Tamanho do chunk (usa settings.CHUNK_SIZE se None)
         chunk_overlap: Overlap entre chunks (usa settings.CHUNK_OVERLAP se None)
+
+    Cada chunk recebe em `start_index` a posição em que começa no texto do
+    documento (página), usada para unir chunks sobrepostos no contexto.
     """
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size or settings.CHUNK_SIZE,
-        chunk_overlap=chunk_overlap or settings.CHUNK_OVERLAP
+        chunk_overlap=chunk_overlap or settings.CHUNK_OVERLAP,
+        add_start_index=True,
     )
     chunks = text_splitter.split_documents(documents=docs)
     return chunks
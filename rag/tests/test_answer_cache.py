@@ -0,0 +1,142 @@
+import pytest
+
+from rag.answer_cache import (
+    SemanticAnswerCache,
+    get_answer_cache,
+    invalidate_answer_cache,
+)
+from rag.vector_store import add_chunks_to_vector_store, delete_chunks_by_ids
+
+
+def make_cache(**kwargs):
+    params = {
+        'similarity_threshold': 0.9,
+        'max_entries': 10,
+        'ttl_seconds': 3600,
+        'max_memory_mb': 1,
+    }
+    params.update(kwargs)
+    return SemanticAnswerCache(**params)
+
+
+def test_lookup_hit_above_threshold():
+    """
+    Tests whether a question similar enough to a cached one returns the cached response.
+    """
+    cache = make_cache()
+    cache.store(
+        'Quais são suas habilidades?', [1.0, 0.0, 0.0], {'answer': 'Python'}
+    )
+
+    response = cache.lookup([0.99, 0.05, 0.0])
+
+    assert response == {'answer': 'Python'}
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 0
+
+
+def test_lookup_miss_below_threshold():
+    """
+    Tests whether a dissimilar question is counted as a miss.
+    """
+    cache = make_cache()
+    cache.store(
+        'Quais são suas habilidades?', [1.0, 0.0, 0.0], {'answer': 'Python'}
+    )
+
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['hit_rate'] == 0.0
+
+
+def test_lru_eviction_by_max_entries():
+    """
+    Tests whether the least recently used entry is evicted when max_entries is exceeded.
+    """
+    cache = make_cache(max_entries=2)
+    cache.store('a', [1.0, 0.0, 0.0], {'answer': 'a'})
+    cache.store('b', [0.0, 1.0, 0.0], {'answer': 'b'})
+
+    # Usa 'a' para que 'b' passe a ser a entrada menos recente
+    assert cache.lookup([1.0, 0.0, 0.0]) is not None
+    cache.store('c', [0.0, 0.0, 1.0], {'answer': 'c'})
+
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0, 0.0]) == {'answer': 'a'}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_eviction_by_memory_cap():
+    """
+    Tests whether entries are evicted to keep the cache under its memory cap.
+    """
+    cache = make_cache(max_memory_mb=0.001)  # ~1 KB
+    cache.store('a', [1.0, 0.0, 0.0], {'answer': 'x' * 400})
+    cache.store('b', [0.0, 1.0, 0.0], {'answer': 'y' * 400})
+
+    stats = cache.stats()
+    assert stats['entries'] == 1
+    assert stats['memory_bytes'] <= 1024 * 1024 * 0.001
+
+
+def test_ttl_expiration(mocker):
+    """
+    Tests whether entries older than the TTL are no longer returned.
+    """
+    mock_time = mocker.patch(
+        'rag.answer_cache.time.monotonic', return_value=100.0
+    )
+    cache = make_cache(ttl_seconds=10)
+    cache.store('a', [1.0, 0.0, 0.0], {'answer': 'a'})
+
+    mock_time.return_value = 111.0
+
+    assert cache.lookup([1.0, 0.0, 0.0]) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_invalidate_discards_in_flight_store():
+    """
+    Tests whether invalidation clears the cache and rejects responses computed before it.
+    """
+    cache = make_cache()
+    cache.store('a', [1.0, 0.0, 0.0], {'answer': 'a'})
+    generation = cache.generation
+
+    cache.invalidate()
+    cache.store('b', [0.0, 1.0, 0.0], {'answer': 'b'}, generation)
+
+    assert cache.stats()['entries'] == 0
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_invalidate_answer_cache_singleton():
+    """
+    Tests whether `invalidate_answer_cache` clears the global cache instance.
+    """
+    cache = get_answer_cache()
+    cache.store('a', [1.0, 0.0, 0.0], {'answer': 'a'})
+
+    invalidate_answer_cache()
+
+    assert get_answer_cache() is cache
+    assert cache.stats()['entries'] == 0
+
+
+@pytest.mark.asyncio
+async def test_vector_store_changes_invalidate_cache(
+    mocker, mock_vector_store, dummy_documents
+):
+    """
+    Tests whether adding or deleting chunks invalidates the answer cache.
+    """
+    mock_vector_store.adelete = mocker.AsyncMock(return_value=None)
+    mocker.patch(
+        'rag.vector_store.get_vector_store', return_value=mock_vector_store
+    )
+    cache = get_answer_cache()
+
+    await add_chunks_to_vector_store(dummy_documents, ['1', '2'])
+    await delete_chunks_by_ids(['1'])
+
+    assert cache.stats()['invalidations'] == 2
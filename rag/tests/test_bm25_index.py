@@ -0,0 +1,228 @@
+from langchain_core.documents import Document
+
+from rag.bm25_index import BM25Index, get_bm25_index, tokenize
+
+
+def make_index(path=None):
+    index = BM25Index(path=path)
+    index.add(
+        [
+            Document(
+                page_content='Experiência com FastAPI e PostgreSQL.',
+                metadata={'source': 'cv.pdf', 'page': 0},
+            ),
+            Document(
+                page_content='Projetos com LangChain, Chroma e OpenAI.',
+                metadata={'source': 'cv.pdf', 'page': 1},
+            ),
+            Document(
+                page_content='Formação em Ciência da Computação.',
+                metadata={'source': 'cv.pdf', 'page': 2},
+            ),
+        ],
+        ['chunk-0', 'chunk-1', 'chunk-2'],
+    )
+    return index
+
+
+def test_tokenize_normalizes_case_and_accents():
+    """
+    Tests whether tokens are lowercased, stripped of accents and split on punctuation.
+    """
+    assert tokenize('Ciência: langchain-chroma e FastAPI') == [
+        'ciencia',
+        'langchain',
+        'chroma',
+        'e',
+        'fastapi',
+    ]
+
+
+def test_search_ranks_exact_term_match_first():
+    """
+    Tests whether a chunk containing an exact rare term (library name) is ranked first.
+    """
+    index = make_index()
+
+    results = index.search('Quais projetos usam LangChain?', k=2)
+
+    assert results[0][0].id == 'chunk-1'
+    assert results[0][0].metadata == {'source': 'cv.pdf', 'page': 1}
+    assert results[0][1] > 0
+
+
+def test_search_without_matches_returns_empty():
+    """
+    Tests whether a query without indexed terms returns no results.
+    """
+    assert make_index().search('kubernetes', k=5) == []
+
+
+def test_add_replaces_existing_id_and_remove_deletes():
+    """
+    Tests whether re-adding an id replaces its content and removing it drops it from the index.
+    """
+    index = make_index()
+    index.add(
+        [Document(page_content='Kubernetes e Docker.', metadata={})],
+        ['chunk-0'],
+    )
+
+    assert index.search('postgresql', k=5) == []
+    assert index.search('docker', k=5)[0][0].id == 'chunk-0'
+
+    index.remove(['chunk-0', 'missing'])
+
+    assert len(index) == 2
+    assert index.search('docker', k=5) == []
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    """
+    Tests whether a saved index is loaded back with the same search results.
+    """
+    path = str(tmp_path / 'bm25' / 'index.json')
+    index = make_index(path)
+    index.save()
+
+    loaded = BM25Index.load(path)
+
+    assert len(loaded) == 3
+    assert loaded.search('fastapi', k=1) == index.search('fastapi', k=1)
+
+
+def test_get_bm25_index_without_file_is_empty():
+    """
+    Tests whether the singleton starts empty when no index file exists yet.
+    """
+    index = get_bm25_index()
+
+    assert len(index) == 0
+    assert index is get_bm25_index()
+
+
+def test_save_appends_changes_to_the_log_without_rewriting_the_snapshot(
+    tmp_path,
+):
+    """
+    Tests whether saves after the first one only append the pending changes, which are replayed on load.
+    """
+    path = str(tmp_path / 'index.json')
+    index = make_index(path)
+    index.save()
+    snapshot = (tmp_path / 'index.json').read_bytes()
+
+    index.add(
+        [Document(page_content='Kubernetes e Docker.', metadata={'page': 3})],
+        ['chunk-3'],
+    )
+    index.remove(['chunk-0'])
+    index.save()
+
+    assert (tmp_path / 'index.json').read_bytes() == snapshot
+    assert len((tmp_path / 'index.json.1.log').read_text().splitlines()) == 2
+
+    loaded = BM25Index.load(path)
+    assert len(loaded) == 3
+    assert loaded.search('docker', k=1)[0][0].id == 'chunk-3'
+    assert loaded.search('postgresql', k=1) == []
+
+
+def test_compaction_writes_a_new_snapshot_and_drops_the_old_log(
+    tmp_path, monkeypatch
+):
+    """
+    Tests whether a log larger than the index is compacted into a new snapshot generation.
+    """
+    monkeypatch.setattr('rag.bm25_index._COMPACTION_MIN_ENTRIES', 2)
+    path = str(tmp_path / 'index.json')
+    index = make_index(path)
+    index.save()
+
+    for i in range(6):
+        index.add(
+            [Document(page_content=f'Docker versão {i}.', metadata={})],
+            ['chunk-docker'],
+        )
+        index.save()
+
+    assert not (tmp_path / 'index.json.1.log').exists()
+    loaded = BM25Index.load(path)
+    assert len(loaded) == 4
+    assert (
+        loaded.search('docker', k=1)[0][0].page_content == 'Docker versão 5.'
+    )
+
+
+def test_load_ignores_an_incomplete_log_line(tmp_path):
+    """
+    Tests whether a truncated last log line (interrupted write) is discarded and later appends still load.
+    """
+    path = str(tmp_path / 'index.json')
+    index = make_index(path)
+    index.save()
+    with open(tmp_path / 'index.json.1.log', 'a', encoding='utf-8') as f:
+        f.write('{"op": "remove", "id": "chu')
+
+    loaded = BM25Index.load(path)
+    loaded.remove(['chunk-1'])
+    loaded.save()
+
+    assert len(loaded) == 2
+    assert len(BM25Index.load(path)) == 2
+
+
+def test_search_sees_changes_saved_by_another_process(tmp_path, monkeypatch):
+    """
+    Tests whether an index picks up log appends and compactions written by another instance on the same files.
+    """
+    monkeypatch.setattr('rag.bm25_index._COMPACTION_MIN_ENTRIES', 2)
+    path = str(tmp_path / 'index.json')
+    writer = make_index(path)
+    writer.save()
+    reader = BM25Index.load(path)
+
+    writer.add(
+        [Document(page_content='Kubernetes e Docker.', metadata={})],
+        ['chunk-3'],
+    )
+    writer.save()
+
+    assert reader.search('docker', k=1)[0][0].id == 'chunk-3'
+
+    for i in range(6):
+        writer.add(
+            [Document(page_content=f'Terraform versão {i}.', metadata={})],
+            ['chunk-terraform'],
+        )
+        writer.save()
+
+    assert not (tmp_path / 'index.json.1.log').exists()
+    assert (
+        reader.search('terraform', k=1)[0][0].page_content
+        == 'Terraform versão 5.'
+    )
+    assert len(reader) == 5
+
+
+def test_save_keeps_changes_of_both_processes(tmp_path):
+    """
+    Tests whether saving from two instances appends both sets of changes instead of overwriting each other.
+    """
+    path = str(tmp_path / 'index.json')
+    first = make_index(path)
+    first.save()
+    second = BM25Index.load(path)
+
+    first.add(
+        [Document(page_content='Kubernetes e Docker.', metadata={})],
+        ['chunk-3'],
+    )
+    second.remove(['chunk-0'])
+    first.save()
+    second.save()
+
+    loaded = BM25Index.load(path)
+    assert len(second) == len(loaded) == 3
+    assert loaded.search('docker', k=1)[0][0].id == 'chunk-3'
+    assert loaded.search('postgresql', k=1) == []
@@ -0,0 +1,136 @@
+from langchain_core.documents import Document
+
+from rag.context import assemble_context
+
+PAGE = 'O projeto usa FastAPI. A equipe mantém testes automatizados. O deploy roda em containers.'
+
+
+def chunk(chunk_id, start, end, page=0, source='cv.pdf', token_count=None):
+    text = PAGE[start:end]
+    return Document(
+        id=chunk_id,
+        page_content=text,
+        metadata={
+            'source': source,
+            'page': page,
+            'start_index': start,
+            'token_count': token_count
+            if token_count is not None
+            else len(text) // 4,
+        },
+    )
+
+
+def test_merges_overlapping_chunks_of_the_same_page():
+    """
+    Tests whether overlapping chunks of a page become one block without the repeated text.
+    """
+    second = chunk('b', 23, 70, token_count=12)
+    first = chunk('a', 0, 40, token_count=10)
+
+    [merged] = assemble_context([second, first], token_budget=0)
+
+    assert merged.page_content == PAGE[0:70]
+    assert merged.metadata['start_index'] == 0
+    assert merged.metadata['source'] == 'cv.pdf'
+    # 10 do primeiro + a parte nova (30 de 47 caracteres) dos 12 do segundo
+    assert merged.metadata['token_count'] == 10 + 8
+
+
+def test_merges_adjacent_chunks_and_drops_contained_ones():
+    """
+    Tests whether chunks separated only by the stripped separator are joined and contained chunks add nothing.
+    """
+    context = assemble_context(
+        [chunk('a', 0, 22), chunk('b', 23, 60), chunk('inside', 30, 50)],
+        token_budget=0,
+    )
+
+    assert [document.page_content for document in context] == [
+        PAGE[0:22] + '\n' + PAGE[23:60]
+    ]
+
+
+def test_keeps_chunks_of_other_pages_and_without_position_separate():
+    """
+    Tests whether only chunks of the same source and page with a known position are merged.
+    """
+    legacy = Document(
+        id='legacy',
+        page_content=PAGE[10:40],
+        metadata={'source': 'cv.pdf', 'page': 0},
+    )
+    documents = [
+        chunk('a', 0, 40),
+        chunk('b', 20, 60, page=1),
+        chunk('c', 20, 60, source='outro.pdf'),
+        legacy,
+    ]
+
+    context = assemble_context(documents, token_budget=0)
+
+    assert [document.id for document in context] == ['a', 'b', 'c', 'legacy']
+    assert context == documents
+
+
+def test_packs_blocks_in_relevance_order_within_the_budget():
+    """
+    Tests whether blocks that do not fit the budget are skipped while smaller, less relevant ones still fit.
+    """
+    documents = [
+        chunk('top', 0, 20, page=0, token_count=50),
+        chunk('large', 0, 20, page=1, token_count=80),
+        chunk('small', 0, 20, page=2, token_count=30),
+    ]
+
+    context = assemble_context(documents, token_budget=100)
+
+    assert [document.id for document in context] == ['top', 'small']
+
+
+def test_always_keeps_the_most_relevant_block():
+    """
+    Tests whether the most relevant block is sent even when it exceeds the budget alone.
+    """
+    documents = [
+        chunk('top', 0, 40, token_count=500),
+        chunk('next', 0, 40, page=1, token_count=10),
+    ]
+
+    context = assemble_context(documents, token_budget=100)
+
+    assert [document.id for document in context] == ['top']
+
+
+def test_merge_disabled_only_applies_the_budget():
+    """
+    Tests whether disabling merging keeps every chunk as retrieved and still enforces the budget.
+    """
+    documents = [
+        chunk('a', 0, 40, token_count=10),
+        chunk('b', 23, 70, token_count=12),
+    ]
+
+    assert (
+        assemble_context(documents, token_budget=0, merge=False) == documents
+    )
+    assert [
+        d.id for d in assemble_context(documents, token_budget=15, merge=False)
+    ] == ['a']
+
+
+def test_reports_the_retrieved_chunks_kept_in_the_context():
+    """
+    Tests whether `kept` lists, in relevance order, the retrieved chunks that reached the context.
+    """
+    documents = [
+        chunk('b', 23, 70, token_count=12),
+        chunk('dropped', 0, 20, page=1, token_count=80),
+        chunk('a', 0, 40, token_count=10),
+    ]
+    kept = []
+
+    context = assemble_context(documents, token_budget=50, kept=kept)
+
+    assert [document.page_content for document in context] == [PAGE[0:70]]
+    assert [document.id for document in kept] == ['b', 'a']
@@ -0,0 +1,136 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from rag.embedding_cache import CachedEmbeddings, EmbeddingCache, content_hash
+from rag.vector_store import get_vector_store
+
+
+@pytest.fixture
+def embedding_cache(tmp_path):
+    cache = EmbeddingCache(
+        path=str(tmp_path / 'cache' / 'embeddings.sqlite3'), max_size_mb=1
+    )
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def fake_embeddings():
+    """Fake embedding provider returning a vector derived from the text length."""
+    embeddings = MagicMock()
+    embeddings.embed_documents.side_effect = lambda texts: [
+        [float(len(t)), 1.0] for t in texts
+    ]
+    embeddings.aembed_documents = AsyncMock(
+        side_effect=lambda texts: [[float(len(t)), 1.0] for t in texts]
+    )
+    return embeddings
+
+
+def test_embed_documents_only_sends_misses(embedding_cache, fake_embeddings):
+    """
+    Tests whether only texts missing from the cache are sent to the embedding provider.
+    """
+    cached_embeddings = CachedEmbeddings(
+        fake_embeddings, embedding_cache, namespace='model'
+    )
+
+    first = cached_embeddings.embed_documents(['abc', 'de'])
+    second = cached_embeddings.embed_documents(['abc', 'de', 'fghi'])
+
+    assert first == [[3.0, 1.0], [2.0, 1.0]]
+    assert second == [[3.0, 1.0], [2.0, 1.0], [4.0, 1.0]]
+    assert fake_embeddings.embed_documents.call_args_list[1][0][0] == ['fghi']
+
+    stats = embedding_cache.stats()
+    assert stats['entries'] == 3
+    assert stats['hits'] == 2
+    assert stats['misses'] == 3
+    assert stats['hit_rate'] == 0.4
+
+
+@pytest.mark.asyncio
+async def test_aembed_documents_deduplicates_batch(
+    embedding_cache, fake_embeddings
+):
+    """
+    Tests whether repeated texts in one batch are embedded once.
+    """
+    cached_embeddings = CachedEmbeddings(
+        fake_embeddings, embedding_cache, namespace='model'
+    )
+
+    vectors = await cached_embeddings.aembed_documents(['abc', 'abc'])
+
+    assert vectors == [[3.0, 1.0], [3.0, 1.0]]
+    fake_embeddings.aembed_documents.assert_awaited_once_with(['abc'])
+
+
+def test_cache_is_keyed_by_model(embedding_cache):
+    """
+    Tests whether the same text embedded by different models is stored separately.
+    """
+    key = content_hash('texto')
+    embedding_cache.put_many('model-a', {key: [1.0, 0.0]})
+
+    assert embedding_cache.get_many('model-a', [key]) == {key: [1.0, 0.0]}
+    assert embedding_cache.get_many('model-b', [key]) == {}
+
+
+def test_cache_persists_between_instances(tmp_path):
+    """
+    Tests whether cached embeddings survive reopening the SQLite file.
+    """
+    path = str(tmp_path / 'embeddings.sqlite3')
+    key = content_hash('texto')
+
+    cache = EmbeddingCache(path=path, max_size_mb=1)
+    cache.put_many('model', {key: [0.5, 0.25]})
+    cache.close()
+
+    reopened = EmbeddingCache(path=path, max_size_mb=1)
+    assert reopened.get_many('model', [key]) == {key: [0.5, 0.25]}
+    assert reopened.stats()['entries'] == 1
+    reopened.close()
+
+
+def test_size_based_eviction(tmp_path, mocker):
+    """
+    Tests whether the least recently used entries are evicted when the cache exceeds its size.
+    """
+    mock_time = mocker.patch('rag.embedding_cache.time.time', return_value=1.0)
+    # Cada vetor de 64 floats ocupa 256 bytes; o limite comporta 2 vetores
+    cache = EmbeddingCache(
+        path=str(tmp_path / 'embeddings.sqlite3'),
+        max_size_mb=512 / (1024 * 1024),
+    )
+
+    cache.put_many('model', {'a': [0.0] * 64})
+    mock_time.return_value = 2.0
+    cache.put_many('model', {'b': [0.0] * 64})
+    mock_time.return_value = 3.0
+    cache.get_many('model', ['a'])  # 'a' passa a ser a entrada mais recente
+    mock_time.return_value = 4.0
+    cache.put_many('model', {'c': [0.0] * 64})
+
+    assert set(cache.get_many('model', ['a', 'b', 'c'])) == {'a', 'c'}
+    stats = cache.stats()
+    assert stats['entries'] == 2
+    assert stats['size_bytes'] <= stats['max_size_bytes']
+    assert stats['evictions'] == 1
+    cache.close()
+
+
+def test_get_vector_store_wraps_embeddings_with_cache(mocker):
+    """
+    Tests whether get_vector_store uses CachedEmbeddings when the embedding cache is enabled.
+    """
+    mocker.patch('rag.vector_store.OpenAIEmbeddings')
+    mocker.patch('rag.vector_store.get_embedding_cache')
+    mock_chroma = mocker.patch('rag.vector_store.Chroma')
+
+    get_vector_store()
+
+    embedding_function = mock_chroma.call_args.kwargs['embedding_function']
+    assert isinstance(embedding_function, CachedEmbeddings)
@@ -0,0 +1,320 @@
+import os
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.settings import settings
+from rag import vector_store
+from rag.numpy_store import NumpyVectorStore
+
+
+class OneHotEmbeddings(Embeddings):
+    """Textos 'tN' viram o vetor unitário do eixo N."""
+
+    def __init__(self, dimensions=8):
+        self.dimensions = dimensions
+
+    def _embed(self, text):
+        vector = [0.0] * self.dimensions
+        vector[int(text[1:]) % self.dimensions] = 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def make_store(path, **kwargs):
+    return NumpyVectorStore(
+        path=str(path), embedding_function=OneHotEmbeddings(), **kwargs
+    )
+
+
+def add(store, numbers):
+    store.add_documents(
+        [
+            Document(page_content=f't{n}', metadata={'page': n})
+            for n in numbers
+        ],
+        ids=[f'c{n}' for n in numbers],
+    )
+
+
+def test_search_returns_exact_top_k(tmp_path):
+    """
+    Tests whether search ranks chunks by cosine similarity and returns their content and metadata.
+    """
+    store = make_store(tmp_path)
+    add(store, range(5))
+
+    [(document, score)] = store.similarity_search_with_score_by_vector(
+        [0, 0, 1, 0.1, 0, 0, 0, 0], k=1
+    )
+    assert (document.id, document.page_content, document.metadata) == (
+        'c2',
+        't2',
+        {'page': 2},
+    )
+    assert score == pytest.approx(1 / np.sqrt(1.01))
+
+    assert [d.id for d in store.similarity_search('t3', k=2)][0] == 'c3'
+    assert len(store.similarity_search('t3', k=50)) == 5
+
+
+def test_search_filters_by_metadata(tmp_path):
+    """
+    Tests whether a metadata filter (equality or $in) restricts the candidates before ranking.
+    """
+    store = make_store(tmp_path)
+    add(store, range(5))
+
+    results = store.similarity_search_with_score_by_vector(
+        [0, 0, 1, 0, 0, 0, 0, 0], k=5, filter={'page': {'$in': [1, 3]}}
+    )
+    assert sorted(document.id for document, _ in results) == ['c1', 'c3']
+    assert [
+        d.id
+        for d in store.similarity_search_by_vector(
+            [0, 0, 1, 0, 0, 0, 0, 0], k=5, filter={'page': 4}
+        )
+    ] == ['c4']
+    with pytest.raises(ValueError, match='Unsupported filter operator'):
+        store.similarity_search_by_vector(
+            [0] * 8, k=1, filter={'page': {'$gt': 1}}
+        )
+
+
+def test_batch_search_matches_single_query_search(tmp_path):
+    """
+    Tests whether the batched search returns, for each query, the same ranking as the single-query search.
+    """
+    store = make_store(tmp_path)
+    add(store, range(6))
+    queries = [
+        [0, 0, 1, 0.1, 0, 0, 0, 0],
+        [0.5, 0, 0, 0, 0, 1, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+    ]
+
+    batched = store.similarity_search_with_score_by_vectors(queries, k=2)
+
+    assert len(batched) == 3
+    for query, results in zip(queries, batched):
+        expected = store.similarity_search_with_score_by_vector(query, k=2)
+        assert [d.id for d, _ in results] == [d.id for d, _ in expected]
+        assert [score for _, score in results] == pytest.approx([
+            score for _, score in expected
+        ])
+
+
+def test_delete_and_replace_hide_old_rows(tmp_path):
+    """
+    Tests whether deleted chunks disappear from search and re-adding an id replaces it.
+    """
+    store = make_store(tmp_path, compaction_threshold=1.0)
+    add(store, range(4))
+
+    store.delete(['c1'])
+    store.add_documents([Document(page_content='t5', metadata={})], ids=['c2'])
+
+    ids = [d.id for d in store.similarity_search('t1', k=10)]
+    assert 'c1' not in ids
+    assert ids.count('c2') == 1
+    assert store.get_by_ids(['c1', 'c2'])[0].page_content == 't5'
+    assert len(store) == 3
+
+
+def test_compaction_rewrites_only_live_rows(tmp_path):
+    """
+    Tests whether deleting past the threshold compacts the files into a new generation.
+    """
+    store = make_store(tmp_path, compaction_threshold=0.5)
+    add(store, range(4))
+
+    store.delete(['c0', 'c1'])
+
+    assert sorted(os.listdir(tmp_path)) == [
+        '.lock',
+        'embeddings-1.f32',
+        'log-1.jsonl',
+        'meta.json',
+    ]
+    assert os.path.getsize(tmp_path / 'embeddings-1.f32') == 2 * 8 * 4
+    assert [d.id for d in store.similarity_search('t3', k=1)] == ['c3']
+
+
+def test_other_instance_sees_appends_updates_and_compaction(tmp_path):
+    """
+    Tests whether a second store over the same directory (e.g. another process) follows every write.
+    """
+    writer, reader = (
+        make_store(tmp_path, compaction_threshold=0.5),
+        make_store(tmp_path),
+    )
+
+    add(writer, range(4))
+    assert [d.id for d in reader.similarity_search('t2', k=1)] == ['c2']
+
+    writer.update_metadatas(['c2'], [{'page': 99}])
+    assert reader.get_by_ids(['c2'])[0].metadata == {'page': 99}
+
+    writer.delete(['c0', 'c1'])
+    assert sorted(reader.get()['ids']) == ['c2', 'c3']
+
+
+def test_search_reads_meta_only_after_it_changes(mocker, tmp_path):
+    """
+    Tests whether searches skip re-reading meta.json until another instance rewrites it.
+    """
+    writer = make_store(tmp_path, compaction_threshold=0.5)
+    add(writer, range(4))
+    reader = make_store(tmp_path)
+    read_meta = mocker.spy(reader, '_read_meta')
+
+    reader.similarity_search('t1', k=1)
+    add(writer, [5])
+    assert [d.id for d in reader.similarity_search('t5', k=1)] == ['c5']
+    assert read_meta.call_count == 0
+
+    writer.delete(['c0', 'c1', 'c2'])
+    assert [d.id for d in reader.similarity_search('t3', k=1)] == ['c3']
+    assert read_meta.call_count == 1
+
+
+def test_rejects_vectors_with_different_dimension(tmp_path):
+    """
+    Tests whether adding vectors of another dimension fails instead of corrupting the matrix.
+    """
+    add(make_store(tmp_path), [0])
+    store = NumpyVectorStore(
+        path=str(tmp_path), embedding_function=OneHotEmbeddings(dimensions=4)
+    )
+
+    with pytest.raises(ValueError, match='does not match the store'):
+        add(store, [1])
+
+
+@pytest.mark.asyncio
+async def test_get_vector_store_uses_numpy_backend(mocker, tmp_path):
+    """
+    Tests whether VECTOR_BACKEND=numpy selects the memory-mapped store and the shared helpers work on it.
+    """
+    mocker.patch.object(settings, 'VECTOR_BACKEND', 'numpy')
+    mocker.patch.object(settings, 'NUMPY_STORE_PATH', str(tmp_path))
+    mocker.patch.object(settings, 'EMBEDDING_CACHE_ENABLED', False)
+    mocker.patch(
+        'rag.vector_store.OpenAIEmbeddings', return_value=OneHotEmbeddings()
+    )
+
+    store = vector_store.get_vector_store()
+    # Um store ainda vazio (len() == 0) continua sendo o mesmo singleton
+    assert vector_store.get_vector_store() is store
+    add(store, range(3))
+
+    assert isinstance(store, NumpyVectorStore)
+    assert vector_store.count_vectors() == 3
+
+    await vector_store.update_chunks_metadata(
+        [Document(page_content='t1', metadata={'page': 7})], ['c1']
+    )
+    assert store.get_by_ids(['c1'])[0].metadata == {'page': 7}
+
+
+@pytest.mark.parametrize('quantization', ['float16', 'int8'])
+def test_quantized_search_rescores_with_exact_scores(tmp_path, quantization):
+    """
+    Tests whether a quantized store ranks like the full-precision one and returns exact scores.
+    """
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((200, 32)).astype(np.float32)
+    texts = [f'v{i}' for i in range(len(vectors))]
+
+    class MatrixEmbeddings(Embeddings):
+        @staticmethod
+        def embed_documents(texts):
+            return [vectors[int(text[1:])].tolist() for text in texts]
+
+        def embed_query(self, text):
+            return self.embed_documents([text])[0]
+
+    exact = NumpyVectorStore(
+        path=str(tmp_path / 'exact'), embedding_function=MatrixEmbeddings()
+    )
+    quantized = NumpyVectorStore(
+        path=str(tmp_path / 'quantized'),
+        embedding_function=MatrixEmbeddings(),
+        quantization=quantization,
+    )
+    exact.add_texts(texts, ids=texts)
+    quantized.add_texts(texts, ids=texts)
+
+    query = vectors[7] + 0.5 * rng.standard_normal(32).astype(np.float32)
+    expected = exact.similarity_search_with_score_by_vector(
+        query.tolist(), k=5
+    )
+    results = quantized.similarity_search_with_score_by_vector(
+        query.tolist(), k=5
+    )
+
+    assert [d.id for d, _ in results] == [d.id for d, _ in expected]
+    assert [score for _, score in results] == pytest.approx(
+        [score for _, score in expected], abs=1e-6
+    )
+
+
+def test_quantized_store_reuses_one_matrix_file_per_generation(tmp_path):
+    """
+    Tests whether snapshots of a generation share one open matrix file and old generations are closed.
+    """
+    store = make_store(tmp_path, quantization='float16')
+    add(store, range(4))
+    first_file = store._snapshot.matrix_file
+    add(store, [4, 5])
+
+    assert store._snapshot.matrix_file is first_file
+
+    store.compact()
+    assert not first_file.closed
+    store.compact()
+
+    assert first_file.closed
+    assert len(store._matrix_files) <= 2
+    assert [d.id for d in store.similarity_search('t2', k=1)] == ['c2']
+
+    store.close()
+    assert all(
+        matrix_file.closed
+        for matrix_file in (first_file, store._snapshot.matrix_file)
+    )
+
+
+def test_reopening_with_other_quantization_converts_the_store(tmp_path):
+    """
+    Tests whether opening an existing store with another quantization rewrites it and keeps searching.
+    """
+    add(make_store(tmp_path), range(4))
+
+    store = make_store(tmp_path, quantization='int8')
+
+    assert sorted(os.listdir(tmp_path)) == [
+        '.lock',
+        'embeddings-1.f32',
+        'embeddings-1.i8',
+        'log-1.jsonl',
+        'meta.json',
+        'scales-1.f32',
+    ]
+    assert os.path.getsize(tmp_path / 'embeddings-1.i8') == 4 * 8
+    assert [
+        d.id
+        for d in make_store(tmp_path, quantization='int8').similarity_search(
+            't2', k=1
+        )
+    ] == ['c2']
+
+    store.delete(['c0', 'c1'])
+    assert [d.id for d in store.similarity_search('t3', k=1)] == ['c3']
@@ -1,6 +1,25 @@
+import io
+import os
+
 import pytest
+from fpdf import FPDF
+from starlette.datastructures import UploadFile as StarletteUploadFile
+
+from rag import process as process_module
+from rag.process import count_pages, parse_and_split_pages, process_pdf
+
 
-from rag.process import process_pdf
+@pytest.fixture
+def multi_page_pdf_upload_file():
+    """UploadFile with a 5-page PDF, one line of text per page."""
+    pdf = FPDF()
+    pdf.set_font('Arial', size=12)
+    for page in range(5):
+        pdf.add_page()
+        pdf.cell(200, 10, txt=f'Pagina {page} do PDF.', ln=1, align='L')
+
+    pdf_bytes = io.BytesIO(pdf.output(dest='S').encode('latin1'))
+    return StarletteUploadFile(filename='multi_page.pdf', file=pdf_bytes)
 
 
 @pytest.mark.asyncio
@@ -13,6 +32,7 @@ async def test_process_pdf_success(fake_pdf_upload_file):
     assert isinstance(chunks, list)
     assert len(chunks) > 0
     assert all(hasattr(chunk, 'page_content') for chunk in chunks)
+    assert chunks[0].metadata['source'] == 'test.pdf'
 
 
 @pytest.mark.asyncio
@@ -20,7 +40,9 @@ async def test_process_pdf_file_read_error(mocker, fake_pdf_upload_file):
     """
     Tests error handling when reading from UploadFile fails.
     """
-    mocker.patch.object(fake_pdf_upload_file, 'read', side_effect=IOError('Erro simulado'))
+    mocker.patch.object(
+        fake_pdf_upload_file, 'read', side_effect=IOError('Erro simulado')
+    )
 
     with pytest.raises(IOError, match='Erro simulado'):
         await process_pdf(fake_pdf_upload_file, 'test.pdf')
@@ -29,15 +51,72 @@ async def test_process_pdf_file_read_error(mocker, fake_pdf_upload_file):
 @pytest.mark.asyncio
 async def test_process_pdf_loader_error(mocker, fake_pdf_upload_file):
     """
-    Tests error handling when PyPDFLoader fails.
+    Tests error handling when the PDF parser fails.
     """
-    # Mockar a classe PyPDFLoader para lançar exceção
-    mock_loader = mocker.patch('rag.process.PyPDFLoader')
-    instance = mock_loader.return_value
-    instance.load.side_effect = Exception('Erro ao carregar PDF')
+    # Sem pool de processos o parsing roda em thread e o mock é aplicado
+    mocker.patch('rag.process.settings.PDF_PROCESS_POOL_SIZE', 0)
+    mocker.patch('rag.process.count_pages', return_value=1)
+    mocker.patch(
+        'rag.process.PdfReader', side_effect=Exception('Erro ao carregar PDF')
+    )
 
     # Pula split_documents pois nem será chamado
     mocker.patch('rag.process.split_documents')
 
     with pytest.raises(Exception, match='Erro ao carregar PDF'):
         await process_pdf(fake_pdf_upload_file, 'test.pdf')
+
+
+@pytest.mark.asyncio
+async def test_process_pdf_splits_large_files_by_page_ranges(
+    mocker, multi_page_pdf_upload_file
+):
+    """
+    Tests whether large PDFs are processed as page ranges and chunks keep the page order.
+    """
+    mocker.patch('rag.process.settings.PDF_PAGES_PER_TASK', 2)
+    run_in_pool = mocker.spy(process_module, '_run_in_pool')
+
+    chunks = await process_pdf(multi_page_pdf_upload_file, 'multi_page.pdf')
+
+    assert run_in_pool.call_count == 3
+    assert [chunk.metadata['page'] for chunk in chunks] == [0, 1, 2, 3, 4]
+    assert all(chunk.metadata['total_pages'] == 5 for chunk in chunks)
+
+
+@pytest.mark.asyncio
+async def test_process_pdf_sends_page_ranges_a_temp_file_path(
+    mocker, multi_page_pdf_upload_file
+):
+    """
+    Tests whether an in-memory PDF is written to disk once and the pool tasks receive only its path.
+    """
+    mocker.patch('rag.process.settings.PDF_PROCESS_POOL_SIZE', 2)
+    mocker.patch('rag.process.settings.PDF_PAGES_PER_TASK', 2)
+    write_temp_pdf = mocker.spy(process_module, '_write_temp_pdf')
+    run_in_pool = mocker.spy(process_module, '_run_in_pool')
+
+    chunks = await process_pdf(multi_page_pdf_upload_file, 'multi_page.pdf')
+
+    temp_path = write_temp_pdf.spy_return
+    assert write_temp_pdf.call_count == 1
+    assert [call.args[1] for call in run_in_pool.call_args_list] == [
+        temp_path
+    ] * 3
+    assert not os.path.exists(temp_path)
+    assert [chunk.metadata['page'] for chunk in chunks] == [0, 1, 2, 3, 4]
+
+
+def test_parse_and_split_pages_range(multi_page_pdf_upload_file):
+    """
+    Tests whether only the requested page range is extracted.
+    """
+    content = multi_page_pdf_upload_file.file.read()
+
+    chunks = parse_and_split_pages(
+        content, 'multi_page.pdf', 1, 3, chunk_size=1000, chunk_overlap=0
+    )
+
+    assert count_pages(content) == 5
+    assert [chunk.metadata['page'] for chunk in chunks] == [1, 2]
+    assert chunks[0].page_content == 'Pagina 1 do PDF.'
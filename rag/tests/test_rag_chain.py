@@ -1,47 +1,279 @@
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock
 
 import pytest
+from langchain_core.documents import Document
+
+from rag.rag_chain import (
+    QuestionTrace,
+    ask_question,
+    ask_questions,
+    stream_question,
+)
+
+
+@pytest.fixture
+def mock_rag_pipeline(mocker):
+    """Mocks the embedding, retrieval and LLM steps used by `ask_question`."""
+    documents = [
+        Document(
+            page_content='Conteúdo', metadata={'source': 'cv.pdf', 'page': 1}
+        )
+    ]
+    mocks = {
+        'embed_query': mocker.patch(
+            'rag.rag_chain.embed_query', AsyncMock(return_value=[1.0, 0.0])
+        ),
+        'retrieve': mocker.patch(
+            'rag.rag_chain.retrieve', AsyncMock(return_value=documents)
+        ),
+        'combine_docs_chain': mocker.patch('rag.rag_chain.combine_docs_chain'),
+        'documents': documents,
+    }
+    mocks['combine_docs_chain'].ainvoke = AsyncMock(return_value='42')
+    return mocks
 
 
 @pytest.mark.asyncio
-async def test_ask_question_success(mocker, mock_vector_store):
+async def test_ask_question_success(mock_rag_pipeline):
     """
-    Tests whether `ask_question` returns the expected response by correctly invoking the retrieval chain.
+    Tests whether `ask_question` embeds the question once, retrieves documents with that
+    embedding and returns the LLM answer with its sources.
     """
     question = 'Qual o sentido da vida?'
-    expected_answer = {'answer': '42'}
 
-    mock_get_vector_store = mocker.patch('rag.rag_chain.get_vector_store', return_value=mock_vector_store)
+    response = await ask_question(question)
+
+    mock_rag_pipeline['embed_query'].assert_awaited_once_with(question)
+    mock_rag_pipeline['retrieve'].assert_awaited_once_with(
+        question, [1.0, 0.0], k=5, scores=None
+    )
+    mock_rag_pipeline['combine_docs_chain'].ainvoke.assert_awaited_once_with({
+        'input': question,
+        'context': mock_rag_pipeline['documents'],
+    })
+    assert response['answer'] == '42'
+    assert response['sources'][0].filename == 'cv.pdf'
+    assert response['sources'][0].page == 1
 
-    mock_chain_instance = MagicMock()
-    mock_chain_instance.ainvoke = AsyncMock(return_value=expected_answer)
-    mock_create_chain = mocker.patch('rag.rag_chain.create_retrieval_chain', return_value=mock_chain_instance)
 
-    from rag.rag_chain import ask_question
-    response = await ask_question(question)
+@pytest.mark.asyncio
+async def test_ask_question_lexical_mode_skips_embedding(
+    mocker, mock_rag_pipeline
+):
+    """
+    Tests whether the lexical retrieval mode answers without calling the embedding API or the answer cache.
+    """
+    mocker.patch('rag.retrieval.settings.RETRIEVAL_MODE', 'lexical')
+    mock_cache = mocker.patch('rag.rag_chain.get_answer_cache')
 
-    mock_get_vector_store.assert_called_once()
+    response = await ask_question('O que é FastAPI?')
 
-    mock_vector_store.as_retriever.assert_called_once()
-    mock_create_chain.assert_called_once()
-    mock_chain_instance.ainvoke.assert_awaited_once_with({'input': question})
-    assert response == expected_answer['answer']
+    mock_rag_pipeline['embed_query'].assert_not_awaited()
+    mock_rag_pipeline['retrieve'].assert_awaited_once_with(
+        'O que é FastAPI?', None, k=5, scores=None
+    )
+    mock_cache.assert_not_called()
+    assert response['answer'] == '42'
 
 
 @pytest.mark.asyncio
-async def test_ask_question_chain_exception(mocker, mock_vector_store):
+async def test_ask_question_chain_exception(mock_rag_pipeline):
     """
     Tests exception handling when chain invocation fails.
     """
-    question = 'Qualquer pergunta'
+    mock_rag_pipeline['combine_docs_chain'].ainvoke = AsyncMock(
+        side_effect=RuntimeError('Erro na API da OpenAI')
+    )
 
-    mocker.patch('rag.rag_chain.get_vector_store', return_value=mock_vector_store)
+    with pytest.raises(RuntimeError, match='Erro na API da OpenAI'):
+        await ask_question('Qualquer pergunta')
 
-    # Mock da cadeia de recuperação para levantar uma exceção
-    mock_chain_instance = MagicMock()
-    mock_chain_instance.ainvoke = AsyncMock(side_effect=RuntimeError('Erro na API da OpenAI'))
-    mocker.patch('rag.rag_chain.create_retrieval_chain', return_value=mock_chain_instance)
 
-    from rag.rag_chain import ask_question
-    with pytest.raises(RuntimeError, match='Erro na API da OpenAI'):
-        await ask_question(question)
+@pytest.mark.asyncio
+async def test_ask_question_uses_answer_cache(mock_rag_pipeline):
+    """
+    Tests whether a similar question is answered from the semantic cache without calling the LLM.
+    """
+    first = await ask_question('Quais são suas habilidades?')
+    second = await ask_question('quais sao suas habilidades')
+
+    assert first == second
+    assert mock_rag_pipeline['embed_query'].await_count == 2
+    mock_rag_pipeline['retrieve'].assert_awaited_once()
+    mock_rag_pipeline['combine_docs_chain'].ainvoke.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_ask_question_answer_cache_disabled(mocker, mock_rag_pipeline):
+    """
+    Tests whether every question reaches the LLM when the answer cache is disabled.
+    """
+    mocker.patch('rag.rag_chain.settings.ANSWER_CACHE_ENABLED', False)
+
+    await ask_question('Pergunta')
+    await ask_question('Pergunta')
+
+    assert mock_rag_pipeline['combine_docs_chain'].ainvoke.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_question_emits_sources_tokens_and_done(
+    mock_rag_pipeline,
+):
+    """
+    Tests whether `stream_question` emits the sources first, then the LLM tokens, then a final summary.
+    """
+
+    async def fake_astream(_):
+        for token in ['Res', '', 'posta']:
+            yield token
+
+    mock_rag_pipeline['combine_docs_chain'].astream = fake_astream
+
+    events = [event async for event in stream_question('Pergunta')]
+
+    assert [event['event'] for event in events] == [
+        'sources',
+        'token',
+        'token',
+        'done',
+    ]
+    assert events[0]['data'] == {
+        'sources': [{'filename': 'cv.pdf', 'page': 1}]
+    }
+    assert (
+        ''.join(event['data']['content'] for event in events[1:3])
+        == 'Resposta'
+    )
+
+    done = events[-1]['data']
+    assert done['cached'] is False
+    assert set(done['timings']) == {
+        'retrieval_seconds',
+        'time_to_first_token_seconds',
+        'total_seconds',
+    }
+
+
+@pytest.mark.asyncio
+async def test_stream_question_served_from_answer_cache(mock_rag_pipeline):
+    """
+    Tests whether a streamed question already answered is served from the cache without calling the LLM.
+    """
+    await ask_question('Pergunta')
+
+    events = [event async for event in stream_question('Pergunta')]
+
+    assert [event['event'] for event in events] == ['sources', 'token', 'done']
+    assert events[1]['data'] == {'content': '42'}
+    assert events[-1]['data']['cached'] is True
+    mock_rag_pipeline['combine_docs_chain'].ainvoke.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_ask_questions_embeds_once_and_reports_failures_per_question(
+    mocker, mock_rag_pipeline
+):
+    """
+    Tests whether `ask_questions` embeds the batch in one call, reuses cached answers and reports
+    an LLM failure as an error result without aborting the other questions.
+    """
+    await ask_question('Pergunta em cache')
+
+    mock_embed = mocker.patch(
+        'rag.rag_chain.embed_queries',
+        AsyncMock(return_value=[[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]]),
+    )
+    mock_retrieve = mocker.patch(
+        'rag.rag_chain.retrieve_batch',
+        AsyncMock(return_value=[mock_rag_pipeline['documents']] * 2),
+    )
+    mock_rag_pipeline['combine_docs_chain'].ainvoke = AsyncMock(
+        side_effect=['resposta', RuntimeError('Rate limit')]
+    )
+
+    questions = ['Pergunta em cache', 'Outra pergunta', 'Mais uma']
+    results = {
+        result['index']: result async for result in ask_questions(questions)
+    }
+
+    mock_embed.assert_awaited_once_with(questions)
+    mock_retrieve.assert_awaited_once_with(
+        questions[1:], [[0.0, 1.0], [0.6, 0.8]], k=5
+    )
+    assert results[0]['cached'] is True
+    assert results[0]['answer'] == '42'
+    assert {results[1].get('answer'), results[2].get('answer')} == {
+        'resposta',
+        None,
+    }
+    assert 'Rate limit' in (results[1].get('error') or results[2].get('error'))
+
+
+@pytest.mark.asyncio
+async def test_ask_question_sends_merged_context(mocker, mock_rag_pipeline):
+    """
+    Tests whether overlapping retrieved chunks reach the LLM as a single block of text.
+    """
+    text = 'Experiência com FastAPI e PostgreSQL em produção.'
+    documents = [
+        Document(
+            id='b',
+            page_content=text[16:],
+            metadata={
+                'source': 'cv.pdf',
+                'page': 0,
+                'start_index': 16,
+                'token_count': 9,
+            },
+        ),
+        Document(
+            id='a',
+            page_content=text[:30],
+            metadata={
+                'source': 'cv.pdf',
+                'page': 0,
+                'start_index': 0,
+                'token_count': 8,
+            },
+        ),
+    ]
+    mock_rag_pipeline['retrieve'].return_value = documents
+
+    response = await ask_question('Pergunta')
+
+    [context] = mock_rag_pipeline[
+        'combine_docs_chain'
+    ].ainvoke.await_args.args[0]['context']
+    assert context.page_content == text
+    assert [
+        (source.filename, source.page) for source in response['sources']
+    ] == [('cv.pdf', 0)]
+
+
+@pytest.mark.asyncio
+async def test_ask_question_debug_records_only_chunks_sent_to_the_llm(
+    mocker, mock_rag_pipeline
+):
+    """
+    Tests whether the debug trace lists the chunks kept by the context assembly, not every retrieved chunk.
+    """
+    mocker.patch('rag.rag_chain.settings.CONTEXT_TOKEN_BUDGET', 100)
+    documents = [
+        Document(
+            id='top',
+            page_content='Primeiro',
+            metadata={'source': 'cv.pdf', 'page': 0, 'token_count': 90},
+        ),
+        Document(
+            id='over',
+            page_content='Segundo',
+            metadata={'source': 'cv.pdf', 'page': 1, 'token_count': 50},
+        ),
+    ]
+    mock_rag_pipeline['retrieve'].return_value = documents
+
+    trace = QuestionTrace(debug=True)
+    await ask_question('Pergunta', trace=trace)
+
+    assert [chunk['id'] for chunk in trace.chunks] == ['top']
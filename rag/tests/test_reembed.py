@@ -0,0 +1,54 @@
+from langchain_core.embeddings import Embeddings
+
+from rag.numpy_store import NumpyVectorStore
+from rag.reembed import reembed
+
+
+class ConstantEmbeddings(Embeddings):
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+        self.texts_embedded = 0
+
+    def embed_documents(self, texts):
+        self.texts_embedded += len(texts)
+        return [[1.0] * self.dimensions for _ in texts]
+
+    def embed_query(self, text):
+        return [1.0] * self.dimensions
+
+
+def test_reembed_copies_chunks_with_new_dimensions_and_resumes(tmp_path):
+    """
+    Tests whether the corpus is copied in batches into a new collection, and a re-run only syncs the differences.
+    """
+    source = NumpyVectorStore(
+        path=str(tmp_path / 'source'), embedding_function=ConstantEmbeddings(8)
+    )
+    source.add_texts(
+        [f'texto {i}' for i in range(5)],
+        metadatas=[{'page': i} for i in range(5)],
+        ids=[f'c{i}' for i in range(5)],
+    )
+    target_embeddings = ConstantEmbeddings(4)
+    target = NumpyVectorStore(
+        path=str(tmp_path / 'target'), embedding_function=target_embeddings
+    )
+
+    assert reembed(source, target, batch_size=2) == {
+        'chunks': 5,
+        'embedded': 5,
+        'removed': 0,
+    }
+    assert target.dimensions == 4
+    assert target.get_by_ids(['c3'])[0].metadata == {'page': 3}
+
+    source.delete(['c0'])
+    source.add_texts(['texto 9'], ids=['c9'])
+
+    assert reembed(source, target, batch_size=2) == {
+        'chunks': 5,
+        'embedded': 1,
+        'removed': 1,
+    }
+    assert target_embeddings.texts_embedded == 6
+    assert sorted(target.get()['ids']) == ['c1', 'c2', 'c3', 'c4', 'c9']
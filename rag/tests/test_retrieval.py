@@ -0,0 +1,183 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from langchain_core.documents import Document
+
+from rag.bm25_index import get_bm25_index
+from rag.retrieval import (
+    reciprocal_rank_fusion,
+    retrieve,
+    retrieve_batch,
+    search_chunks,
+)
+from rag.tombstones import get_tombstones
+
+
+def doc(doc_id):
+    return Document(id=doc_id, page_content=f'conteúdo {doc_id}', metadata={})
+
+
+def test_reciprocal_rank_fusion_rewards_documents_in_both_rankings():
+    """
+    Tests whether a chunk ranked by both retrievers beats chunks ranked first by only one of them.
+    """
+    vector = [doc('a'), doc('shared'), doc('b')]
+    lexical = [doc('c'), doc('shared')]
+
+    fused = reciprocal_rank_fusion([vector, lexical], k=3, rrf_k=60)
+
+    assert [d.id for d in fused] == ['shared', 'a', 'c']
+
+
+@pytest.mark.asyncio
+async def test_retrieve_hybrid_fuses_vector_and_lexical_results(mocker):
+    """
+    Tests whether hybrid mode searches both indexes with the candidate pool size and fuses the results.
+    """
+    mocker.patch('rag.retrieval.settings.RETRIEVAL_MODE', 'hybrid')
+    mocker.patch('rag.retrieval.settings.RETRIEVAL_CANDIDATES_K', 10)
+    mock_search = mocker.patch(
+        'rag.retrieval.search_by_vector',
+        AsyncMock(return_value=[doc('vector-only')]),
+    )
+    get_bm25_index().add(
+        [Document(page_content='Projeto com LangChain', metadata={})],
+        ['lexical-only'],
+    )
+
+    documents = await retrieve('langchain', [0.1, 0.2], k=5)
+
+    mock_search.assert_awaited_once_with([0.1, 0.2], k=10)
+    assert {d.id for d in documents} == {'vector-only', 'lexical-only'}
+
+
+@pytest.mark.asyncio
+async def test_retrieve_lexical_does_not_search_vectors(mocker):
+    """
+    Tests whether lexical mode answers from the BM25 index alone.
+    """
+    mocker.patch('rag.retrieval.settings.RETRIEVAL_MODE', 'lexical')
+    mock_search = mocker.patch('rag.retrieval.search_by_vector')
+    get_bm25_index().add(
+        [Document(page_content='Experiência com FastAPI', metadata={})],
+        ['chunk-0'],
+    )
+
+    documents = await retrieve('fastapi', None, k=5)
+
+    mock_search.assert_not_called()
+    assert [d.id for d in documents] == ['chunk-0']
+
+
+@pytest.mark.asyncio
+async def test_retrieve_vector_mode(mocker):
+    """
+    Tests whether vector mode only runs the similarity search.
+    """
+    mocker.patch('rag.retrieval.settings.RETRIEVAL_MODE', 'vector')
+    mock_search = mocker.patch(
+        'rag.retrieval.search_by_vector', AsyncMock(return_value=[doc('a')])
+    )
+
+    documents = await retrieve('pergunta', [0.1], k=5)
+
+    mock_search.assert_awaited_once_with([0.1], k=5)
+    assert [d.id for d in documents] == ['a']
+
+
+@pytest.mark.asyncio
+async def test_retrieve_vector_mode_skips_tombstoned_chunks(mocker):
+    """
+    Tests whether chunks of deleted documents are dropped and extra candidates are fetched to fill k.
+    """
+    mocker.patch('rag.retrieval.settings.RETRIEVAL_MODE', 'vector')
+    mocker.patch('rag.retrieval.settings.RETRIEVAL_CANDIDATES_K', 10)
+    mock_search = mocker.patch(
+        'rag.retrieval.search_by_vector',
+        AsyncMock(return_value=[doc('deleted'), doc('a'), doc('b')]),
+    )
+    get_tombstones().add(['deleted'])
+
+    documents = await retrieve('pergunta', [0.1], k=2)
+
+    mock_search.assert_awaited_once_with([0.1], k=10)
+    assert [d.id for d in documents] == ['a', 'b']
+
+
+@pytest.mark.asyncio
+async def test_retrieve_hybrid_skips_tombstoned_chunks(mocker):
+    """
+    Tests whether hybrid mode drops tombstoned chunks from both rankings before fusing.
+    """
+    mocker.patch('rag.retrieval.settings.RETRIEVAL_MODE', 'hybrid')
+    mocker.patch(
+        'rag.retrieval.search_by_vector',
+        AsyncMock(return_value=[doc('deleted'), doc('a')]),
+    )
+    get_bm25_index().add(
+        [Document(page_content='Projeto com LangChain', metadata={})],
+        ['deleted'],
+    )
+    get_tombstones().add(['deleted'])
+
+    documents = await retrieve('langchain', [0.1], k=5)
+
+    assert [d.id for d in documents] == ['a']
+
+
+@pytest.mark.asyncio
+async def test_retrieve_batch_searches_all_questions_at_once(mocker):
+    """
+    Tests whether batch retrieval issues a single vector query for all questions and fuses each with BM25.
+    """
+    mocker.patch('rag.retrieval.settings.RETRIEVAL_MODE', 'hybrid')
+    mocker.patch('rag.retrieval.settings.RETRIEVAL_CANDIDATES_K', 10)
+    mock_search = mocker.patch(
+        'rag.retrieval.search_by_vectors',
+        AsyncMock(return_value=[[doc('v1')], [doc('v2'), doc('removed')]]),
+    )
+    get_bm25_index().add(
+        [Document(page_content='Projeto com LangChain', metadata={})],
+        ['lexical-only'],
+    )
+    get_tombstones().add(['removed'])
+
+    results = await retrieve_batch(
+        ['langchain', 'fastapi'], [[0.1], [0.2]], k=5
+    )
+
+    mock_search.assert_awaited_once_with([[0.1], [0.2]], k=10)
+    assert [{d.id for d in documents} for documents in results] == [
+        {'v1', 'lexical-only'},
+        {'v2'},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_chunks_applies_filter_threshold_and_tombstones(mocker):
+    """
+    Tests whether search_chunks filters by filename in the index and drops low-score and tombstoned chunks.
+    """
+    mocker.patch('rag.retrieval.settings.RETRIEVAL_CANDIDATES_K', 10)
+    mocker.patch('rag.retrieval.embed_query', AsyncMock(return_value=[0.1]))
+    mock_search = mocker.patch(
+        'rag.retrieval.search_by_vector_with_scores',
+        AsyncMock(
+            return_value=[
+                (doc('deleted'), 0.9),
+                (doc('a'), 0.8),
+                (doc('b'), 0.5),
+                (doc('c'), 0.1),
+            ]
+        ),
+    )
+    get_tombstones().add(['deleted'])
+
+    results = await search_chunks(
+        'consulta', k=5, score_threshold=0.3, filenames=['cv.pdf']
+    )
+
+    mock_search.assert_awaited_once_with(
+        [0.1], 10, {'source': {'$in': ['cv.pdf']}}
+    )
+    assert [(d.id, score) for d, score in results] == [('a', 0.8), ('b', 0.5)]
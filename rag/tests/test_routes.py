@@ -1,4 +1,11 @@
 import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from langchain_core.documents import Document
+
+from app.main import app
+from app.security import API_KEY_NAME
+from app.settings import settings
 
 
 @pytest.mark.asyncio
@@ -7,15 +14,26 @@ async def test_ask_question_success(mocker, client):
     Test the path to success by asking a question.
     """
     mocked_answer = 'A resposta para sua pergunta é 42.'
-    mock_rag = mocker.patch('rag.routes.ask_question_rag', return_value=mocked_answer)
+    mock_rag = mocker.patch(
+        'rag.routes.ask_question_rag',
+        return_value={
+            'answer': mocked_answer,
+            'sources': [],
+            'confidence': None,
+        },
+    )
 
     payload = {'question': 'Qual o sentido da vida?'}
 
     response = await client.post('/api/rag/ask-question', json=payload)
 
     assert response.status_code == 200
-    assert response.json() == {'answer': mocked_answer}
-    mock_rag.assert_awaited_once_with(payload['question'])
+    assert response.json() == {
+        'answer': mocked_answer,
+        'sources': [],
+        'confidence': None,
+    }
+    mock_rag.assert_awaited_once_with(payload['question'], trace=mocker.ANY)
 
 
 @pytest.mark.asyncio
@@ -33,3 +51,252 @@ async def test_ask_question_invalid_payload(client):
     error_details = response.json()['detail'][0]
     assert error_details['type'] == 'missing'
     assert error_details['loc'] == ['body', 'question']
+
+
+@pytest.mark.asyncio
+async def test_ask_question_stream_success(mocker, client):
+    """
+    Tests whether the streaming endpoint returns the RAG events as Server-Sent Events.
+    """
+
+    async def fake_stream_question(question):
+        yield {'event': 'sources', 'data': {'sources': []}}
+        yield {'event': 'token', 'data': {'content': '42'}}
+        yield {'event': 'done', 'data': {'confidence': None}}
+
+    mocker.patch(
+        'rag.routes.stream_question', side_effect=fake_stream_question
+    )
+
+    response = await client.post(
+        '/api/rag/ask-question/stream',
+        json={'question': 'Qual o sentido da vida?'},
+    )
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert response.text == (
+        'event: sources\ndata: {"sources": []}\n\n'
+        'event: token\ndata: {"content": "42"}\n\n'
+        'event: done\ndata: {"confidence": null}\n\n'
+    )
+
+
+@pytest.mark.asyncio
+async def test_ask_question_stream_error_event(mocker, client):
+    """
+    Tests whether a failure during generation is reported as an `error` event.
+    """
+
+    async def failing_stream_question(question):
+        yield {'event': 'sources', 'data': {'sources': []}}
+        raise RuntimeError('Erro na API da OpenAI')
+
+    mocker.patch(
+        'rag.routes.stream_question', side_effect=failing_stream_question
+    )
+
+    response = await client.post(
+        '/api/rag/ask-question/stream', json={'question': 'Pergunta'}
+    )
+
+    assert response.status_code == 200
+    assert (
+        'event: error\ndata: {"detail": "Erro na API da OpenAI"}'
+        in response.text
+    )
+
+
+@pytest_asyncio.fixture
+async def app_client():
+    """Client for routes that do not touch the database."""
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url='http://testserver'
+    ) as client:
+        yield client
+
+
+@pytest.fixture
+def mock_pipeline(mocker):
+    documents = [
+        Document(
+            id='chunk-1',
+            page_content='Conteúdo',
+            metadata={'source': 'cv.pdf', 'page': 1},
+        )
+    ]
+    mocker.patch.object(settings, 'RETRIEVAL_MODE', 'vector')
+    mocker.patch.object(settings, 'ANSWER_CACHE_ENABLED', False)
+    mocker.patch('rag.rag_chain.embed_query', return_value=[1.0, 0.0])
+    mocker.patch('rag.retrieval.search_by_vector', return_value=documents)
+    mocker.patch(
+        'rag.retrieval.search_by_vector_with_scores',
+        return_value=[(documents[0], 0.91234)],
+    )
+    chain = mocker.patch('rag.rag_chain.combine_docs_chain')
+    chain.ainvoke = mocker.AsyncMock(return_value='42')
+    return documents
+
+
+@pytest.mark.asyncio
+async def test_ask_question_sets_server_timing_header(
+    app_client, mock_pipeline
+):
+    """
+    Tests whether every answer carries a Server-Timing header with the stage durations and no debug field.
+    """
+    response = await app_client.post(
+        '/api/rag/ask-question', json={'question': 'Pergunta'}
+    )
+
+    assert response.status_code == 200
+    stages = [
+        entry.split(';')[0]
+        for entry in response.headers['server-timing'].split(', ')
+    ]
+    assert stages == ['embed', 'retrieve', 'llm', 'serialize', 'total']
+    assert 'debug' not in response.json()
+
+
+@pytest.mark.asyncio
+async def test_ask_question_debug_returns_chunks_and_scores(
+    app_client, mock_pipeline
+):
+    """
+    Tests whether debug mode returns the timings and the retrieved chunk ids with their scores.
+    """
+    response = await app_client.post(
+        '/api/rag/ask-question?debug=true',
+        json={'question': 'Pergunta'},
+        headers={API_KEY_NAME: settings.API_KEY},
+    )
+
+    debug = response.json()['debug']
+    assert set(debug['timings_ms']) == {'embed', 'retrieve', 'llm'}
+    assert debug['cached'] is False
+    assert debug['chunks'] == [
+        {
+            'id': 'chunk-1',
+            'filename': 'cv.pdf',
+            'page': 1,
+            'scores': {'vector': 0.9123},
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ask_question_debug_requires_api_key(app_client, mock_pipeline):
+    """
+    Tests whether debug mode is refused without the API key.
+    """
+    response = await app_client.post(
+        '/api/rag/ask-question?debug=true', json={'question': 'Pergunta'}
+    )
+
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_search_returns_chunks_without_calling_the_llm(
+    mocker, app_client
+):
+    """
+    Tests whether /rag/search returns scored chunks and never calls the LLM.
+    """
+    chunk = Document(
+        id='chunk-1',
+        page_content='Experiência com FastAPI',
+        metadata={'source': 'cv.pdf', 'page': 2},
+    )
+    mock_search = mocker.patch(
+        'rag.routes.search_chunks', return_value=[(chunk, 0.812345)]
+    )
+    chain = mocker.patch('rag.rag_chain.combine_docs_chain')
+
+    response = await app_client.post(
+        '/api/rag/search',
+        json={'query': 'fastapi', 'k': 3, 'filenames': ['cv.pdf']},
+        headers={API_KEY_NAME: settings.API_KEY},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        'results': [
+            {
+                'id': 'chunk-1',
+                'content': 'Experiência com FastAPI',
+                'filename': 'cv.pdf',
+                'page': 2,
+                'score': 0.8123,
+            }
+        ]
+    }
+    mock_search.assert_awaited_once_with('fastapi', 3, None, ['cv.pdf'])
+    chain.ainvoke.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_search_requires_api_key(mocker, app_client):
+    """
+    Tests whether /rag/search refuses requests without the API key, since it returns raw chunk text.
+    """
+    mock_search = mocker.patch('rag.routes.search_chunks')
+
+    response = await app_client.post(
+        '/api/rag/search', json={'query': 'fastapi'}
+    )
+
+    assert response.status_code == 401
+    mock_search.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_ask_batch_streams_ndjson(mocker, app_client):
+    """
+    Tests whether /rag/ask-batch streams one JSON line per result, with a final error line on failure.
+    """
+
+    async def fake_ask_questions(questions):
+        yield {
+            'index': 1,
+            'question': questions[1],
+            'answer': '42',
+            'sources': [],
+            'confidence': None,
+            'cached': False,
+        }
+        raise RuntimeError('Erro na API da OpenAI')
+
+    mocker.patch('rag.routes.ask_questions', side_effect=fake_ask_questions)
+
+    response = await app_client.post(
+        '/api/rag/ask-batch',
+        json={'questions': ['Primeira', 'Segunda']},
+        headers={API_KEY_NAME: settings.API_KEY},
+    )
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    assert response.text.splitlines() == [
+        '{"index": 1, "question": "Segunda", "answer": "42", "sources": [], "confidence": null, "cached": false}',
+        '{"error": "Erro na API da OpenAI"}',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ask_batch_rejects_oversized_batches(mocker, app_client):
+    """
+    Tests whether /rag/ask-batch requires the API key and enforces ASK_BATCH_MAX_QUESTIONS.
+    """
+    mocker.patch.object(settings, 'ASK_BATCH_MAX_QUESTIONS', 2)
+    payload = {'questions': ['a', 'b', 'c']}
+
+    unauthorized = await app_client.post('/api/rag/ask-batch', json=payload)
+    too_large = await app_client.post(
+        '/api/rag/ask-batch',
+        json=payload,
+        headers={API_KEY_NAME: settings.API_KEY},
+    )
+
+    assert unauthorized.status_code == 401
+    assert too_large.status_code == 422
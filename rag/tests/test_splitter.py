@@ -28,13 +28,30 @@ def test_split_documents_custom_parameters():
     assert chunks[0].page_content.endswith(chunks[1].page_content[:20])
 
 
+def test_split_documents_records_start_index():
+    """
+    Validates that each chunk records where it starts in the source text.
+    """
+    text = ' '.join(f'palavra{i}' for i in range(60))
+    doc = [Document(page_content=text)]
+
+    chunks = split_documents(doc, chunk_size=100, chunk_overlap=30)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        start = chunk.metadata['start_index']
+        assert (
+            text[start : start + len(chunk.page_content)] == chunk.page_content
+        )
+
+
 def test_split_documents_no_split():
     """
     Validates that documents smaller than chunk_size are not split.
     """
-    short_doc = [Document(page_content="Texto curto.")]
+    short_doc = [Document(page_content='Texto curto.')]
 
     chunks = split_documents(short_doc, chunk_size=1000, chunk_overlap=200)
 
     assert len(chunks) == 1
-    assert chunks[0].page_content == "Texto curto."
+    assert chunks[0].page_content == 'Texto curto.'
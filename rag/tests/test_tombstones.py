@@ -0,0 +1,20 @@
+from langchain_core.documents import Document
+
+from rag.tombstones import TombstoneSet
+
+
+def test_filter_drops_tombstoned_chunks():
+    """
+    Tests whether filtering removes only tombstoned chunk ids, keeping the order of the rest.
+    """
+    tombstones = TombstoneSet()
+    tombstones.add(['b'])
+    documents = [
+        Document(id=doc_id, page_content=doc_id) for doc_id in ['a', 'b', 'c']
+    ]
+
+    assert [d.id for d in tombstones.filter(documents)] == ['a', 'c']
+
+    tombstones.discard(['b'])
+    assert len(tombstones) == 0
+    assert tombstones.filter(documents) == documents
@@ -1,10 +1,25 @@
+import asyncio
+import os
 import re
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 
+from app.settings import settings
+from rag import vector_store as vector_store_module
+from rag.bm25_index import BM25Index
+from rag.embedding_cache import CachedEmbeddings
 from rag.vector_store import (
+    QueryEmbeddingBatcher,
     add_chunks_to_vector_store,
+    build_embeddings,
+    check_embedding_metadata,
+    delete_chunks_by_ids,
+    diff_chunks,
+    embed_query,
+    ensure_bm25_index,
     generate_chunks_ids,
     get_vector_store,
 )
@@ -31,37 +46,140 @@ def test_get_vector_store_instantiation_error(mocker):
     Tests error handling if Chroma instantiation fails.
     """
     mocker.patch('rag.vector_store.OpenAIEmbeddings')
-    mocker.patch('rag.vector_store.Chroma', side_effect=Exception("Falha na conexão com Chroma"))
+    mocker.patch(
+        'rag.vector_store.Chroma',
+        side_effect=Exception('Falha na conexão com Chroma'),
+    )
 
     with pytest.raises(Exception, match='Falha na conexão com Chroma'):
         get_vector_store()
 
 
 @pytest.mark.asyncio
-async def test_add_chunks_to_vector_store_success(mocker, mock_vector_store, dummy_documents):
+async def test_add_chunks_to_vector_store_success(
+    mocker, mock_vector_store, dummy_documents
+):
     """
     Tests whether the `add_chunks_to_vector_store` function correctly calls the vector store's `aadd_documents` method.
     """
-    mocker.patch('rag.vector_store.get_vector_store', return_value=mock_vector_store)
+    mocker.patch(
+        'rag.vector_store.get_vector_store', return_value=mock_vector_store
+    )
 
-    chunks_ids = generate_chunks_ids(filename='test.pdf', chunks=dummy_documents)
+    chunks_ids = generate_chunks_ids(
+        filename='test.pdf', chunks=dummy_documents
+    )
 
     await add_chunks_to_vector_store(dummy_documents, chunks_ids)
 
-    mock_vector_store.aadd_documents.assert_awaited_once_with(documents=dummy_documents, ids=chunks_ids)
+    mock_vector_store.aadd_documents.assert_awaited_once_with(
+        documents=dummy_documents, ids=chunks_ids
+    )
 
 
 @pytest.mark.asyncio
-async def test_add_chunks_to_vector_store_error(mocker, mock_vector_store, dummy_documents):
+async def test_add_and_delete_chunks_keep_bm25_index_in_sync(
+    mocker, mock_vector_store, dummy_documents
+):
+    """
+    Tests whether adding and deleting chunks updates and persists the BM25 index.
+    """
+    mocker.patch.object(settings, 'RETRIEVAL_MODE', 'hybrid')
+    mock_vector_store.adelete = AsyncMock(return_value=None)
+    mocker.patch(
+        'rag.vector_store.get_vector_store', return_value=mock_vector_store
+    )
+    chunks_ids = generate_chunks_ids(
+        filename='test.pdf', chunks=dummy_documents
+    )
+
+    await add_chunks_to_vector_store(dummy_documents, chunks_ids)
+
+    assert (
+        BM25Index.load(settings.bm25_index_path)
+        .search('segundo', k=5)[0][0]
+        .id
+        == chunks_ids[1]
+    )
+
+    await delete_chunks_by_ids(chunks_ids)
+
+    assert len(BM25Index.load(settings.bm25_index_path)) == 0
+
+
+@pytest.mark.asyncio
+async def test_vector_mode_skips_bm25_updates_and_discards_the_stale_index(
+    mocker, mock_vector_store, dummy_documents
+):
+    """
+    Tests whether writes in vector mode do not touch the BM25 index but delete its files so it is rebuilt later.
+    """
+    mocker.patch(
+        'rag.vector_store.get_vector_store', return_value=mock_vector_store
+    )
+    mocker.patch.object(settings, 'RETRIEVAL_MODE', 'hybrid')
+    await add_chunks_to_vector_store(dummy_documents[:1], ['chunk-0'])
+    await add_chunks_to_vector_store(dummy_documents[1:], ['chunk-1'])
+    log_path = f'{settings.bm25_index_path}.1.log'
+    assert os.path.exists(log_path)
+    mock_add = mocker.spy(BM25Index, 'add')
+
+    mocker.patch.object(settings, 'RETRIEVAL_MODE', 'vector')
+    await add_chunks_to_vector_store(dummy_documents[:1], ['chunk-2'])
+    ensure_bm25_index()
+
+    mock_add.assert_not_called()
+    assert not os.path.exists(settings.bm25_index_path)
+    assert not os.path.exists(log_path)
+
+
+def test_ensure_bm25_index_rebuilds_from_vector_store(
+    mocker, mock_vector_store
+):
+    """
+    Tests whether a missing BM25 index is rebuilt from the chunks stored in the vector store.
+    """
+    mocker.patch.object(settings, 'RETRIEVAL_MODE', 'hybrid')
+    mock_vector_store.get.return_value = {
+        'ids': ['chunk-0'],
+        'documents': ['Experiência com FastAPI'],
+        'metadatas': [{'source': 'cv.pdf'}],
+    }
+    mocker.patch(
+        'rag.vector_store.get_vector_store', return_value=mock_vector_store
+    )
+
+    ensure_bm25_index()
+    ensure_bm25_index()
+
+    mock_vector_store.get.assert_called_once()
+    assert (
+        BM25Index.load(settings.bm25_index_path)
+        .search('fastapi', k=1)[0][0]
+        .id
+        == 'chunk-0'
+    )
+
+
+@pytest.mark.asyncio
+async def test_add_chunks_to_vector_store_error(
+    mocker, mock_vector_store, dummy_documents
+):
     """
     Tests error handling when `aadd_documents` fails.
     """
-    mock_vector_store.aadd_documents.side_effect = Exception("Erro ao adicionar documentos")
-    mocker.patch('rag.vector_store.get_vector_store', return_value=mock_vector_store)
+    mock_vector_store.aadd_documents.side_effect = Exception(
+        'Erro ao adicionar documentos'
+    )
+    mocker.patch(
+        'rag.vector_store.get_vector_store', return_value=mock_vector_store
+    )
 
-    chunks_ids = generate_chunks_ids(filename='test.pdf', chunks=dummy_documents)
+    chunks_ids = generate_chunks_ids(
+        filename='test.pdf', chunks=dummy_documents
+    )
 
-    with pytest.raises(Exception, match="Erro ao adicionar documentos"):
+    with pytest.raises(Exception, match='Erro ao adicionar documentos'):
         await add_chunks_to_vector_store(dummy_documents, chunks_ids)
 
 
@@ -69,13 +187,292 @@ def test_generate_chunks_ids():
     """
     Tests whether chunk IDs are generated correctly with valid name, index, and UUID.
     """
-    filename = "example.pdf"
-    chunks = [Document(page_content="Chunk 1"), Document(page_content="Chunk 2")]
+    filename = 'example.pdf'
+    chunks = [
+        Document(page_content='Chunk 1'),
+        Document(page_content='Chunk 2'),
+    ]
 
     chunk_ids = generate_chunks_ids(filename, chunks)
 
     assert len(chunk_ids) == len(chunks)
 
     for i, chunk_id in enumerate(chunk_ids):
-        pattern = rf"^{filename}_chunk_{i}_[0-9a-fA-F-]{{36}}$"
-        assert re.match(pattern, chunk_id), f'ID {chunk_id} não está no formato esperado'
+        pattern = rf'^{filename}_chunk_{i}_[0-9a-fA-F-]{{36}}$'
+        assert re.match(pattern, chunk_id), (
+            f'ID {chunk_id} não está no formato esperado'
+        )
+
+
+@pytest.fixture
+def fake_query_embeddings():
+    embeddings = MagicMock()
+    embeddings.aembed_documents = AsyncMock(
+        side_effect=lambda texts: [[float(len(t))] for t in texts]
+    )
+    return embeddings
+
+
+@pytest.mark.asyncio
+async def test_query_batcher_coalesces_concurrent_queries(
+    fake_query_embeddings,
+):
+    """
+    Tests whether concurrent queries inside the batching window are embedded in a single call.
+    """
+    batcher = QueryEmbeddingBatcher(
+        fake_query_embeddings, max_wait_ms=10, max_batch_size=10
+    )
+
+    vectors = await asyncio.gather(
+        batcher.embed('a'), batcher.embed('bb'), batcher.embed('a')
+    )
+
+    assert vectors == [[1.0], [2.0], [1.0]]
+    fake_query_embeddings.aembed_documents.assert_awaited_once_with([
+        'a',
+        'bb',
+    ])
+    assert batcher.batches == 1
+    assert batcher.queries == 3
+
+
+@pytest.mark.asyncio
+async def test_query_batcher_flushes_at_max_batch_size(fake_query_embeddings):
+    """
+    Tests whether a full batch is sent immediately, without waiting for the window.
+    """
+    batcher = QueryEmbeddingBatcher(
+        fake_query_embeddings, max_wait_ms=10_000, max_batch_size=2
+    )
+
+    vectors = await asyncio.wait_for(
+        asyncio.gather(batcher.embed('a'), batcher.embed('bb')), timeout=1
+    )
+
+    assert vectors == [[1.0], [2.0]]
+
+
+@pytest.mark.asyncio
+async def test_query_batcher_propagates_errors(fake_query_embeddings):
+    """
+    Tests whether an embedding failure is raised for every caller in the batch.
+    """
+    fake_query_embeddings.aembed_documents.side_effect = RuntimeError(
+        'Erro na API de embeddings'
+    )
+    batcher = QueryEmbeddingBatcher(
+        fake_query_embeddings, max_wait_ms=1, max_batch_size=10
+    )
+
+    results = await asyncio.gather(
+        batcher.embed('a'), batcher.embed('b'), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_embed_query_without_batching(mocker, mock_vector_store):
+    """
+    Tests whether embed_query calls the embeddings directly when batching is disabled.
+    """
+    mocker.patch(
+        'rag.vector_store.settings.QUERY_EMBEDDING_BATCH_ENABLED', False
+    )
+    mock_vector_store.embeddings.aembed_query = AsyncMock(return_value=[0.5])
+    mocker.patch(
+        'rag.vector_store.get_vector_store', return_value=mock_vector_store
+    )
+
+    assert await embed_query('pergunta') == [0.5]
+    mock_vector_store.embeddings.aembed_query.assert_awaited_once_with(
+        'pergunta'
+    )
+
+
+def test_diff_chunks_reuses_ids_of_unchanged_content():
+    """
+    Tests whether unchanged chunks keep their ids, new ones get fresh ids and missing ones are removed.
+    """
+    stored = [
+        Document(id='old-0', page_content='Introdução', metadata={'page': 0}),
+        Document(id='old-1', page_content='Experiência', metadata={'page': 1}),
+        Document(id='old-2', page_content='Formação', metadata={'page': 2}),
+    ]
+    new = [
+        Document(page_content='Resumo', metadata={'page': 0}),
+        Document(page_content='Introdução', metadata={'page': 1}),
+        Document(page_content='Experiência', metadata={'page': 1}),
+    ]
+
+    diff = diff_chunks('cv.pdf', stored, new)
+
+    assert diff.chunk_ids[1:] == ['old-0', 'old-1']
+    assert diff.chunk_ids[0].startswith('cv.pdf_chunk_0_')
+    assert diff.added == [0]
+    assert diff.metadata_changed == [1]
+    assert diff.removed_ids == ['old-2']
+
+
+def test_diff_chunks_matches_repeated_content_once_per_stored_chunk():
+    """
+    Tests whether repeated chunk content is matched one-to-one with stored chunks.
+    """
+    stored = [Document(id='old-0', page_content='Repetido', metadata={})]
+    new = [
+        Document(page_content='Repetido', metadata={}),
+        Document(page_content='Repetido', metadata={}),
+    ]
+
+    diff = diff_chunks('cv.pdf', stored, new)
+
+    assert diff.chunk_ids[0] == 'old-0'
+    assert diff.added == [1]
+    assert diff.removed_ids == []
+
+
+class SizedEmbeddings(Embeddings):
+    """Vetores constantes com a dimensão informada."""
+
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts):
+        return [[1.0] * self.dimensions for _ in texts]
+
+    def embed_query(self, text):
+        return [1.0] * self.dimensions
+
+
+def test_build_embeddings_passes_dimensions_and_separates_cache(mocker):
+    """
+    Tests whether EMBEDDING_DIMENSIONS reaches OpenAIEmbeddings and gets its own embedding cache namespace.
+    """
+    mocker.patch.object(settings, 'EMBEDDING_DIMENSIONS', 512)
+    mocker.patch.object(settings, 'EMBEDDING_CACHE_PATH', ':memory:')
+    mock_openai = mocker.patch('rag.vector_store.OpenAIEmbeddings')
+
+    embeddings = build_embeddings()
+
+    mock_openai.assert_called_once_with(
+        model=settings.EMBEDDING_MODEL,
+        dimensions=512,
+        base_url=None,
+        check_embedding_ctx_length=True,
+    )
+    assert isinstance(embeddings, CachedEmbeddings)
+    assert embeddings.namespace == f'{settings.EMBEDDING_MODEL}:512'
+
+
+@pytest.fixture
+def numpy_backend(mocker, tmp_path):
+    mocker.patch.object(settings, 'VECTOR_BACKEND', 'numpy')
+    mocker.patch.object(settings, 'NUMPY_STORE_PATH', str(tmp_path / 'numpy'))
+    mocker.patch.object(settings, 'EMBEDDING_CACHE_ENABLED', False)
+    mocker.patch.object(settings, 'EMBEDDING_DIMENSIONS', 8)
+    return mocker.patch(
+        'rag.vector_store.OpenAIEmbeddings', return_value=SizedEmbeddings(8)
+    )
+
+
+def reopen_store(mocker, dimensions):
+    mocker.patch.object(settings, 'EMBEDDING_DIMENSIONS', dimensions)
+    mocker.patch(
+        'rag.vector_store.OpenAIEmbeddings',
+        return_value=SizedEmbeddings(dimensions),
+    )
+    vector_store_module._global_instance_vector_store = None
+
+
+def test_check_embedding_metadata_detects_dimension_change(
+    mocker, numpy_backend
+):
+    """
+    Tests whether startup fails when the stored vectors were built with another embedding dimension.
+    """
+    get_vector_store().add_texts(['texto'], ids=['c0'])
+    check_embedding_metadata()
+    assert get_vector_store().collection_metadata == {
+        'embedding_model': settings.EMBEDDING_MODEL,
+        'embedding_dimensions': 8,
+    }
+
+    reopen_store(mocker, 4)
+
+    with pytest.raises(RuntimeError, match='rag.reembed'):
+        check_embedding_metadata()
+
+
+def test_check_embedding_metadata_records_legacy_and_empty_collections(
+    mocker, numpy_backend
+):
+    """
+    Tests whether a collection without recorded metadata is checked by vector size and then adopts the settings.
+    """
+    store = get_vector_store()
+    store.add_texts(['texto'], ids=['c0'])
+    store.modify_collection_metadata({})
+
+    check_embedding_metadata()
+    assert store.collection_metadata['embedding_dimensions'] == 8
+
+    # Sem vetores armazenados, a nova configuração apenas substitui a registrada
+    store.delete(['c0'])
+    reopen_store(mocker, 4)
+    check_embedding_metadata()
+    assert get_vector_store().collection_metadata['embedding_dimensions'] == 4
+
+
+def test_check_embedding_metadata_on_chroma_collection(mocker, tmp_path):
+    """
+    Tests whether metadata is recorded on an existing Chroma collection created without it.
+    """
+    mocker.patch.object(settings, 'VECTOR_STORE_PATH', str(tmp_path))
+    mocker.patch.object(settings, 'EMBEDDING_CACHE_ENABLED', False)
+    mocker.patch.object(settings, 'EMBEDDING_DIMENSIONS', 8)
+    mocker.patch(
+        'rag.vector_store.OpenAIEmbeddings', return_value=SizedEmbeddings(8)
+    )
+    store = get_vector_store()
+    store.add_texts(['texto'], ids=['c0'])
+    store._collection.modify(metadata={'legacy': True})
+
+    check_embedding_metadata()
+
+    assert store._collection.metadata == {
+        'legacy': True,
+        'embedding_model': settings.EMBEDDING_MODEL,
+        'embedding_dimensions': 8,
+    }
+
+
+def test_hnsw_settings_apply_to_new_collections_and_ef_search_to_existing(
+    mocker, tmp_path, capsys
+):
+    """
+    Tests whether HNSW settings configure a new collection, and only ef_search changes on an existing one.
+    """
+    mocker.patch.object(settings, 'VECTOR_STORE_PATH', str(tmp_path))
+    mocker.patch.object(settings, 'EMBEDDING_CACHE_ENABLED', False)
+    mocker.patch.object(settings, 'HNSW_SPACE', 'cosine')
+    mocker.patch.object(settings, 'HNSW_M', 32)
+    mocker.patch.object(settings, 'HNSW_SEARCH_EF', 50)
+    mocker.patch(
+        'rag.vector_store.OpenAIEmbeddings', return_value=SizedEmbeddings(8)
+    )
+
+    hnsw = get_vector_store()._collection.configuration['hnsw']
+    assert (hnsw['space'], hnsw['max_neighbors'], hnsw['ef_search']) == (
+        'cosine',
+        32,
+        50,
+    )
+
+    mocker.patch.object(settings, 'HNSW_M', 8)
+    mocker.patch.object(settings, 'HNSW_SEARCH_EF', 20)
+    vector_store_module._global_instance_vector_store = None
+
+    hnsw = get_vector_store()._collection.configuration['hnsw']
+    assert (hnsw['max_neighbors'], hnsw['ef_search']) == (32, 20)
+    assert "{'max_neighbors': 32}" in capsys.readouterr().out
@@ -0,0 +1,36 @@
+from functools import lru_cache
+
+import tiktoken
+
+from app.settings import settings
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Modelo desconhecido pelo tiktoken: usa o encoding dos modelos atuais
+        return _get_cl100k_encoding()
+    except Exception:
+        # Arquivos do encoding indisponíveis (ex.: ambiente sem internet)
+        return None
+
+
+def _get_cl100k_encoding():
+    try:
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """
+    Quantidade de tokens do texto no tokenizer do modelo (padrão: LLM_MODEL).
+
+    Sem o tokenizer disponível, usa a aproximação de ~4 caracteres por token.
+    """
+    encoding = _get_encoding(model or settings.LLM_MODEL)
+    if encoding is None:
+        return -(-len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
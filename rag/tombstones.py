@@ -0,0 +1,55 @@
+import threading
+from typing import Iterable, List, Optional
+
+from langchain_core.documents import Document
+
+_global_instance_tombstones: Optional['TombstoneSet'] = None
+
+
+class TombstoneSet:
+    """
+    Ids dos chunks de documentos removidos cujos vetores ainda não foram
+    apagados pelo purger.
+
+    A remoção de um documento apenas o marca como tombstone; até o purger
+    apagar os vetores, a recuperação descarta esses chunks dos resultados.
+    """
+
+    def __init__(self):
+        self._ids = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._ids
+
+    def add(self, ids: Iterable[str]):
+        with self._lock:
+            self._ids.update(ids)
+
+    def discard(self, ids: Iterable[str]):
+        with self._lock:
+            self._ids.difference_update(ids)
+
+    def replace(self, ids: Iterable[str]):
+        """Substitui o conjunto inteiro (sincronização com o banco)."""
+        new_ids = set(ids)
+        with self._lock:
+            self._ids = new_ids
+
+    def filter(self, documents: List[Document]) -> List[Document]:
+        if not self._ids:
+            return documents
+        return [
+            document for document in documents if document.id not in self._ids
+        ]
+
+
+def get_tombstones() -> TombstoneSet:
+    global _global_instance_tombstones
+
+    if _global_instance_tombstones is None:
+        _global_instance_tombstones = TombstoneSet()
+    return _global_instance_tombstones
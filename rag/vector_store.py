@@ -1,48 +1,585 @@
-from typing import List, Optional
+import asyncio
+import os
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
 from uuid import uuid4
 
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 
+from app.metrics import STAGE_DURATION, TOKENS_CONSUMED
 from app.settings import settings
+from rag.answer_cache import invalidate_answer_cache
+from rag.bm25_index import BM25Index, discard_bm25_index, get_bm25_index
+from rag.embedding_cache import (
+    CachedEmbeddings,
+    content_hash,
+    get_embedding_cache,
+)
+from rag.numpy_store import NumpyVectorStore
+from rag.tokens import count_tokens
 
 _global_instance_vector_store: Optional[Chroma] = None
+_global_instance_query_batcher: Optional['QueryEmbeddingBatcher'] = None
+
+
+# Dimensão nativa dos modelos da OpenAI (usada quando EMBEDDING_DIMENSIONS não é definido)
+NATIVE_EMBEDDING_DIMENSIONS = {
+    'text-embedding-3-small': 1536,
+    'text-embedding-3-large': 3072,
+    'text-embedding-ada-002': 1536,
+}
+
+
+def embedding_metadata() -> Dict[str, Union[str, int]]:
+    """Modelo e dimensão configurados, registrados nos metadados da coleção."""
+    metadata: Dict[str, Union[str, int]] = {
+        'embedding_model': settings.EMBEDDING_MODEL
+    }
+    dimensions = (
+        settings.EMBEDDING_DIMENSIONS
+        or NATIVE_EMBEDDING_DIMENSIONS.get(settings.EMBEDDING_MODEL)
+    )
+    if dimensions:
+        metadata['embedding_dimensions'] = dimensions
+    return metadata
+
+
+class InstrumentedEmbeddings(Embeddings):
+    """
+    Registra a duração (etapa `embed`) e os tokens de cada chamada ao
+    provedor de embeddings. Fica abaixo do cache: apenas os textos
+    realmente enviados ao provedor são contabilizados.
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    @staticmethod
+    def _record(texts: List[str], start: float):
+        STAGE_DURATION.observe(time.perf_counter() - start, stage='embed')
+        tokens = sum(
+            count_tokens(text, settings.EMBEDDING_MODEL) for text in texts
+        )
+        TOKENS_CONSUMED.inc(tokens, kind='embedding')
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        vectors = self.embeddings.embed_documents(texts)
+        self._record(texts, start)
+        return vectors
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        vectors = await self.embeddings.aembed_documents(texts)
+        self._record(texts, start)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        vector = self.embeddings.embed_query(text)
+        self._record([text], start)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        vector = await self.embeddings.aembed_query(text)
+        self._record([text], start)
+        return vector
+
+
+def build_embeddings() -> Embeddings:
+    embeddings = InstrumentedEmbeddings(
+        OpenAIEmbeddings(
+            model=settings.EMBEDDING_MODEL,
+            dimensions=settings.EMBEDDING_DIMENSIONS,
+            base_url=settings.OPENAI_BASE_URL,
+            # Servidores compatíveis recebem o texto; só a OpenAI recebe os tokens pré-divididos
+            check_embedding_ctx_length=settings.OPENAI_BASE_URL is None,
+        )
+    )
+
+    if settings.EMBEDDING_CACHE_ENABLED:
+        # Apenas chunks ausentes do cache são enviados à OpenAI; vetores
+        # encurtados não podem ser confundidos com os de tamanho completo
+        namespace = settings.EMBEDDING_MODEL
+        if settings.EMBEDDING_DIMENSIONS:
+            namespace = f'{namespace}:{settings.EMBEDDING_DIMENSIONS}'
+        embeddings = CachedEmbeddings(
+            embeddings=embeddings,
+            cache=get_embedding_cache(),
+            namespace=namespace,
+        )
+    return embeddings
+
+
+def open_vector_store(embeddings: Embeddings, target: Optional[str] = None):
+    """
+    Abre a coleção `target` (nome da coleção no Chroma, diretório no backend
+    numpy) ou, sem `target`, a coleção configurada.
+    """
+    if settings.VECTOR_BACKEND == 'numpy':
+        return NumpyVectorStore(
+            path=target or settings.numpy_store_path,
+            embedding_function=embeddings,
+            compaction_threshold=settings.NUMPY_COMPACTION_THRESHOLD,
+            quantization=settings.NUMPY_QUANTIZATION,
+            rescore_factor=settings.NUMPY_RESCORE_FACTOR,
+            collection_metadata=embedding_metadata(),
+        )
+    vector_store = Chroma(
+        collection_name=target or settings.VECTOR_COLLECTION_NAME,
+        persist_directory=settings.VECTOR_STORE_PATH,
+        embedding_function=embeddings,
+        # Chaves `hnsw:*`: configuram o índice de coleções novas (a versão do
+        # langchain-chroma fixada não aceita `collection_configuration`)
+        collection_metadata={**embedding_metadata(), **hnsw_metadata()},
+    )
+    sync_hnsw_configuration(vector_store._collection)
+    return vector_store
+
+
+def hnsw_configuration() -> Dict[str, Union[str, int]]:
+    return {
+        'space': settings.HNSW_SPACE,
+        'max_neighbors': settings.HNSW_M,
+        'ef_construction': settings.HNSW_CONSTRUCTION_EF,
+        'ef_search': settings.HNSW_SEARCH_EF,
+    }
+
+
+def hnsw_metadata() -> Dict[str, Union[str, int]]:
+    return {
+        'hnsw:space': settings.HNSW_SPACE,
+        'hnsw:M': settings.HNSW_M,
+        'hnsw:construction_ef': settings.HNSW_CONSTRUCTION_EF,
+        'hnsw:search_ef': settings.HNSW_SEARCH_EF,
+    }
+
+
+def sync_hnsw_configuration(collection):
+    """
+    Aplica o `ef_search` configurado a uma coleção existente.
+
+    `space`, `M` e `construction_ef` são fixados na criação do índice; se
+    diferirem da configuração, apenas avisa (recriar a coleção com
+    `python -m rag.reembed` aplica os novos valores).
+    """
+    current = (collection.configuration or {}).get('hnsw') or {}
+    expected = hnsw_configuration()
+
+    if current.get('ef_search') != expected['ef_search']:
+        collection.modify(
+            configuration={'hnsw': {'ef_search': expected['ef_search']}}
+        )
+
+    fixed = {
+        key: current.get(key)
+        for key in ('space', 'max_neighbors', 'ef_construction')
+        if current.get(key) != expected[key]
+    }
+    if fixed:
+        print(
+            f'HNSW index of collection {collection.name!r} was created with {fixed}; '
+            'these settings only apply to new collections.'
+        )
 
 
 def get_vector_store():
     global _global_instance_vector_store
 
-    if _global_instance_vector_store:
+    # `is not None`: o NumpyVectorStore vazio tem len() == 0
+    if _global_instance_vector_store is not None:
         return _global_instance_vector_store
 
     try:
-        _global_instance_vector_store = Chroma(
-            persist_directory=settings.VECTOR_STORE_PATH,
-            embedding_function=OpenAIEmbeddings(
-                model=settings.EMBEDDING_MODEL
-            )
-        )
+        _global_instance_vector_store = open_vector_store(build_embeddings())
         return _global_instance_vector_store
     except Exception as e:
         print(f'Error retrieving Vector Store: {e}')
         raise Exception(e)
 
 
+def get_collection_metadata(vector_store) -> dict:
+    if isinstance(vector_store, NumpyVectorStore):
+        return vector_store.collection_metadata
+    return dict(vector_store._collection.metadata or {})
+
+
+def get_stored_dimensions(vector_store) -> Optional[int]:
+    """Dimensão dos vetores já armazenados (None com a coleção vazia)."""
+    if isinstance(vector_store, NumpyVectorStore):
+        return vector_store.dimensions if len(vector_store) else None
+    result = vector_store._collection.get(limit=1, include=['embeddings'])
+    if len(result['embeddings']) == 0:
+        return None
+    return len(result['embeddings'][0])
+
+
+def set_collection_metadata(vector_store, metadata: dict):
+    if isinstance(vector_store, NumpyVectorStore):
+        vector_store.modify_collection_metadata(metadata)
+    else:
+        # O Chroma não aceita reenviar as chaves `hnsw:*`; a configuração do índice é mantida
+        vector_store._collection.modify(
+            metadata={
+                key: value
+                for key, value in metadata.items()
+                if not key.startswith('hnsw:')
+            }
+        )
+
+
+def check_embedding_metadata():
+    """
+    Compara o modelo e a dimensão configurados com os registrados na coleção.
+
+    Falha na inicialização se os vetores armazenados foram gerados com outro
+    modelo ou dimensão, o que tornaria as buscas silenciosamente erradas; a
+    migração é feita com `python -m rag.reembed`. Coleções vazias ou criadas
+    antes do registro passam a registrar a configuração atual.
+    """
+    vector_store = get_vector_store()
+    expected = embedding_metadata()
+    recorded = get_collection_metadata(vector_store)
+    stored_dimensions = get_stored_dimensions(vector_store)
+
+    if stored_dimensions is not None:
+        if 'embedding_model' in recorded:
+            mismatched = {
+                key: recorded.get(key)
+                for key, value in expected.items()
+                if recorded.get(key) != value
+            }
+        else:
+            # Coleção criada antes do registro: só é possível conferir a dimensão
+            mismatched = {}
+            if (
+                expected.get('embedding_dimensions', stored_dimensions)
+                != stored_dimensions
+            ):
+                mismatched = {'embedding_dimensions': stored_dimensions}
+
+        if mismatched:
+            configured = {key: expected.get(key) for key in mismatched}
+            raise RuntimeError(
+                f'The vector store was built with {mismatched}, but the settings use {configured}. '
+                'Re-embed the corpus with `python -m rag.reembed --target <new collection>` '
+                'and point the settings to the new collection.'
+            )
+
+    if any(recorded.get(key) != value for key, value in expected.items()):
+        set_collection_metadata(vector_store, {**recorded, **expected})
+
+
+class QueryEmbeddingBatcher:
+    """
+    Agrupa embeddings de perguntas concorrentes em uma única requisição.
+
+    Perguntas que chegam dentro de uma janela de `max_wait_ms` (ou até
+    completar `max_batch_size`) são enviadas juntas em uma chamada
+    `aembed_documents`, e cada chamador recebe o seu vetor.
+    """
+
+    def __init__(
+        self, embeddings: Embeddings, max_wait_ms: float, max_batch_size: int
+    ):
+        self.embeddings = embeddings
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+        self.batches = 0
+        self.queries = 0
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.queries += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._embed_batch(batch))
+        # Mantém referência à task até terminar (evita coleta pelo GC)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _embed_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Perguntas idênticas no mesmo lote são enviadas uma única vez
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+
+        try:
+            vectors = await self.embeddings.aembed_documents(texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        vectors_by_text: Dict[str, List[float]] = dict(zip(texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(vectors_by_text[text])
+
+
+def _query_embeddings() -> Embeddings:
+    embeddings = get_vector_store().embeddings
+    if isinstance(embeddings, CachedEmbeddings):
+        # Perguntas não passam pelo cache de embeddings de chunks
+        embeddings = embeddings.embeddings
+    return embeddings
+
+
+def get_query_batcher() -> QueryEmbeddingBatcher:
+    global _global_instance_query_batcher
+
+    if _global_instance_query_batcher is None:
+        _global_instance_query_batcher = QueryEmbeddingBatcher(
+            embeddings=_query_embeddings(),
+            max_wait_ms=settings.QUERY_EMBEDDING_BATCH_WAIT_MS,
+            max_batch_size=settings.QUERY_EMBEDDING_BATCH_MAX_SIZE,
+        )
+    return _global_instance_query_batcher
+
+
+async def embed_query(text: str) -> List[float]:
+    if settings.QUERY_EMBEDDING_BATCH_ENABLED:
+        return await get_query_batcher().embed(text)
+
+    vector_store = get_vector_store()
+    return await vector_store.embeddings.aembed_query(text)
+
+
+async def embed_queries(texts: List[str]) -> List[List[float]]:
+    """Embeddings de várias perguntas em uma única chamada (lotes offline)."""
+    return await _query_embeddings().aembed_documents(texts)
+
+
+async def search_by_vectors(
+    embeddings: List[List[float]], k: int
+) -> List[List[Document]]:
+    """Busca em lote: uma única consulta ao índice para todas as perguntas."""
+    vector_store = get_vector_store()
+    with STAGE_DURATION.time(stage='vector_query'):
+        if isinstance(vector_store, NumpyVectorStore):
+            results = await asyncio.to_thread(
+                vector_store.similarity_search_with_score_by_vectors,
+                embeddings,
+                k,
+            )
+            return [[document for document, _ in scored] for scored in results]
+
+        result = await asyncio.to_thread(
+            vector_store._collection.query,
+            query_embeddings=embeddings,
+            n_results=k,
+            include=['documents', 'metadatas'],
+        )
+    return [
+        [
+            Document(
+                id=chunk_id, page_content=content, metadata=metadata or {}
+            )
+            for chunk_id, content, metadata in zip(ids, contents, metadatas)
+        ]
+        for ids, contents, metadatas in zip(
+            result['ids'], result['documents'], result['metadatas']
+        )
+    ]
+
+
+async def search_by_vector(embedding: List[float], k: int) -> List[Document]:
+    vector_store = get_vector_store()
+    with STAGE_DURATION.time(stage='vector_query'):
+        return await vector_store.asimilarity_search_by_vector(embedding, k=k)
+
+
+async def search_by_vector_with_scores(
+    embedding: List[float], k: int, filter: Optional[dict] = None
+) -> List[Tuple[Document, float]]:
+    """
+    Como `search_by_vector`, com a similaridade de cosseno de cada chunk.
+
+    O Chroma retorna distâncias no espaço do índice (`HNSW_SPACE`); elas são
+    convertidas em similaridade assumindo embeddings normalizados, como os
+    da OpenAI. `filter` restringe a busca pelos metadados (sintaxe `where`
+    do Chroma; no índice numpy, igualdade e `$in`).
+    """
+    vector_store = get_vector_store()
+    with STAGE_DURATION.time(stage='vector_query'):
+        if isinstance(vector_store, NumpyVectorStore):
+            return await asyncio.to_thread(
+                vector_store.similarity_search_with_score_by_vector,
+                embedding,
+                k,
+                filter,
+            )
+        results = await asyncio.to_thread(
+            vector_store.similarity_search_by_vector_with_relevance_scores,
+            embedding,
+            k,
+            filter,
+        )
+
+    # l2 no Chroma é a distância euclidiana ao quadrado: 2 - 2·cos para vetores unitários
+    scale = 0.5 if settings.HNSW_SPACE == 'l2' else 1.0
+    return [(document, 1 - distance * scale) for document, distance in results]
+
+
+async def _update_bm25_index(update: Callable[[BM25Index], None]):
+    """
+    Mantém o índice léxico sincronizado com o vector store. Com
+    `RETRIEVAL_MODE=vector` o índice não é consultado: em vez de atualizá-lo
+    a cada escrita, o arquivo é descartado e `ensure_bm25_index` o reconstrói
+    quando a busca léxica for ativada.
+    """
+    if settings.RETRIEVAL_MODE == 'vector':
+        await asyncio.to_thread(discard_bm25_index)
+        return
+
+    bm25_index = get_bm25_index()
+    await asyncio.to_thread(update, bm25_index)
+    await asyncio.to_thread(bm25_index.save)
+
+
 async def add_chunks_to_vector_store(chunks: List[Document], ids: List[str]):
     vector_store = get_vector_store()
-    await vector_store.aadd_documents(documents=chunks, ids=ids)
+    # Inclui o embedding dos chunks ausentes do cache (também medido na etapa `embed`)
+    with STAGE_DURATION.time(stage='vector_add'):
+        await vector_store.aadd_documents(documents=chunks, ids=ids)
+
+    await _update_bm25_index(lambda index: index.add(chunks, ids))
+
+    invalidate_answer_cache()
 
 
 async def delete_chunks_by_ids(ids: List[str]):
     vector_store = get_vector_store()
     await vector_store.adelete(ids=ids)
 
+    await _update_bm25_index(lambda index: index.remove(ids))
+
+    invalidate_answer_cache()
+
+
+async def update_chunks_metadata(chunks: List[Document], ids: List[str]):
+    """Atualiza apenas os metadados dos chunks, sem recalcular embeddings."""
+    vector_store = get_vector_store()
+    metadatas = [chunk.metadata for chunk in chunks]
+    if isinstance(vector_store, NumpyVectorStore):
+        await asyncio.to_thread(vector_store.update_metadatas, ids, metadatas)
+    else:
+        await asyncio.to_thread(
+            vector_store._collection.update, ids=ids, metadatas=metadatas
+        )
+
+    await _update_bm25_index(lambda index: index.add(chunks, ids))
+
+    invalidate_answer_cache()
+
+
+def count_vectors() -> int:
+    vector_store = get_vector_store()
+    if isinstance(vector_store, NumpyVectorStore):
+        return vector_store.count()
+    return vector_store._collection.count()
+
+
 async def get_chunks_by_ids(ids: List[str]):
     vector_store = get_vector_store()
     result = await vector_store.aget_by_ids(ids)
     return result
 
+
+def ensure_bm25_index():
+    """
+    Reconstrói o índice BM25 a partir do vector store quando o arquivo do
+    índice ainda não existe (ex.: base criada antes da busca híbrida ou
+    alterada com `RETRIEVAL_MODE=vector`).
+    """
+    if settings.RETRIEVAL_MODE == 'vector' or os.path.exists(
+        settings.bm25_index_path
+    ):
+        return
+
+    result = get_vector_store().get(include=['documents', 'metadatas'])
+    bm25_index = get_bm25_index()
+    bm25_index.add(
+        [
+            Document(page_content=content, metadata=metadata or {})
+            for content, metadata in zip(
+                result['documents'], result['metadatas']
+            )
+        ],
+        result['ids'],
+    )
+    bm25_index.save()
+
+
 def generate_chunks_ids(filename: str, chunks: List[Document]) -> List[str]:
     chunk_ids = [f'{filename}_chunk_{i}_{uuid4()}' for i in range(len(chunks))]
     return chunk_ids
+
+
+class ChunkDiff(NamedTuple):
+    chunk_ids: List[str]  # ids finais, na ordem dos novos chunks
+    added: List[int]  # posições dos chunks sem correspondente armazenado
+    metadata_changed: List[
+        int
+    ]  # reaproveitados cujo metadado mudou (ex.: página)
+    removed_ids: List[str]  # chunks armazenados que deixaram de existir
+
+
+def diff_chunks(
+    filename: str, stored_chunks: List[Document], new_chunks: List[Document]
+) -> ChunkDiff:
+    """
+    Compara os novos chunks com os armazenados pelo hash do conteúdo.
+
+    Chunks com conteúdo idêntico mantêm o id (e o embedding) já existente;
+    apenas os demais precisam ser embutidos, e os armazenados sem
+    correspondente são removidos.
+    """
+    stored_by_hash: Dict[str, List[Document]] = {}
+    for chunk in stored_chunks:
+        stored_by_hash.setdefault(content_hash(chunk.page_content), []).append(
+            chunk
+        )
+
+    chunk_ids, added, metadata_changed = [], [], []
+    for position, chunk in enumerate(new_chunks):
+        matches = stored_by_hash.get(content_hash(chunk.page_content))
+        if matches:
+            stored = matches.pop(0)
+            chunk_ids.append(stored.id)
+            if stored.metadata != chunk.metadata:
+                metadata_changed.append(position)
+        else:
+            chunk_ids.append(f'{filename}_chunk_{position}_{uuid4()}')
+            added.append(position)
+
+    removed_ids = [
+        chunk.id for chunks in stored_by_hash.values() for chunk in chunks
+    ]
+    return ChunkDiff(chunk_ids, added, metadata_changed, removed_ids)